@@ -0,0 +1,124 @@
+import base64
+import binascii
+import io
+import uuid
+
+from django.conf import settings
+from django.core.files.uploadedfile import TemporaryUploadedFile, UploadedFile
+from PIL import Image, UnidentifiedImageError
+from rest_framework import serializers
+
+# Multiple of 4, so every chunk decodes on its own: 64 KiB of base64 text.
+BASE64_CHUNK_CHARS = 64 * 1024
+BASE64_WHITESPACE = str.maketrans('', '', ' \t\r\n')
+IMAGE_FORMATS = {'JPEG': 'jpg', 'PNG': 'png', 'GIF': 'gif', 'WEBP': 'webp'}
+
+
+class DecodedImageFile(TemporaryUploadedFile):
+    """
+    Декодированная из base64 картинка. Хранилище перемещает временный файл
+    при сохранении, поэтому закрываем его сами, а не через tempfile.
+    """
+
+    def __del__(self):
+        self.close()
+
+
+class ImageUploadField(serializers.ImageField):
+    """
+    Картинка строкой base64 (с заголовком data:image/...;base64, или без)
+    либо файлом из multipart/form-data.
+
+    Размер проверяется по длине base64 до декодирования, формат и разрешение
+    по заголовку картинки, а сама строка декодируется частями во временный
+    файл, так что декодированная копия не держится в памяти целиком.
+    """
+    default_error_messages = {
+        'invalid_image': 'Загрузите корректную картинку.',
+        'invalid_base64': 'Некорректная строка base64.',
+        'invalid_type': 'Ожидается строка base64 или файл.',
+        'unsupported_format': 'Поддерживаются только JPEG, PNG, GIF и WebP.',
+        'too_large': 'Размер картинки не должен превышать {max_mb} МБ.',
+        'too_many_pixels': (
+            'Разрешение картинки не должно превышать {max_megapixels} Мп.'
+        ),
+    }
+
+    def to_internal_value(self, data):
+        if isinstance(data, str):
+            data = self._decode_base64(data)
+        elif isinstance(data, UploadedFile):
+            self._check_size(data.size)
+            self._check_header(data, required=True)
+        else:
+            self.fail('invalid_type')
+        return super().to_internal_value(data)
+
+    def _check_size(self, size):
+        if size > settings.MAX_IMAGE_UPLOAD_SIZE:
+            self.fail('too_large',
+                      max_mb=settings.MAX_IMAGE_UPLOAD_SIZE // (1024 * 1024))
+
+    def _check_header(self, file, required):
+        """
+        Читает только заголовок картинки. Возвращает расширение файла или
+        None, если заголовок не поместился в прочитанное начало и required
+        не задан.
+        """
+        file.seek(0)
+        try:
+            with Image.open(file) as image:
+                image_format, (width, height) = image.format, image.size
+        except Image.DecompressionBombError:
+            image_format, width, height = None, float('inf'), 1
+        except (UnidentifiedImageError, OSError, SyntaxError):
+            if required:
+                self.fail('invalid_image')
+            return None
+        finally:
+            file.seek(0)
+        if width * height > settings.MAX_IMAGE_UPLOAD_PIXELS:
+            self.fail(
+                'too_many_pixels',
+                max_megapixels=settings.MAX_IMAGE_UPLOAD_PIXELS // 1_000_000)
+        if image_format not in IMAGE_FORMATS:
+            self.fail('unsupported_format')
+        return IMAGE_FORMATS[image_format]
+
+    def _decode_base64(self, value):
+        offset = 0
+        if value.startswith('data:'):
+            offset = value.find(';base64,') + len(';base64,')
+            if offset < len(';base64,'):
+                self.fail('invalid_base64')
+        self._check_size((len(value) - offset) * 3 // 4 - 2)
+
+        upload = DecodedImageFile('upload', None, 0, None)
+        try:
+            extension = None
+            carry = ''
+            for start in range(offset, len(value), BASE64_CHUNK_CHARS):
+                piece = value[start:start + BASE64_CHUNK_CHARS]
+                chunk = carry + piece.translate(BASE64_WHITESPACE)
+                usable = len(chunk) - len(chunk) % 4
+                chunk, carry = chunk[:usable], chunk[usable:]
+                try:
+                    decoded = base64.b64decode(chunk, validate=True)
+                except binascii.Error:
+                    self.fail('invalid_base64')
+                if extension is None and upload.size == 0:
+                    extension = self._check_header(
+                        io.BytesIO(decoded), required=False)
+                upload.write(decoded)
+                upload.size += len(decoded)
+            if carry or not upload.size:
+                self.fail('invalid_base64')
+            upload.flush()
+            if extension is None:
+                extension = self._check_header(upload, required=True)
+        except Exception:
+            upload.close()
+            raise
+        upload.name = f'{uuid.uuid4()}.{extension}'
+        upload.seek(0)
+        return upload
@@ -1,5 +1,6 @@
 from django_filters import rest_framework as filters
 from recipes.models import Recipe
+from recipes.search import search_recipes
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
@@ -8,6 +9,7 @@ class RecipeFilter(filters.FilterSet):
     author = filters.ModelChoiceFilter(queryset=User.objects.all())
     is_favorited = filters.BooleanFilter(method='filter_is_favorited')
     is_in_shopping_cart = filters.BooleanFilter(method='filter_is_in_shopping_cart')
+    search = filters.CharFilter(method='filter_search', max_length=200)
 
     class Meta:
         model = Recipe
@@ -29,4 +31,15 @@ class RecipeFilter(filters.FilterSet):
                 return queryset.filter(shopping_cart_items__user=user)
             else:
                 return queryset.exclude(shopping_cart_items__user=user)
-        return queryset
\ No newline at end of file
+        return queryset
+
+    def filter_search(self, queryset, name, value):
+        """
+        Полнотекстовый поиск по названию и описанию с учётом словоформ;
+        результаты упорядочены по релевантности. В режиме cursor порядок
+        остаётся хронологическим.
+        """
+        value = value.strip()
+        if not value:
+            return queryset
+        return search_recipes(queryset, value)
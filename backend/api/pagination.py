@@ -1,7 +1,203 @@
+import base64
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from functools import partial
+
+from django.core.cache import cache
+from django.core.paginator import Paginator as DjangoPaginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 from django.conf import settings
 
+
 class CustomPageNumberPagination(PageNumberPagination):
     page_size_query_param = settings.PAGE_SIZE_QUERY_PARAM
     page_size = settings.REST_FRAMEWORK.get('PAGE_SIZE', 6)
-    max_page_size = 100
\ No newline at end of file
+    max_page_size = 100
+
+
+COUNT_VERSION_KEY = 'pagination:count_version:{}'
+
+
+def bump_count_version(model):
+    """Сбрасывает закешированные счётчики страниц, зависящие от модели."""
+    cache.set(COUNT_VERSION_KEY.format(model._meta.label_lower),
+              time.time_ns(), None)
+
+
+def get_count_versions(models):
+    keys = [
+        COUNT_VERSION_KEY.format(model._meta.label_lower) for model in models
+    ]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, time.time_ns(), None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def estimate_table_count(model, using='default'):
+    """Оценка числа строк из статистики планировщика PostgreSQL."""
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+            [model._meta.db_table]
+        )
+        row = cursor.fetchone()
+    return max(row[0], 0) if row else None
+
+
+class CachedCountPaginator(DjangoPaginator):
+    def __init__(self, object_list, per_page, count_resolver=None, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.count_resolver = count_resolver
+
+    @cached_property
+    def count(self):
+        if self.count_resolver is None:
+            return super().count
+        return self.count_resolver(self.object_list)
+
+
+class CachedCountPagination(CustomPageNumberPagination):
+    """
+    Кеширует COUNT(*) страниц по (путь, параметры фильтрации, пользователь
+    для персональных фильтров) с коротким TTL. Ключ включает версии
+    моделей из view.count_cache_models, которые сбрасываются при записи.
+    Для неотфильтрованных списков на PostgreSQL больше
+    PAGINATION_ESTIMATE_THRESHOLD строк используется оценка планировщика.
+    """
+    count_cache_timeout = getattr(
+        settings, 'PAGINATION_COUNT_CACHE_TIMEOUT', 30)
+    estimate_threshold = getattr(
+        settings, 'PAGINATION_ESTIMATE_THRESHOLD', None)
+    count_ignored_params = ('page', 'cursor', 'format', 'recipes_limit')
+    user_scoped_params = ('is_favorited', 'is_in_shopping_cart')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.django_paginator_class = partial(
+            CachedCountPaginator,
+            count_resolver=partial(
+                self.resolve_count, request=request, view=view)
+        )
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_count_cache_key(self, queryset, request, view):
+        ignored = self.count_ignored_params + (self.page_size_query_param,)
+        params = sorted(
+            (key, sorted(request.query_params.getlist(key)))
+            for key in request.query_params
+            if key not in ignored
+        )
+        user_scoped = (
+            getattr(view, 'action', None)
+            in getattr(view, 'count_cache_user_actions', ())
+            or any(key in self.user_scoped_params for key, _ in params)
+        )
+        models = getattr(view, 'count_cache_models', None) or (queryset.model,)
+        raw = json.dumps([
+            request.path,
+            params,
+            request.user.pk if user_scoped else None,
+            get_count_versions(models),
+        ])
+        return 'pagination:count:' + hashlib.md5(raw.encode()).hexdigest()
+
+    def resolve_count(self, queryset, request, view):
+        key = self.get_count_cache_key(queryset, request, view)
+        count = cache.get(key)
+        if count is None:
+            count = self.estimate_count(queryset)
+            if count is None:
+                count = queryset.count()
+            cache.set(key, count, self.count_cache_timeout)
+        return count
+
+    def estimate_count(self, queryset):
+        if self.estimate_threshold is None or queryset.query.where:
+            return None
+        if connections[queryset.db].vendor != 'postgresql':
+            return None
+        estimate = estimate_table_count(queryset.model, using=queryset.db)
+        if estimate is None or estimate < self.estimate_threshold:
+            return None
+        return estimate
+
+
+class RecipeFeedPagination(CachedCountPagination):
+    """
+    page/limit по умолчанию; при наличии параметра cursor (пустой — первая
+    страница) включается keyset-пагинация по (-pub_date, id) без COUNT(*)
+    и OFFSET. Курсор непрозрачный, только вперёд.
+    """
+    cursor_query_param = 'cursor'
+    keyset_ordering = ('-pub_date', 'id')
+    invalid_cursor_message = 'Некорректный курсор.'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.use_cursor = self.cursor_query_param in request.query_params
+        if not self.use_cursor:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        page_size = self.get_page_size(request)
+        queryset = queryset.order_by(*self.keyset_ordering)
+        position = self.decode_cursor(
+            request.query_params.get(self.cursor_query_param))
+        if position is not None:
+            pub_date, pk = position
+            queryset = queryset.filter(
+                Q(pub_date__lt=pub_date) | Q(pub_date=pub_date, id__gt=pk)
+            )
+        results = list(queryset[:page_size + 1])
+        self.has_next = len(results) > page_size
+        self.page_results = results[:page_size]
+        return self.page_results
+
+    def decode_cursor(self, token):
+        if not token:
+            return None
+        try:
+            raw = base64.urlsafe_b64decode(token.encode('ascii') + b'==')
+            pub_date, pk = json.loads(raw)
+            pub_date = parse_datetime(pub_date)
+            pk = int(pk)
+        except (TypeError, ValueError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+        if pub_date is None:
+            raise NotFound(self.invalid_cursor_message)
+        return pub_date, pk
+
+    def encode_cursor(self, recipe):
+        raw = json.dumps([recipe.pub_date.isoformat(), recipe.pk])
+        encoded = base64.urlsafe_b64encode(raw.encode()).decode('ascii')
+        return encoded.rstrip('=')
+
+    def get_next_link(self):
+        if not self.use_cursor:
+            return super().get_next_link()
+        if not self.has_next:
+            return None
+        return replace_query_param(
+            self.request.build_absolute_uri(),
+            self.cursor_query_param,
+            self.encode_cursor(self.page_results[-1])
+        )
+
+    def get_paginated_response(self, data):
+        if not self.use_cursor:
+            return super().get_paginated_response(data)
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', None),
+            ('results', data),
+        ]))
@@ -0,0 +1,27 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_save
+
+from core.deletion import connect_batch_delete
+from recipes.models import Favorite, Recipe, ShoppingCart
+from users.models import Subscription
+
+from .pagination import bump_count_version
+
+COUNTED_MODELS = (
+    get_user_model(), Recipe, Favorite, ShoppingCart, Subscription
+)
+
+
+def invalidate_page_counts(sender, created=True, **kwargs):
+    """Счётчики меняются только при появлении или удалении строк."""
+    if created:
+        bump_count_version(sender)
+
+
+def invalidate_page_counts_on_delete(sender, instances, using):
+    bump_count_version(sender)
+
+
+for model in COUNTED_MODELS:
+    post_save.connect(invalidate_page_counts, sender=model)
+    connect_batch_delete(invalidate_page_counts_on_delete, model)
@@ -0,0 +1,70 @@
+import shutil
+import tempfile
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.counters import track_bulk_create
+from recipes.ingredient_index import invalidate_ingredient_index
+from recipes.models import Ingredient, IngredientInRecipe, Recipe
+from users.models import User
+
+MEDIA_ROOT = tempfile.mkdtemp(prefix='foodgram-tests-')
+# Stands in for Redis: cache round trips are not SQL queries.
+LOCMEM_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
+}
+# An image already in storage, so fixtures skip rendering renditions.
+RECIPE_IMAGE = 'recipes/images/fixture.png'
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, CACHES=LOCMEM_CACHES)
+class APITestCase(TestCase):
+    """Общая основа тестов API: временный MEDIA_ROOT и локальный кеш."""
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        invalidate_ingredient_index()
+
+    @staticmethod
+    def create_user(name, **fields):
+        return User.objects.create_user(
+            username=name, email=f'{name}@example.org', password='Pa55-word',
+            first_name=name, last_name=name, **fields
+        )
+
+    @staticmethod
+    def create_ingredients(count, prefix='Ингредиент'):
+        return Ingredient.objects.bulk_create(
+            Ingredient(name=f'{prefix} {number}', measurement_unit='г')
+            for number in range(count)
+        )
+
+    @staticmethod
+    def create_recipe(author, ingredients, name='Рецепт', amount=10):
+        recipe = Recipe.objects.create(
+            author=author, name=name, text='Описание', cooking_time=10,
+            image=RECIPE_IMAGE
+        )
+        rows = IngredientInRecipe.objects.bulk_create(
+            IngredientInRecipe(recipe=recipe, ingredient=ingredient,
+                               amount=amount)
+            for ingredient in ingredients
+        )
+        track_bulk_create(IngredientInRecipe, rows)
+        return recipe
+
+    @staticmethod
+    def client_for(user=None):
+        client = APIClient()
+        if user is not None:
+            token, _ = Token.objects.get_or_create(user=user)
+            client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        return client
@@ -0,0 +1,70 @@
+from django.core.cache import cache
+from django.test import override_settings
+
+from recipes import ingredient_index
+from recipes.models import Ingredient
+
+from .base import APITestCase
+
+
+class IngredientIndexVersionTest(APITestCase):
+    """
+    Индекс ингредиентов сверяет версию каталога из кеша, а не из базы,
+    и перестраивается, когда другой процесс её сменил.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_ingredients(5, prefix='Мука')
+
+    def names(self, prefix):
+        response = self.client_for().get(
+            '/api/ingredients/', {'name': prefix})
+        self.assertEqual(response.status_code, 200)
+        return [row['name'] for row in response.data]
+
+    def test_warm_lookup_runs_no_queries(self):
+        self.names('Мук')
+        with self.assertNumQueries(0):
+            self.assertEqual(len(self.names('Мук')), 5)
+
+    def test_version_is_checked_after_interval(self):
+        self.names('Мук')
+        # Другой процесс добавил ингредиент и сменил версию.
+        Ingredient.objects.bulk_create(
+            [Ingredient(name='Мускат', measurement_unit='г')])
+        cache.set(ingredient_index.CATALOG_VERSION_KEY, 0, None)
+        with self.assertNumQueries(0):
+            self.assertNotIn('Мускат', self.names('Мус'))
+        with override_settings(INGREDIENT_VERSION_CHECK_INTERVAL=0):
+            with self.assertNumQueries(1):
+                self.assertIn('Мускат', self.names('Мус'))
+            with self.assertNumQueries(0):
+                self.names('Мус')
+
+    def test_save_bumps_version_after_commit(self):
+        self.names('Мук')
+        version = ingredient_index.get_catalog_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            Ingredient.objects.create(name='Мускат', measurement_unit='г')
+        self.assertNotEqual(ingredient_index.get_catalog_version(), version)
+        self.assertIn('Мускат', self.names('Мус'))
+
+    def test_catalog_revalidation_runs_no_queries(self):
+        client = self.client_for()
+        response = client.get(
+            '/api/ingredients/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        with self.assertNumQueries(0):
+            response = client.get(
+                '/api/ingredients/', HTTP_ACCEPT_ENCODING='gzip',
+                HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        with self.captureOnCommitCallbacks(execute=True):
+            Ingredient.objects.create(name='Мускат', measurement_unit='г')
+        response = client.get(
+            '/api/ingredients/', HTTP_ACCEPT_ENCODING='gzip',
+            HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
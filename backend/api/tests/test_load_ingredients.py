@@ -0,0 +1,61 @@
+import io
+import json
+import tempfile
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+
+from core.management.commands.load_ingredients import iter_json_array
+from recipes.models import Ingredient
+
+from .base import APITestCase
+
+
+class LoadIngredientsTest(APITestCase):
+    """Потоковый разбор JSON и итоговая сводка load_ingredients."""
+
+    def load(self, content):
+        with tempfile.NamedTemporaryFile(
+            'w', suffix='.json', encoding='utf-8'
+        ) as f:
+            f.write(content)
+            f.flush()
+            out = io.StringIO()
+            call_command(
+                'load_ingredients', jsonfile=f.name, format='json', stdout=out)
+        return out.getvalue()
+
+    def test_items_across_chunks(self):
+        items = [
+            {'name': 'Соль', 'measurement_unit': 'г'}, 12345, [], 'строка']
+        content = json.dumps(items, ensure_ascii=False, indent=1)
+        for chunk_size in (1, 3, 64):
+            self.assertEqual(
+                list(iter_json_array(io.StringIO(content), chunk_size)),
+                items)
+
+    def test_malformed_separators_are_rejected(self):
+        for content in (
+            '[{"a": 1} {"a": 2}]', '[{"a": 1},, {"a": 2}]',
+            '[{"a": 1},]', '[, {"a": 1}]', '[1 2]',
+        ):
+            with self.subTest(content=content), self.assertRaises(
+                    json.JSONDecodeError):
+                list(iter_json_array(io.StringIO(content), chunk_size=4))
+        with self.assertRaisesMessage(CommandError, 'Could not decode JSON'):
+            self.load('[{"name": "Соль", "measurement_unit": "г"} {}]')
+        self.assertFalse(Ingredient.objects.exists())
+
+    def test_summary_counts_duplicates_and_invalid_rows_apart(self):
+        Ingredient.objects.create(name='Соль', measurement_unit='г')
+        output = self.load(json.dumps([
+            {'name': 'соль', 'measurement_unit': 'г'},
+            {'name': 'Сахар', 'measurement_unit': 'г'},
+            {'name': 'Сахар', 'measurement_unit': 'Г'},
+            {'name': 'Мука'},
+            'не объект',
+        ], ensure_ascii=False))
+        self.assertIn('Successfully loaded 1 new ingredients', output)
+        self.assertIn('Skipped 2 rows that already exist', output)
+        self.assertIn('Skipped 2 invalid rows.', output)
+        self.assertEqual(Ingredient.objects.count(), 2)
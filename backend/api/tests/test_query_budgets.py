@@ -0,0 +1,451 @@
+from io import StringIO
+from urllib.parse import urlsplit
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.urls import URLResolver, resolve
+
+from api import urls as api_urls
+from recipes.ingredient_index import invalidate_ingredient_index
+from recipes.models import (
+    Favorite, IngredientInRecipe, Recipe, ShoppingCart,
+)
+from users.models import Subscription
+
+from .base import RECIPE_IMAGE, APITestCase
+
+PASSWORD = 'Pa55-word'
+NEW_PASSWORD = 'Pa55-word-2'
+# 1x1 transparent PNG.
+IMAGE = (
+    'data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAA'
+    'DUlEQVR42mNkYPhfDwAChwGA60e6kgAAAABJRU5ErkJggg=='
+)
+METHODS = ('get', 'post', 'put', 'patch', 'delete')
+USERS = 'CustomUserViewSet'
+RECIPES = 'RecipeViewSet'
+INGREDIENTS = 'IngredientViewSet'
+
+# SQL queries per request for every API route. None of them may depend on
+# the number of rows: the tests below repeat lists with two page sizes and
+# the heavier routes after every related row has been doubled. Inside a
+# TestCase atomic blocks are savepoints, and the SAVEPOINT and RELEASE
+# statements count as queries.
+BUDGETS = {
+    ('APIRootView', None, 'get'): 0,
+    ('TokenCreateView', None, 'post'): 6,
+    ('TokenDestroyView', None, 'post'): 2,
+
+    (USERS, 'list', 'get'): 2,
+    (USERS, 'create', 'post'): 5,
+    (USERS, 'retrieve', 'get'): 3,
+    (USERS, 'update', 'put'): 4,
+    (USERS, 'partial_update', 'patch'): 3,
+    (USERS, 'destroy', 'delete'): 34,
+    (USERS, 'me', 'get'): 1,
+    (USERS, 'me', 'put'): 3,
+    (USERS, 'me', 'patch'): 2,
+    (USERS, 'me', 'delete'): 33,
+    (USERS, 'activation', 'post'): 0,
+    (USERS, 'resend_activation', 'post'): 1,
+    (USERS, 'reset_password', 'post'): 1,
+    (USERS, 'reset_password_confirm', 'post'): 0,
+    (USERS, 'reset_username', 'post'): 1,
+    (USERS, 'reset_username_confirm', 'post'): 1,
+    (USERS, 'set_password', 'post'): 2,
+    (USERS, 'set_username', 'post'): 3,
+    (USERS, 'subscriptions', 'get'): 5,
+    (USERS, 'subscribe', 'post'): 8,
+    (USERS, 'subscribe', 'delete'): 4,
+    (USERS, 'set_avatar', 'put'): 2,
+    (USERS, 'set_avatar', 'delete'): 2,
+
+    (INGREDIENTS, 'list', 'get'): 1,
+    (INGREDIENTS, 'retrieve', 'get'): 1,
+
+    (RECIPES, 'list', 'get'): 6,
+    (RECIPES, 'retrieve', 'get'): 5,
+    (RECIPES, 'create', 'post'): 9,
+    (RECIPES, 'update', 'put'): 16,
+    (RECIPES, 'partial_update', 'patch'): 17,
+    (RECIPES, 'destroy', 'delete'): 20,
+    (RECIPES, 'get_link', 'get'): 5,
+    (RECIPES, 'favorite', 'post'): 6,
+    (RECIPES, 'favorite', 'delete'): 4,
+    (RECIPES, 'shopping_cart', 'post'): 7,
+    (RECIPES, 'shopping_cart', 'delete'): 6,
+    (RECIPES, 'favorite_bulk', 'post'): 7,
+    (RECIPES, 'favorite_bulk', 'delete'): 7,
+    (RECIPES, 'shopping_cart_bulk', 'post'): 8,
+    (RECIPES, 'shopping_cart_bulk', 'delete'): 9,
+    (RECIPES, 'download_shopping_cart', 'get'): 2,
+    (RECIPES, 'shopping_cart_clear', 'delete'): 6,
+}
+
+
+def registered_routes():
+    """(view, action, method) для каждого маршрута из api/urls.py."""
+    routes = set()
+
+    def walk(patterns):
+        for pattern in patterns:
+            if isinstance(pattern, URLResolver):
+                walk(pattern.url_patterns)
+                continue
+            view_class = getattr(pattern.callback, 'cls', None)
+            if view_class is None:
+                continue
+            actions = getattr(pattern.callback, 'actions', None)
+            if actions:
+                routes.update(
+                    (view_class.__name__, action, method)
+                    for method, action in actions.items()
+                    if method in METHODS
+                )
+            else:
+                routes.update(
+                    (view_class.__name__, None, method)
+                    for method in METHODS if hasattr(view_class, method)
+                )
+
+    walk(api_urls.urlpatterns)
+    return routes
+
+
+def route_of(method, path):
+    callback = resolve(urlsplit(path).path).func
+    actions = getattr(callback, 'actions', None) or {}
+    return callback.cls.__name__, actions.get(method), method
+
+
+class QueryBudgetTestCase(APITestCase):
+    """
+    Данные для проверки бюджетов. populate() добавляет авторов с рецептами,
+    а читателю и уходящему пользователю — подписки, избранное и корзину;
+    double() вызывает её ещё раз, удваивая все связанные строки.
+    """
+
+    AUTHORS = 3
+    RECIPES_PER_AUTHOR = 4
+    INGREDIENTS_PER_RECIPE = 3
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = cls.create_user('reader')
+        cls.leaving = cls.create_user('leaving')
+        cls.other = cls.create_user('other')
+        cls.ingredients = cls.create_ingredients(20)
+        cls.own_recipe = cls.create_recipe(
+            cls.reader, cls.ingredients[:3], name='Свой рецепт')
+        cls.own_recipe_2 = cls.create_recipe(
+            cls.reader, cls.ingredients[3:6], name='Второй свой рецепт')
+        cls.authors, cls.recipes = cls.populate('first')
+
+    @classmethod
+    def populate(cls, prefix):
+        authors = [
+            cls.create_user(f'{prefix}-author-{number}')
+            for number in range(cls.AUTHORS)
+        ]
+        recipes = Recipe.objects.bulk_create(
+            Recipe(author=author, name=f'Рецепт {author.username} {number}',
+                   text='Описание', cooking_time=10, image=RECIPE_IMAGE)
+            for author in [*authors, cls.leaving]
+            for number in range(cls.RECIPES_PER_AUTHOR)
+        )
+        count = len(cls.ingredients)
+        IngredientInRecipe.objects.bulk_create(
+            IngredientInRecipe(
+                recipe=recipe, amount=k + 1,
+                ingredient=cls.ingredients[(position + k) % count])
+            for position, recipe in enumerate(recipes)
+            for k in range(cls.INGREDIENTS_PER_RECIPE)
+        )
+        users = (cls.reader, cls.leaving)
+        Subscription.objects.bulk_create(
+            [Subscription(user=user, author=author)
+             for user in users for author in authors]
+            + [Subscription(user=author, author=user)
+               for user in users for author in authors]
+        )
+        # Чужие избранное и корзины с рецептами читателя и уходящего.
+        shared = [cls.own_recipe, cls.own_recipe_2, *recipes[-1:]]
+        Favorite.objects.bulk_create(
+            [Favorite(user=user, recipe=recipe)
+             for user in users for recipe in recipes[::2]]
+            + [Favorite(user=author, recipe=recipe)
+               for author in authors for recipe in shared]
+        )
+        ShoppingCart.objects.bulk_create(
+            [ShoppingCart(user=user, recipe=recipe)
+             for user in users for recipe in recipes[1::2]]
+            + [ShoppingCart(user=author, recipe=recipe)
+               for author in authors for recipe in shared]
+        )
+        for command in ('recount', 'rebuild_shopping_lists',
+                        'rebuild_search_index'):
+            call_command(command, stdout=StringIO())
+        return authors, recipes
+
+    def double(self):
+        """Удваивает связанные строки, в том числе ингредиенты рецептов."""
+        self.doublings = getattr(self, 'doublings', 0) + 1
+        prefix = f'more-{self.doublings}'
+        extra = self.create_ingredients(len(self.ingredients), prefix=prefix)
+        IngredientInRecipe.objects.bulk_create(
+            IngredientInRecipe(recipe=recipe, ingredient=extra[
+                (position + k) % len(extra)], amount=k + 1)
+            for position, recipe in enumerate(Recipe.objects.order_by('pk'))
+            for k in range(self.INGREDIENTS_PER_RECIPE)
+        )
+        self.populate(prefix)
+
+    def assertQueries(self, method, path, user=None, data=None, status=200,
+                      budget=None):
+        route = route_of(method, path)
+        if budget is None:
+            budget = BUDGETS[route]
+        client = self.client_for(user)
+        cache.clear()
+        invalidate_ingredient_index()
+        with self.assertNumQueries(budget):
+            response = getattr(client, method)(path, data, format='json')
+            if response.streaming:
+                b''.join(response.streaming_content)
+        self.assertEqual(response.status_code, status,
+                         getattr(response, 'data', None))
+        return response
+
+    def assertConstant(self, path, user=None, budget=None, paged=True):
+        """GET укладывается в бюджет на limit=6 и 100 и после double()."""
+        separator = '&' if '?' in path else '?'
+        paths = [
+            f'{path}{separator}limit={limit}' for limit in (6, 100)
+        ] if paged else [path]
+        for doubled in (False, True):
+            if doubled:
+                self.double()
+            for page_path in paths:
+                with self.subTest(path=page_path, doubled=doubled):
+                    self.assertQueries('get', page_path, user, budget=budget)
+
+
+class RouteCoverageTest(QueryBudgetTestCase):
+
+    def test_every_route_has_a_budget(self):
+        self.assertEqual(set(BUDGETS), registered_routes())
+
+
+class UserQueryBudgetTest(QueryBudgetTestCase):
+
+    def test_root(self):
+        self.assertQueries('get', '/api/')
+
+    def test_token(self):
+        self.assertQueries('post', '/api/auth/token/login/', data={
+            'email': self.other.email, 'password': PASSWORD})
+        self.assertQueries('post', '/api/auth/token/logout/', self.other,
+                           status=204)
+
+    def test_list(self):
+        self.assertConstant('/api/users/')
+        self.assertConstant('/api/users/', self.reader, budget=4)
+
+    def test_create(self):
+        self.assertQueries('post', '/api/users/', data={
+            'email': 'new@example.org', 'username': 'new',
+            'first_name': 'Новый', 'last_name': 'Пользователь',
+            'password': PASSWORD,
+        }, status=201)
+
+    def test_retrieve(self):
+        self.assertConstant(
+            f'/api/users/{self.authors[0].pk}/', self.reader, paged=False)
+
+    def test_update(self):
+        profile = {
+            'email': self.reader.email, 'username': 'reader-2',
+            'first_name': 'Читатель', 'last_name': 'Проверкин',
+        }
+        self.assertQueries(
+            'put', f'/api/users/{self.reader.pk}/', self.reader, profile)
+        self.assertQueries(
+            'patch', f'/api/users/{self.reader.pk}/', self.reader,
+            {'first_name': 'Читатель'})
+        self.assertQueries('put', '/api/users/me/', self.reader, profile)
+        self.assertQueries(
+            'patch', '/api/users/me/', self.reader, {'last_name': 'Другая'})
+
+    def test_me(self):
+        self.assertQueries('get', '/api/users/me/', self.reader)
+
+    def test_destroy(self):
+        self.assertQueries(
+            'delete', f'/api/users/{self.leaving.pk}/', self.leaving,
+            {'current_password': PASSWORD}, status=204)
+
+    def test_destroy_with_twice_the_rows(self):
+        self.double()
+        self.assertQueries(
+            'delete', f'/api/users/{self.leaving.pk}/', self.leaving,
+            {'current_password': PASSWORD}, status=204)
+
+    def test_destroy_me(self):
+        self.double()
+        self.assertQueries(
+            'delete', '/api/users/me/', self.leaving,
+            {'current_password': PASSWORD}, status=204)
+
+    def test_account_actions(self):
+        email = self.reader.email
+        cases = (
+            ('activation', {'uid': 'x', 'token': 'x'}, 400),
+            ('resend_activation', {'email': email}, 400),
+            ('reset_password', {'email': email}, 204),
+            ('reset_password_confirm',
+             {'uid': 'x', 'token': 'x', 'new_password': NEW_PASSWORD}, 400),
+            ('reset_email', {'email': email}, 204),
+            ('reset_email_confirm',
+             {'uid': 'x', 'token': 'x', 'new_email': 'x@example.org'}, 400),
+        )
+        for action, data, status in cases:
+            with self.subTest(action=action):
+                self.assertQueries(
+                    'post', f'/api/users/{action}/', data=data, status=status)
+
+    def test_set_password_and_email(self):
+        self.assertQueries(
+            'post', '/api/users/set_password/', self.reader,
+            {'current_password': PASSWORD, 'new_password': NEW_PASSWORD},
+            status=204)
+        self.assertQueries(
+            'post', '/api/users/set_email/', self.other,
+            {'current_password': PASSWORD, 'new_email': 'new@example.org'},
+            status=204)
+
+    def test_subscriptions(self):
+        self.assertConstant('/api/users/subscriptions/', self.reader)
+        self.assertConstant(
+            '/api/users/subscriptions/?recipes_limit=1', self.reader)
+
+    def test_subscribe(self):
+        author = self.create_user('unfollowed')
+        path = f'/api/users/{author.pk}/subscribe/'
+        self.assertQueries('post', path, self.reader, status=201)
+        self.assertQueries('delete', path, self.reader, status=204)
+
+    def test_avatar(self):
+        self.assertQueries(
+            'put', '/api/users/me/avatar/', self.reader, {'avatar': IMAGE})
+        self.assertQueries(
+            'delete', '/api/users/me/avatar/', self.reader, status=204)
+
+
+class IngredientQueryBudgetTest(QueryBudgetTestCase):
+
+    def test_list(self):
+        self.assertConstant('/api/ingredients/', paged=False)
+        self.assertConstant('/api/ingredients/?name=Ингр', paged=False)
+
+    def test_retrieve(self):
+        self.assertQueries(
+            'get', f'/api/ingredients/{self.ingredients[0].pk}/')
+
+
+class RecipeQueryBudgetTest(QueryBudgetTestCase):
+
+    def recipe_body(self, count=6):
+        return {
+            'ingredients': [
+                {'id': ingredient.pk, 'amount': 10 + number}
+                for number, ingredient in enumerate(self.ingredients[:count])
+            ],
+            'image': IMAGE, 'name': 'Новый рецепт', 'text': 'Описание',
+            'cooking_time': 15,
+        }
+
+    def test_list(self):
+        self.assertConstant('/api/recipes/', budget=4)
+        self.assertConstant('/api/recipes/', self.reader)
+
+    def test_list_filters(self):
+        author = self.authors[0].pk
+        for query, budget in (
+            ('is_favorited=1', None),
+            ('is_in_shopping_cart=1', None),
+            (f'author={author}', 7),
+            ('cursor=', 5),
+            ('search=рецепт&is_favorited=1', None),
+        ):
+            with self.subTest(query=query):
+                self.assertConstant(
+                    f'/api/recipes/?{query}', self.reader, budget=budget)
+
+    def test_search(self):
+        self.assertConstant('/api/recipes/?search=рецепты', budget=4)
+
+    def test_retrieve(self):
+        path = f'/api/recipes/{self.recipes[0].pk}/'
+        self.assertConstant(path, budget=3, paged=False)
+        self.assertConstant(path, self.reader, paged=False)
+
+    def test_create(self):
+        self.assertQueries(
+            'post', '/api/recipes/', self.reader, self.recipe_body(),
+            status=201)
+
+    def test_update(self):
+        path = f'/api/recipes/{self.own_recipe.pk}/'
+        self.assertQueries('put', path, self.reader, self.recipe_body())
+        body = self.recipe_body(3)
+        self.assertQueries('patch', path, self.reader, {
+            'ingredients': body['ingredients'], 'name': 'Новое название'})
+
+    def test_destroy(self):
+        self.assertQueries(
+            'delete', f'/api/recipes/{self.own_recipe.pk}/', self.reader,
+            status=204)
+
+    def test_destroy_with_twice_the_rows(self):
+        self.double()
+        self.assertQueries(
+            'delete', f'/api/recipes/{self.own_recipe.pk}/', self.reader,
+            status=204)
+
+    def test_get_link(self):
+        self.assertQueries(
+            'get', f'/api/recipes/{self.recipes[0].pk}/get-link/')
+
+    def test_favorite_and_cart(self):
+        recipe = self.create_recipe(self.other, self.ingredients[:3])
+        for relation in ('favorite', 'shopping_cart'):
+            path = f'/api/recipes/{recipe.pk}/{relation}/'
+            with self.subTest(relation=relation):
+                self.assertQueries('post', path, self.reader, status=201)
+                self.assertQueries('delete', path, self.reader, status=204)
+
+    def test_bulk(self):
+        self.double()
+        recipe_ids = [recipe.pk for recipe in self.recipes]
+        for relation in ('favorite', 'shopping_cart'):
+            path = f'/api/recipes/{relation}/bulk/'
+            with self.subTest(relation=relation):
+                for method in ('post', 'delete'):
+                    self.assertQueries(
+                        method, path, self.reader, {'recipes': recipe_ids})
+
+    def test_download_shopping_cart(self):
+        for export_format in ('txt', 'csv', 'json'):
+            with self.subTest(format=export_format):
+                self.assertConstant(
+                    '/api/recipes/download_shopping_cart/'
+                    f'?format={export_format}', self.reader, paged=False)
+
+    def test_shopping_cart_clear(self):
+        self.assertQueries(
+            'delete', '/api/recipes/shopping_cart/', self.reader, status=204)
+
+    def test_shopping_cart_clear_with_twice_the_rows(self):
+        self.double()
+        self.assertQueries(
+            'delete', '/api/recipes/shopping_cart/', self.reader, status=204)
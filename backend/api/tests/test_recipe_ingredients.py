@@ -0,0 +1,126 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from recipes import shopping_list
+from recipes.models import IngredientInRecipe, ShoppingCart
+
+from .base import APITestCase
+
+
+class RecipeIngredientEditQueriesTest(APITestCase):
+    """
+    PATCH рецепта трогает только изменившиеся строки ингредиентов,
+    и число запросов не зависит от числа затронутых строк.
+    """
+
+    # Аутентификация, рецепт, его строки, ингредиенты при валидации (2),
+    # savepoint, сохранение рецепта, поисковый индекс (2), текущие строки
+    # рецепта, release. Ответ собирается из записанных строк.
+    BASE_QUERIES = 11
+    # Корзины с рецептом и upsert списка покупок; при уменьшении количеств
+    # ещё чистка нулевых позиций.
+    LIST_GROWS = 2
+    LIST_SHRINKS = 3
+    # bulk_create строк и счётчики ингредиентов.
+    ADD_QUERIES = 2
+    # bulk_update количеств.
+    CHANGE_QUERIES = 1
+    # Выборка удаляемых строк, DELETE, счётчики ингредиентов.
+    REMOVE_QUERIES = 3
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = cls.create_user('author')
+        cls.buyer = cls.create_user('buyer')
+        cls.ingredients = cls.create_ingredients(10)
+        cls.recipe = cls.create_recipe(
+            cls.author, cls.ingredients[:4], amount=10)
+        ShoppingCart.objects.create(user=cls.buyer, recipe=cls.recipe)
+
+    def setUp(self):
+        super().setUp()
+        self.client = self.client_for(self.author)
+        self.url = f'/api/recipes/{self.recipe.pk}/'
+        self.current = dict.fromkeys(self.ingredients[:4], 10)
+
+    def edit(self, amounts, queries):
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.patch(self.url, {'ingredients': [
+                {'id': ingredient.pk, 'amount': amount}
+                for ingredient, amount in amounts.items()
+            ]}, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(
+            len(captured), queries,
+            '\n'.join(query['sql'] for query in captured.captured_queries))
+        self.assertEqual(
+            {row['id']: row['amount'] for row in response.data['ingredients']},
+            {ingredient.pk: amount for ingredient, amount in amounts.items()})
+        # Ответ из записанных строк совпадает с повторным чтением.
+        self.assertEqual(response.data['ingredients'],
+                         self.client.get(self.url).data['ingredients'])
+        self.assertEqual(
+            dict(IngredientInRecipe.objects.filter(recipe=self.recipe)
+                 .values_list('ingredient_id', 'amount')),
+            {ingredient.pk: amount for ingredient, amount in amounts.items()})
+        self.assertEqual(
+            shopping_list.stored_totals([self.buyer.pk]),
+            shopping_list.compute_totals([self.buyer.pk]))
+
+    def test_no_changes(self):
+        self.edit(self.current, self.BASE_QUERIES)
+
+    def test_add_only(self):
+        for count in (1, 3):
+            with self.subTest(count=count):
+                added = dict.fromkeys(self.ingredients[4:4 + count], 5)
+                self.edit(
+                    {**self.current, **added},
+                    self.BASE_QUERIES + self.ADD_QUERIES + self.LIST_GROWS)
+                self.edit(
+                    self.current,
+                    self.BASE_QUERIES + self.REMOVE_QUERIES
+                    + self.LIST_SHRINKS)
+
+    def test_amount_change_only(self):
+        for count in (1, 3):
+            with self.subTest(count=count):
+                changed = dict.fromkeys(self.ingredients[:count], 7)
+                self.edit(
+                    {**self.current, **changed},
+                    self.BASE_QUERIES + self.CHANGE_QUERIES
+                    + self.LIST_SHRINKS)
+                self.edit(
+                    self.current,
+                    self.BASE_QUERIES + self.CHANGE_QUERIES
+                    + self.LIST_GROWS)
+
+    def test_remove_only(self):
+        for count in (1, 3):
+            with self.subTest(count=count):
+                kept = dict.fromkeys(self.ingredients[count:4], 10)
+                self.edit(
+                    kept,
+                    self.BASE_QUERIES + self.REMOVE_QUERIES
+                    + self.LIST_SHRINKS)
+                self.edit(
+                    self.current,
+                    self.BASE_QUERIES + self.ADD_QUERIES + self.LIST_GROWS)
+
+    def test_mixed(self):
+        ingredients = self.ingredients
+        for count in (1, 2):
+            with self.subTest(count=count):
+                mixed = {
+                    **dict.fromkeys(ingredients[count:4], 10),
+                    **dict.fromkeys(ingredients[count:2 * count], 3),
+                    **dict.fromkeys(ingredients[4:4 + count], 5),
+                }
+                # Удалённые строки вычитает из списка покупок сигнал
+                # удаления, остальные изменения применяются вторым пакетом.
+                edit_queries = (
+                    self.BASE_QUERIES + self.REMOVE_QUERIES
+                    + self.CHANGE_QUERIES + self.ADD_QUERIES
+                    + self.LIST_SHRINKS)
+                self.edit(mixed, edit_queries + self.LIST_SHRINKS)
+                self.edit(self.current, edit_queries + self.LIST_GROWS)
@@ -0,0 +1,60 @@
+from django.db import connection
+
+from recipes.models import Recipe
+
+from .base import APITestCase
+
+
+class RecipeSearchTest(APITestCase):
+    """Поиск по словоформам, ранжирование и обновление индекса."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = cls.create_user('author')
+        ingredients = cls.create_ingredients(1)
+        cls.soup = cls.create_recipe(cls.author, ingredients, name='Суп')
+        cls.salad = cls.create_recipe(cls.author, ingredients, name='Салат')
+        cls.salad.text = 'Подавать перед супом.'
+        cls.salad.save()
+        cls.chicken = cls.create_recipe(
+            cls.author, ingredients, name='Куриный суп с лапшой')
+
+    def search(self, query):
+        response = self.client_for().get(
+            '/api/recipes/', {'search': query})
+        self.assertEqual(response.status_code, 200)
+        return [recipe['id'] for recipe in response.data['results']]
+
+    def test_name_ranks_above_text(self):
+        found = self.search('супы')
+        self.assertCountEqual(
+            found, [self.soup.pk, self.salad.pk, self.chicken.pk])
+        self.assertEqual(found[-1], self.salad.pk)
+
+    def test_websearch_syntax(self):
+        self.assertCountEqual(
+            self.search('суп -лапша'), [self.soup.pk, self.salad.pk])
+        self.assertCountEqual(
+            self.search('лапша or салат'), [self.chicken.pk, self.salad.pk])
+        self.assertEqual(self.search('"-"'), [])
+
+    def test_save_reindexes_name_and_text(self):
+        self.soup.name = 'Борщ'
+        self.soup.save(update_fields=['name'])
+        self.assertEqual(self.search('борщ'), [self.soup.pk])
+        self.assertNotIn(self.soup.pk, self.search('суп'))
+
+    def test_save_without_search_fields_skips_index(self):
+        self.soup.cooking_time = 20
+        with self.assertNumQueries(1):
+            self.soup.save(update_fields=['cooking_time'])
+
+    def test_delete_unindexes(self):
+        Recipe.objects.filter(pk=self.chicken.pk).delete()
+        if connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'SELECT count(*) FROM recipes_recipe_search '
+                    'WHERE rowid = %s', [self.chicken.pk])
+                self.assertEqual(cursor.fetchone()[0], 0)
+        self.assertEqual(self.search('лапша'), [])
@@ -0,0 +1,44 @@
+import json
+
+from django.test import override_settings
+
+from .base import APITestCase
+
+
+class RequestMetricsTest(APITestCase):
+    """Метрики запроса в логе и заголовке Server-Timing."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = cls.create_user('author')
+        cls.create_recipe(cls.author, cls.create_ingredients(3))
+
+    def get(self):
+        with self.assertLogs('foodgram.requests') as logs:
+            response = self.client_for().get('/api/recipes/')
+        self.assertEqual(response.status_code, 200)
+        return response, json.loads(logs.records[-1].getMessage())
+
+    def test_log_line(self):
+        response, fields = self.get()
+        self.assertEqual(fields['view'], 'RecipeViewSet')
+        self.assertEqual(fields['action'], 'list')
+        self.assertGreater(fields['queries'], 0)
+        self.assertGreater(fields['view_ms'], 0)
+        self.assertGreater(fields['render_ms'], 0)
+        self.assertEqual(fields['response_bytes'], len(response.content))
+
+    def test_server_timing_off_by_default(self):
+        response, _ = self.get()
+        self.assertFalse(response.has_header('Server-Timing'))
+
+    @override_settings(SERVER_TIMING_HEADER=True)
+    def test_server_timing(self):
+        response, fields = self.get()
+        names = [
+            metric.split(';')[0]
+            for metric in response['Server-Timing'].split(', ')
+        ]
+        self.assertEqual(names, ['total', 'db', 'view', 'render'])
+        self.assertIn(f'desc="{fields["queries"]} SQL"',
+                      response['Server-Timing'])
@@ -0,0 +1,109 @@
+from unittest import mock, skipUnless
+
+from django.test import override_settings
+
+from recipes import shopping_list, shopping_list_export
+from recipes.models import ShoppingCart
+from recipes.shopping_list_export import pdf_available
+
+from .base import APITestCase
+
+
+class ShoppingListDeleteTest(APITestCase):
+    """
+    Удаления корзин и рецептов, в том числе каскадные, вычитаются
+    из сохранённых списков покупок.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = cls.create_user('author')
+        cls.buyers = [cls.create_user(f'buyer{i}') for i in range(3)]
+        ingredients = cls.create_ingredients(6)
+        cls.recipes = [
+            cls.create_recipe(cls.author, ingredients[i:i + 3],
+                              name=f'Рецепт {i}', amount=i + 1)
+            for i in range(4)
+        ]
+        for buyer in cls.buyers:
+            for recipe in cls.recipes:
+                ShoppingCart.objects.create(user=buyer, recipe=recipe)
+
+    def assertListsConsistent(self):
+        user_ids = [buyer.pk for buyer in self.buyers]
+        self.assertEqual(
+            shopping_list.stored_totals(user_ids),
+            shopping_list.compute_totals(user_ids))
+
+    def test_bulk_remove(self):
+        response = self.client_for(self.buyers[0]).delete(
+            '/api/recipes/shopping_cart/bulk/',
+            {'recipes': [self.recipes[0].pk, self.recipes[2].pk]},
+            format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertListsConsistent()
+
+    def test_clear(self):
+        response = self.client_for(self.buyers[0]).delete(
+            '/api/recipes/shopping_cart/')
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(shopping_list.stored_totals([self.buyers[0].pk]), {})
+        self.assertListsConsistent()
+
+    def test_recipe_delete_cascade(self):
+        response = self.client_for(self.author).delete(
+            f'/api/recipes/{self.recipes[1].pk}/')
+        self.assertEqual(response.status_code, 204)
+        self.assertListsConsistent()
+
+    def test_author_delete_cascade(self):
+        self.author.delete()
+        for buyer in self.buyers:
+            self.assertEqual(shopping_list.stored_totals([buyer.pk]), {})
+
+
+@skipUnless(pdf_available, 'reportlab не установлен')
+class ShoppingListPdfCacheTest(APITestCase):
+    """Кешированный PDF меняется вместе со списком покупок."""
+
+    URL = '/api/recipes/download_shopping_cart/?format=pdf'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.buyer = cls.create_user('buyer')
+        cls.ingredients = cls.create_ingredients(3)
+        cls.recipes = [
+            cls.create_recipe(cls.buyer, cls.ingredients[:2], name='Первый'),
+            cls.create_recipe(cls.buyer, cls.ingredients[1:], name='Второй'),
+        ]
+        ShoppingCart.objects.create(user=cls.buyer, recipe=cls.recipes[0])
+
+    def download(self):
+        response = self.client_for(self.buyer).get(self.URL)
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response) if response.streaming else response.content
+
+    def test_cached_until_list_changes(self):
+        first = self.download()
+        self.assertEqual(self.download(), first)
+        ShoppingCart.objects.create(user=self.buyer, recipe=self.recipes[1])
+        second = self.download()
+        self.assertNotEqual(second, first)
+        ShoppingCart.objects.filter(
+            user=self.buyer, recipe=self.recipes[1]).delete()
+        self.assertEqual(self.download(), first)
+
+    def test_ingredient_rename_renders_again(self):
+        first = self.download()
+        ingredient = self.ingredients[0]
+        ingredient.name = 'Переименованный'
+        ingredient.save()
+        self.assertNotEqual(self.download(), first)
+
+    @override_settings(SHOPPING_LIST_PDF_FONT='/nonexistent/font.ttf')
+    def test_missing_font_is_logged(self):
+        with mock.patch.object(
+            shopping_list_export.pdfmetrics, 'getRegisteredFontNames',
+            return_value=[]
+        ), self.assertLogs('foodgram.shopping_list', 'WARNING'):
+            self.download()
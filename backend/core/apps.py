@@ -3,4 +3,8 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
-    verbose_name = 'Основные утилиты'
\ No newline at end of file
+    verbose_name = 'Основные утилиты'
+
+    def ready(self):
+        from .counters import connect_counter_signals
+        connect_counter_signals()
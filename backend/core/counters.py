@@ -0,0 +1,152 @@
+"""
+Denormalized counter columns.
+
+Each ``CounterSpec`` says that rows of ``model`` are counted, grouped by
+``fk_field``, into ``target.field``. Signals keep the columns in sync with
+``F()`` updates on save/delete. Deletes are handled per batch (see
+``core.deletion``), so a queryset delete or a cascade costs one grouped
+UPDATE per counter rather than one per row. The foreign keys a row was
+loaded with are remembered on ``post_init``, so saves do not re-read them.
+``bulk_create`` does not send signals, so callers report bulk inserts with
+``track_bulk_create``.
+"""
+from collections import Counter, defaultdict, namedtuple
+from functools import lru_cache
+
+from django.contrib.auth import get_user_model
+from django.db.models import Case, F, IntegerField, Value, When
+from django.db.models.functions import Greatest
+from django.db.models.signals import post_init, post_save, pre_save
+
+from .deletion import connect_batch_delete
+
+from recipes.models import Favorite, Ingredient, IngredientInRecipe, Recipe
+from users.models import Subscription
+
+User = get_user_model()
+
+CounterSpec = namedtuple('CounterSpec', 'model fk_field target field')
+
+COUNTERS = (
+    CounterSpec(Favorite, 'recipe', Recipe, 'favorites_count'),
+    CounterSpec(IngredientInRecipe, 'ingredient', Ingredient, 'recipes_count'),
+    CounterSpec(Recipe, 'author', User, 'recipes_count'),
+    CounterSpec(Subscription, 'author', User, 'followers_count'),
+)
+
+
+def _specs_for(model):
+    return [spec for spec in COUNTERS if spec.model is model]
+
+
+def _fk_attname(spec):
+    return spec.model._meta.get_field(spec.fk_field).attname
+
+
+def adjust_counter(target, field, pks, delta=1):
+    """
+    Прибавляет delta к счётчику для каждого вхождения pk в pks
+    одним UPDATE на все затронутые строки.
+    """
+    occurrences = Counter(pks)
+    if not occurrences:
+        return
+    by_amount = defaultdict(list)
+    for pk, count in occurrences.items():
+        by_amount[count * delta].append(pk)
+    if len(by_amount) == 1:
+        change = Value(next(iter(by_amount)))
+    else:
+        change = Case(
+            *[When(pk__in=amount_pks, then=Value(amount))
+              for amount, amount_pks in by_amount.items()],
+            output_field=IntegerField()
+        )
+    value = F(field) + change
+    if delta < 0:
+        value = Greatest(value, 0)
+    target.objects.filter(pk__in=list(occurrences)).update(**{field: value})
+
+
+def track_bulk_create(model, objs):
+    for spec in _specs_for(model):
+        attname = _fk_attname(spec)
+        adjust_counter(
+            spec.target, spec.field, [getattr(obj, attname) for obj in objs])
+
+
+@lru_cache(maxsize=None)
+def _fk_attnames(model):
+    return tuple(_fk_attname(spec) for spec in _specs_for(model))
+
+
+def _written_attnames(sender, update_fields):
+    attnames = _fk_attnames(sender)
+    if update_fields is None:
+        return attnames
+    return [
+        attname for attname in attnames
+        if attname in update_fields
+        or sender._meta.get_field(attname).name in update_fields
+    ]
+
+
+def _remember_loaded_fk(sender, instance, **kwargs):
+    # Deferred foreign keys are not in __dict__ and stay unknown (None).
+    instance._counter_loaded_fk = {
+        attname: instance.__dict__.get(attname)
+        for attname in _fk_attnames(sender)
+    }
+
+
+def _remember_previous_fk(sender, instance, raw=False, update_fields=None,
+                          **kwargs):
+    """Читает прежние FK из базы, только если они не были загружены."""
+    if raw or instance._state.adding or instance.pk is None:
+        return
+    loaded = instance._counter_loaded_fk
+    unknown = [
+        attname for attname in _written_attnames(sender, update_fields)
+        if loaded.get(attname) is None
+    ]
+    if unknown:
+        previous = sender.objects.filter(
+            pk=instance.pk).values(*unknown).first()
+        loaded.update(previous or {})
+
+
+def _counted_row_saved(sender, instance, created, raw=False,
+                       update_fields=None, **kwargs):
+    if raw:
+        return
+    loaded = instance._counter_loaded_fk
+    for spec in _specs_for(sender):
+        attname = _fk_attname(spec)
+        current = getattr(instance, attname)
+        if created:
+            adjust_counter(spec.target, spec.field, [current])
+        elif attname in _written_attnames(sender, update_fields):
+            previous = loaded.get(attname)
+            if previous is not None and previous != current:
+                adjust_counter(spec.target, spec.field, [previous], -1)
+                adjust_counter(spec.target, spec.field, [current])
+        else:
+            continue
+        loaded[attname] = current
+
+
+def _counted_rows_deleted(sender, instances, using):
+    for spec in _specs_for(sender):
+        attname = _fk_attname(spec)
+        adjust_counter(
+            spec.target, spec.field,
+            [getattr(instance, attname) for instance in instances], -1
+        )
+
+
+def connect_counter_signals():
+    for model in {spec.model for spec in COUNTERS}:
+        post_init.connect(_remember_loaded_fk, sender=model)
+        pre_save.connect(_remember_previous_fk, sender=model)
+        post_save.connect(_counted_row_saved, sender=model)
+        connect_batch_delete(_counted_rows_deleted, model)
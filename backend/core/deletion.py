@@ -0,0 +1,55 @@
+"""
+Deleted rows delivered per batch instead of per row.
+
+``Collector.delete()`` sends ``pre_delete`` for every collected row before
+it deletes anything, then deletes model by model and sends ``post_delete``
+for the rows of each model right after that model's DELETE. A handler
+registered with ``connect_batch_delete`` is called once per model and
+``delete()`` call, on the first ``post_delete``, with every row of the model
+removed by it: the rows of a queryset delete, and those removed by cascades.
+"""
+import threading
+from collections import defaultdict
+
+from django.db.models.signals import post_delete, pre_delete
+
+_handlers = defaultdict(list)
+_local = threading.local()
+
+
+def _pending():
+    pending = getattr(_local, 'pending', None)
+    if pending is None:
+        pending = _local.pending = {}
+    return pending
+
+
+def _collect(sender, instance, origin=None, **kwargs):
+    pending = _pending()
+    batch = pending.get(sender)
+    # A batch left over from a delete() that failed is simply replaced.
+    if batch is None or batch[0] is not origin:
+        batch = pending[sender] = (origin, [])
+    batch[1].append(instance)
+
+
+def _flush(sender, instance, using, origin=None, **kwargs):
+    pending = _pending()
+    batch = pending.get(sender)
+    if batch is None or batch[0] is not origin:
+        return
+    del pending[sender]
+    for handler in _handlers[sender]:
+        handler(sender, batch[1], using)
+
+
+def connect_batch_delete(handler, sender):
+    """
+    Вызывает handler(sender, instances, using) один раз на пакет
+    удалённых строк модели sender.
+    """
+    if not _handlers[sender]:
+        pre_delete.connect(_collect, sender=sender)
+        post_delete.connect(_flush, sender=sender)
+    if handler not in _handlers[sender]:
+        _handlers[sender].append(handler)
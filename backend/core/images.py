@@ -0,0 +1,101 @@
+"""
+Image renditions.
+
+Every source image gets a fixed-size JPEG thumbnail and a size-capped WebP
+copy. Rendition files are named after the hash of their content, so a URL
+never changes meaning and can be cached forever; identical renditions are
+stored once.
+"""
+import hashlib
+import io
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+
+@dataclass(frozen=True)
+class RenditionSpec:
+    suffix: str
+    format: str
+    extension: str
+    crop: bool
+    options: dict
+
+    def size(self):
+        return tuple(settings.IMAGE_RENDITION_SIZES[self.suffix])
+
+
+RENDITIONS = (
+    RenditionSpec(
+        'thumbnail', 'JPEG', 'jpg', crop=True,
+        options={'quality': 82, 'optimize': True, 'progressive': True}),
+    RenditionSpec('webp', 'WEBP', 'webp', crop=False,
+                  options={'quality': 80, 'method': 4}),
+)
+
+
+def rendition_field_names(source_field):
+    return [f'{source_field}_{spec.suffix}' for spec in RENDITIONS]
+
+
+def _prepare(image, spec):
+    width, height = spec.size()
+    if spec.crop:
+        image = ImageOps.fit(image, (width, height), Image.LANCZOS)
+    elif image.width > width or image.height > height:
+        image = ImageOps.contain(image, (width, height), Image.LANCZOS)
+    if spec.format == 'JPEG' and image.mode != 'RGB':
+        if image.mode in ('RGBA', 'LA', 'P'):
+            image = image.convert('RGBA')
+            background = Image.new('RGB', image.size, 'white')
+            background.paste(image, mask=image.getchannel('A'))
+            return background
+        return image.convert('RGB')
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+    return image
+
+
+def render_renditions(source):
+    """
+    Renders all renditions of an image file object.
+    Returns {suffix: ContentFile} with content-hashed file names.
+    """
+    source.seek(0)
+    with Image.open(source) as image:
+        # JPEGs are decoded at the smallest scale that still covers every
+        # rendition, which keeps large photos from being decoded in full.
+        largest = tuple(map(max, *(spec.size() for spec in RENDITIONS)))
+        image.draft(image.mode, largest)
+        ImageOps.exif_transpose(image, in_place=True)
+        rendered = {}
+        for spec in RENDITIONS:
+            buffer = io.BytesIO()
+            _prepare(image, spec).save(buffer, spec.format, **spec.options)
+            content = buffer.getvalue()
+            digest = hashlib.sha256(content).hexdigest()[:24]
+            rendered[spec.suffix] = ContentFile(
+                content, name=f'{digest}.{spec.extension}')
+    source.seek(0)
+    return rendered
+
+
+def store_renditions(instance, source_field, rendered):
+    """
+    Saves rendered files into the rendition fields of instance
+    without saving the instance itself.
+    """
+    for spec in RENDITIONS:
+        field_file = getattr(instance, f'{source_field}_{spec.suffix}')
+        content = rendered[spec.suffix]
+        name = field_file.field.generate_filename(instance, content.name)
+        if not field_file.storage.exists(name):
+            name = field_file.storage.save(name, content)
+        field_file.name = name
+
+
+def clear_renditions(instance, source_field):
+    for name in rendition_field_names(source_field):
+        getattr(instance, name).name = None
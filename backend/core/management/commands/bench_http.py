@@ -0,0 +1,568 @@
+import http.client
+import io
+import json
+import logging
+import os
+import platform
+import random
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from urllib.parse import urlencode, urlsplit
+
+import django
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from rest_framework.authtoken.models import Token
+
+from recipes.models import Ingredient, Recipe, ShoppingCart
+
+User = get_user_model()
+
+Request = namedtuple('Request', 'endpoint method path token body expected')
+
+# Relative weights of the scripted steps; --mix overrides them.
+DEFAULT_MIX = {
+    'feed': 30,
+    'feed_favorited': 10,
+    'feed_author': 10,
+    'ingredient_autocomplete': 20,
+    'subscriptions': 10,
+    'cart_toggle': 10,
+    'shopping_list_download': 10,
+}
+
+
+class TrafficPlan:
+    """
+    Builds a reproducible schedule of steps from the seeded database.
+    A step is a short sequence of requests made by one client in order.
+    """
+
+    def __init__(self, rnd, users_count):
+        self.rnd = rnd
+        user_ids = list(
+            User.objects.filter(is_active=True).order_by('pk')
+            .values_list('pk', flat=True))
+        if not user_ids:
+            raise CommandError(
+                'The database has no users; run seed_data first.')
+        self.recipe_ids = list(
+            Recipe.objects.order_by('pk').values_list('pk', flat=True))
+        if not self.recipe_ids:
+            raise CommandError(
+                'The database has no recipes; run seed_data first.')
+        self.author_ids = list(
+            User.objects.filter(recipes_count__gt=0)
+            .order_by('-recipes_count', 'pk')
+            .values_list('pk', flat=True)[:200])
+        names = Ingredient.objects.order_by('pk').values_list(
+            'name', flat=True)
+        self.prefixes = sorted({
+            name[:length].lower() for name in names for length in (1, 2, 3)
+            if len(name) >= length
+        })
+
+        self.users = rnd.sample(user_ids, min(users_count, len(user_ids)))
+        self.tokens = {}
+        # Tokens made for the run are deleted by cleanup(); tokens the
+        # users already had are left as they were.
+        self.created_tokens = []
+        for user_id in self.users:
+            token, created = Token.objects.get_or_create(user_id=user_id)
+            self.tokens[user_id] = token.key
+            if created:
+                self.created_tokens.append(token.key)
+        self.carts = defaultdict(set)
+        for user_id, recipe_id in ShoppingCart.objects.filter(
+                user_id__in=self.users).values_list('user_id', 'recipe_id'):
+            self.carts[user_id].add(recipe_id)
+
+    def cleanup(self):
+        Token.objects.filter(key__in=self.created_tokens).delete()
+        self.created_tokens = []
+
+    def schedule(self, mix, steps):
+        names = [name for name, weight in mix.items() if weight > 0]
+        weights = [mix[name] for name in names]
+        return [
+            getattr(self, name)()
+            for name in self.rnd.choices(names, weights=weights, k=steps)
+        ]
+
+    def _token(self):
+        return self.tokens[self.rnd.choice(self.users)]
+
+    def _page(self):
+        # Most readers stay on the first pages.
+        return min(int(self.rnd.expovariate(0.7)) + 1, 20)
+
+    def feed(self):
+        return [Request('feed', 'GET', f'/api/recipes/?page={self._page()}',
+                        None, None, 200)]
+
+    def feed_favorited(self):
+        return [Request('feed_favorited', 'GET',
+                        '/api/recipes/?is_favorited=1',
+                        self._token(), None, 200)]
+
+    def feed_author(self):
+        author_id = self.rnd.choice(self.author_ids or self.users)
+        return [Request('feed_author', 'GET',
+                        f'/api/recipes/?author={author_id}',
+                        self._token(), None, 200)]
+
+    def ingredient_autocomplete(self):
+        query = urlencode({'name': self.rnd.choice(self.prefixes)})
+        return [Request('ingredient_autocomplete', 'GET',
+                        f'/api/ingredients/?{query}', None, None, 200)]
+
+    def subscriptions(self):
+        return [Request('subscriptions', 'GET',
+                        '/api/users/subscriptions/?recipes_limit=3',
+                        self._token(), None, 200)]
+
+    def cart_toggle(self):
+        """
+        Adds a recipe to the cart and removes it again. A (user, recipe)
+        pair is used once per run, so concurrent steps never collide.
+        """
+        user_id = self.rnd.choice(self.users)
+        cart = self.carts[user_id]
+        recipe_id = self.rnd.choice(self.recipe_ids)
+        while recipe_id in cart:
+            recipe_id = self.rnd.choice(self.recipe_ids)
+        cart.add(recipe_id)
+        token = self.tokens[user_id]
+        path = f'/api/recipes/{recipe_id}/shopping_cart/'
+        return [
+            Request('cart_add', 'POST', path, token, None, 201),
+            Request('cart_remove', 'DELETE', path, token, None, 204),
+        ]
+
+    def shopping_list_download(self):
+        return [Request('shopping_list_download', 'GET',
+                        '/api/recipes/download_shopping_cart/',
+                        self._token(), None, 200)]
+
+
+class WSGITransport:
+    """Calls the application from foodgram/wsgi.py in this process."""
+
+    def __init__(self):
+        from foodgram.wsgi import application
+
+        self.application = application
+        hosts = [host for host in settings.ALLOWED_HOSTS if host != '*']
+        self.host = hosts[0].lstrip('.') if hosts else 'localhost'
+
+    def send(self, request):
+        body = b''
+        if request.body is not None:
+            body = json.dumps(request.body).encode()
+        path, _, query = request.path.partition('?')
+        environ = {
+            'REQUEST_METHOD': request.method,
+            'SCRIPT_NAME': '',
+            'PATH_INFO': path,
+            'QUERY_STRING': query,
+            'SERVER_NAME': self.host,
+            'SERVER_PORT': '80',
+            'SERVER_PROTOCOL': 'HTTP/1.1',
+            'HTTP_HOST': self.host,
+            'CONTENT_TYPE': 'application/json',
+            'CONTENT_LENGTH': str(len(body)),
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': 'http',
+            'wsgi.input': io.BytesIO(body),
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': False,
+            'wsgi.run_once': False,
+        }
+        if request.token:
+            environ['HTTP_AUTHORIZATION'] = f'Token {request.token}'
+        status = []
+
+        def start_response(code, headers, exc_info=None):
+            status.append(code)
+
+        result = self.application(environ, start_response)
+        try:
+            for _ in result:
+                pass
+        finally:
+            if hasattr(result, 'close'):
+                result.close()
+        return int(status[0].split()[0])
+
+    def close(self):
+        pass
+
+
+class HTTPTransport:
+    """Keep-alive HTTP connection per client thread."""
+
+    def __init__(self, url):
+        parts = urlsplit(url)
+        if parts.scheme != 'http' or not parts.hostname:
+            raise CommandError(f'Unsupported --url: {url}')
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.prefix = parts.path.rstrip('/')
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+
+    def _connection(self):
+        conn = getattr(self._local, 'connection', None)
+        if conn is None:
+            conn = http.client.HTTPConnection(self.host, self.port, timeout=60)
+            self._local.connection = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def send(self, request):
+        headers = {}
+        body = None
+        if request.token:
+            headers['Authorization'] = f'Token {request.token}'
+        if request.body is not None:
+            body = json.dumps(request.body).encode()
+            headers['Content-Type'] = 'application/json'
+        conn = self._connection()
+        path = self.prefix + request.path
+        try:
+            conn.request(request.method, path, body, headers)
+            response = conn.getresponse()
+            response.read()
+        except (http.client.HTTPException, OSError):
+            # A worker closed the idle connection; retry once on a new one.
+            conn.close()
+            conn.request(request.method, path, body, headers)
+            response = conn.getresponse()
+            response.read()
+        if response.will_close:
+            conn.close()
+        return response.status
+
+    def close(self):
+        for conn in self._connections:
+            conn.close()
+
+
+def summarize(latencies, errors, elapsed):
+    """Latency percentiles in milliseconds and throughput in requests/s."""
+    timings = sorted(latencies)
+    summary = {
+        'requests': len(timings),
+        'errors': errors,
+        'throughput_rps': (
+            round(len(timings) / elapsed, 2) if elapsed else None),
+    }
+    if not timings:
+        return summary
+    if len(timings) > 1:
+        cuts = statistics.quantiles(timings, n=100, method='inclusive')
+        p50, p95, p99 = cuts[49], cuts[94], cuts[98]
+    else:
+        p50 = p95 = p99 = timings[0]
+    summary.update({
+        'mean_ms': round(statistics.fmean(timings) * 1000, 3),
+        'p50_ms': round(p50 * 1000, 3),
+        'p95_ms': round(p95 * 1000, 3),
+        'p99_ms': round(p99 * 1000, 3),
+        'max_ms': round(timings[-1] * 1000, 3),
+    })
+    return summary
+
+
+class Command(BaseCommand):
+    help = (
+        'Drives a reproducible traffic mix against the API (in-process WSGI, '
+        'a spawned gunicorn or a running server) and reports throughput and '
+        'latency percentiles per endpoint as JSON'
+    )
+
+    def add_arguments(self, parser):
+        target = parser.add_mutually_exclusive_group()
+        target.add_argument(
+            '--url',
+            help='Benchmark a running server, e.g. http://127.0.0.1:8000',
+        )
+        target.add_argument(
+            '--gunicorn-workers',
+            type=int,
+            help='Start gunicorn with foodgram.wsgi and gunicorn.conf.py '
+                 'with this many workers',
+        )
+        parser.add_argument(
+            '--gunicorn-threads',
+            type=int,
+            default=1,
+            help='Threads per gunicorn worker (gthread when above 1)',
+        )
+        parser.add_argument(
+            '--steps',
+            type=int,
+            default=2000,
+            help='Scripted steps to run; a cart toggle step is two requests',
+        )
+        parser.add_argument(
+            '--warmup',
+            type=int,
+            default=100,
+            help='Steps run before timing starts',
+        )
+        parser.add_argument(
+            '--duration',
+            type=float,
+            help='Stop after this many seconds even if steps remain',
+        )
+        parser.add_argument('--concurrency', type=int, default=4)
+        parser.add_argument(
+            '--users',
+            type=int,
+            default=50,
+            help='Seeded users making authenticated steps; missing tokens '
+                 'are created for the run and deleted afterwards',
+        )
+        parser.add_argument(
+            '--mix',
+            action='append',
+            default=[],
+            metavar='STEP=WEIGHT',
+            help=f'Override a step weight; steps: {", ".join(DEFAULT_MIX)}',
+        )
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument(
+            '--output',
+            help='Write the JSON report to this file instead of stdout',
+        )
+
+    def handle(self, *args, **options):
+        for name in ('steps', 'concurrency', 'users'):
+            if options[name] < 1:
+                raise CommandError(f'--{name} must be positive.')
+        mix = self._parse_mix(options['mix'])
+        rnd = random.Random(options['seed'])
+        plan = TrafficPlan(rnd, options['users'])
+        try:
+            results, elapsed, target, started_at = self._benchmark(
+                plan, mix, options)
+        finally:
+            plan.cleanup()
+
+        report = self._report(
+            results, elapsed, options, mix, target, started_at)
+        payload = json.dumps(report, ensure_ascii=False, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(payload + '\n')
+            rows = {**report['endpoints'], 'total': report['total']}
+            for endpoint, summary in rows.items():
+                self.stdout.write(
+                    f'{endpoint:>24}: {summary["requests"]:>6} req, '
+                    f'{summary["throughput_rps"] or 0:>8.1f} rps, '
+                    f'p50 {summary.get("p50_ms", 0):>8.2f} ms, '
+                    f'p95 {summary.get("p95_ms", 0):>8.2f} ms, '
+                    f'p99 {summary.get("p99_ms", 0):>8.2f} ms, '
+                    f'{summary["errors"]} errors'
+                )
+            self.stdout.write(self.style.SUCCESS(
+                f'Report written to {options["output"]}'))
+        else:
+            self.stdout.write(payload)
+        if settings.DEBUG:
+            self.stderr.write(self.style.WARNING(
+                'DEBUG is on: every SQL query is recorded, which skews the '
+                'numbers. Set DJANGO_DEBUG=False for comparable runs.'))
+
+    def _benchmark(self, plan, mix, options):
+        warmup = plan.schedule(mix, options['warmup'])
+        steps = plan.schedule(mix, options['steps'])
+        connection.close()
+
+        server = None
+        if options['gunicorn_workers']:
+            server, url = self._start_gunicorn(options)
+            transport = HTTPTransport(url)
+            target = 'gunicorn'
+        elif options['url']:
+            transport = HTTPTransport(options['url'])
+            target = 'url'
+        else:
+            transport = WSGITransport()
+            target = 'wsgi'
+        # One log line per request would be measured along with the API.
+        logging.disable(logging.INFO)
+        try:
+            self._run(transport, warmup, options['concurrency'], None)
+            started_at = datetime.now(timezone.utc)
+            results, elapsed = self._run(
+                transport, steps, options['concurrency'], options['duration'])
+        finally:
+            logging.disable(logging.NOTSET)
+            transport.close()
+            if server is not None:
+                self._stop_gunicorn(server)
+        return results, elapsed, target, started_at
+
+    def _parse_mix(self, overrides):
+        mix = dict(DEFAULT_MIX)
+        for override in overrides:
+            name, _, weight = override.partition('=')
+            if name not in mix:
+                raise CommandError(f'Unknown step in --mix: {name}')
+            try:
+                mix[name] = float(weight)
+            except ValueError:
+                raise CommandError(f'Invalid weight in --mix: {override}')
+        if not any(weight > 0 for weight in mix.values()):
+            raise CommandError('--mix leaves no steps to run.')
+        return mix
+
+    def _run(self, transport, steps, concurrency, duration):
+        """Runs steps on concurrency client threads, in schedule order."""
+        latencies = defaultdict(list)
+        statuses = defaultdict(Counter)
+        errors = Counter()
+        lock = threading.Lock()
+        position = iter(range(len(steps)))
+        started = time.perf_counter()
+        deadline = started + duration if duration else None
+
+        def client():
+            while deadline is None or time.perf_counter() < deadline:
+                with lock:
+                    index = next(position, None)
+                if index is None:
+                    return
+                for request in steps[index]:
+                    request_started = time.perf_counter()
+                    try:
+                        status = transport.send(request)
+                    except Exception as error:
+                        status = type(error).__name__
+                    took = time.perf_counter() - request_started
+                    with lock:
+                        latencies[request.endpoint].append(took)
+                        statuses[request.endpoint][status] += 1
+                        if status != request.expected:
+                            errors[request.endpoint] += 1
+
+        with ThreadPoolExecutor(concurrency) as pool:
+            for future in [pool.submit(client) for _ in range(concurrency)]:
+                future.result()
+        elapsed = time.perf_counter() - started
+        return (latencies, statuses, errors), elapsed
+
+    def _report(self, results, elapsed, options, mix, target, started_at):
+        latencies, statuses, errors = results
+        endpoints = {}
+        for endpoint in sorted(latencies):
+            summary = summarize(latencies[endpoint], errors[endpoint], elapsed)
+            summary['statuses'] = {
+                str(status): count
+                for status, count in statuses[endpoint].items()
+            }
+            endpoints[endpoint] = summary
+        everything = [
+            took for timings in latencies.values() for took in timings]
+        return {
+            'meta': {
+                'started_at': started_at.isoformat(),
+                'commit': self._git_commit(),
+                'target': target,
+                'url': options['url'],
+                'gunicorn_workers': options['gunicorn_workers'],
+                'gunicorn_threads': (
+                    options['gunicorn_threads']
+                    if options['gunicorn_workers'] else None),
+                'database': connection.vendor,
+                'debug': settings.DEBUG,
+                'concurrency': options['concurrency'],
+                'steps': options['steps'],
+                'warmup': options['warmup'],
+                'seed': options['seed'],
+                'mix': mix,
+                'duration_s': round(elapsed, 3),
+                'python': platform.python_version(),
+                'django': django.get_version(),
+            },
+            'total': summarize(everything, sum(errors.values()), elapsed),
+            'endpoints': endpoints,
+        }
+
+    @staticmethod
+    def _git_commit():
+        try:
+            return subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+                capture_output=True, text=True, check=True,
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    def _start_gunicorn(self, options):
+        with socket.socket() as probe:
+            probe.bind(('127.0.0.1', 0))
+            port = probe.getsockname()[1]
+        metrics_dir = tempfile.mkdtemp(prefix='foodgram-bench-')
+        # Keep the benchmark's metrics away from a server running next to it.
+        env = {**os.environ, 'PROMETHEUS_MULTIPROC_DIR': metrics_dir}
+        log = tempfile.TemporaryFile()
+        command = [
+            sys.executable, '-m', 'gunicorn', 'foodgram.wsgi:application',
+            '--config', str(settings.BASE_DIR / 'gunicorn.conf.py'),
+            '--bind', f'127.0.0.1:{port}',
+            '--workers', str(options['gunicorn_workers']),
+            '--threads', str(options['gunicorn_threads']),
+        ]
+        server = subprocess.Popen(
+            command, cwd=settings.BASE_DIR, env=env, stdout=log, stderr=log)
+        server.log = log
+        server.metrics_dir = metrics_dir
+        deadline = time.monotonic() + 60
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                log.seek(0)
+                raise CommandError(
+                    'gunicorn exited during startup:\n'
+                    + log.read().decode(errors='replace'))
+            try:
+                with socket.create_connection(('127.0.0.1', port), timeout=1):
+                    break
+            except OSError:
+                time.sleep(0.2)
+        else:
+            self._stop_gunicorn(server)
+            raise CommandError(
+                'gunicorn did not start listening within 60 seconds.')
+        self.stderr.write(
+            f'gunicorn started on 127.0.0.1:{port} with '
+            f'{options["gunicorn_workers"]} worker(s) x '
+            f'{options["gunicorn_threads"]} thread(s)')
+        return server, f'http://127.0.0.1:{port}'
+
+    @staticmethod
+    def _stop_gunicorn(server):
+        server.terminate()
+        try:
+            server.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            server.kill()
+            server.wait()
+        server.log.close()
+        shutil.rmtree(server.metrics_dir, ignore_errors=True)
@@ -0,0 +1,139 @@
+import base64
+import json
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from django.core.management.base import BaseCommand, CommandError
+from drf_extra_fields.fields import Base64ImageField
+from PIL import Image
+
+from api.fields import ImageUploadField
+from core.images import render_renditions
+
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+
+def _read_status(field):
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith(field + ':'):
+                return int(line.split()[1]) * 1024
+    raise CommandError(f'{field} is not available in /proc/self/status')
+
+
+def _reset_peak_rss():
+    with open('/proc/self/clear_refs', 'w') as f:
+        f.write('5')
+
+
+def _ingest(mode, path, with_renditions):
+    """One upload as the API performs it, from the request body to the file."""
+    if mode == 'multipart':
+        # MultiPartParser streams the file part to a temporary file.
+        upload = TemporaryUploadedFile('upload.jpg', 'image/jpeg', 0, None)
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(UPLOAD_CHUNK_SIZE), b''):
+                upload.write(chunk)
+                upload.size += len(chunk)
+        upload.seek(0)
+        image = ImageUploadField().run_validation(upload)
+    else:
+        with open(path, 'rb') as f:
+            body = f.read()
+        payload = json.loads(body)['image']
+        field = Base64ImageField() if mode == 'legacy' else ImageUploadField()
+        image = field.run_validation(payload)
+    if with_renditions:
+        render_renditions(image)
+
+
+def _measure(mode, path, with_renditions):
+    _reset_peak_rss()
+    baseline = _read_status('VmRSS')
+    started = time.perf_counter()
+    _ingest(mode, path, with_renditions)
+    return _read_status('VmHWM') - baseline, time.perf_counter() - started
+
+
+class Command(BaseCommand):
+    help = (
+        'Measures the peak RSS added by one image upload: the old base64 '
+        'field, the chunked base64 field and the multipart path'
+    )
+
+    MODES = ('legacy', 'base64', 'multipart')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--width', type=int, default=4000)
+        parser.add_argument('--height', type=int, default=3000)
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=3,
+            help='Runs per mode; each run uses a fresh worker process',
+        )
+        parser.add_argument(
+            '--mode',
+            choices=self.MODES,
+            action='append',
+            dest='modes',
+        )
+        parser.add_argument(
+            '--with-renditions',
+            action='store_true',
+            help='Also render the thumbnail and WebP renditions of the upload',
+        )
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        if not os.path.exists('/proc/self/clear_refs'):
+            raise CommandError(
+                'Peak RSS is measured through /proc; Linux only.')
+
+        with tempfile.TemporaryDirectory() as tmp:
+            image_path, body_path = self._make_inputs(tmp, options)
+            self.stdout.write(
+                f'Image {options["width"]}x{options["height"]} JPEG: '
+                f'{os.path.getsize(image_path) / 2**20:.1f} MB, '
+                f'JSON body {os.path.getsize(body_path) / 2**20:.1f} MB'
+            )
+            context = multiprocessing.get_context('fork')
+            for mode in options['modes'] or self.MODES:
+                path = image_path if mode == 'multipart' else body_path
+                peaks, timings = [], []
+                for _ in range(options['repeat']):
+                    with context.Pool(1) as pool:
+                        peak, elapsed = pool.apply(
+                            _measure, (mode, path, options['with_renditions']))
+                    peaks.append(peak)
+                    timings.append(elapsed)
+                self.stdout.write(self.style.SUCCESS(
+                    f'{mode:>9}: peak +{max(peaks) / 2**20:,.1f} MB RSS '
+                    f'(min +{min(peaks) / 2**20:,.1f} MB), '
+                    f'{min(timings) * 1000:,.0f} ms'
+                ))
+
+    def _make_inputs(self, tmp, options):
+        # Noise keeps the JPEG close to a real photo in size.
+        rnd = random.Random(options['seed'])
+        width, height = options['width'], options['height']
+        noise = rnd.randbytes(64 * 64 * 3)
+        tile = Image.frombytes('RGB', (64, 64), noise).resize(
+            (256, 256), Image.BILINEAR)
+        image = Image.new('RGB', (width, height))
+        for x in range(0, width, 256):
+            for y in range(0, height, 256):
+                image.paste(tile, (x, y))
+        image_path = os.path.join(tmp, 'upload.jpg')
+        image.save(image_path, 'JPEG', quality=85)
+
+        body_path = os.path.join(tmp, 'body.json')
+        with open(image_path, 'rb') as f:
+            encoded = base64.b64encode(f.read()).decode()
+        with open(body_path, 'w') as f:
+            json.dump({'image': f'data:image/jpeg;base64,{encoded}'}, f)
+        return image_path, body_path
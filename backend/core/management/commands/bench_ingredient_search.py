@@ -0,0 +1,133 @@
+import csv
+import random
+import statistics
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test.utils import override_settings
+
+from recipes.ingredient_index import (
+    get_ingredient_index, invalidate_ingredient_index,
+)
+from recipes.models import Ingredient
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmarks ingredient autocomplete: ORM istartswith vs the in-memory '
+        'prefix index, timed end to end with its version check. Data is '
+        'loaded inside a transaction that is rolled back.'
+    )
+
+    BASE_DIR = Path(__file__).resolve().parent.parent.parent.parent.parent
+    DEFAULT_CSV_FILE = BASE_DIR / 'data' / 'ingredients.csv'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--csvfile',
+            type=str,
+            default=str(self.DEFAULT_CSV_FILE),
+            help='CSV catalog used as the base data set',
+        )
+        parser.add_argument(
+            '--rows',
+            type=int,
+            default=0,
+            help='Generate a synthetic catalog of this size instead of '
+                 'the CSV',
+        )
+        parser.add_argument(
+            '--queries',
+            type=int,
+            default=200,
+            help='Number of autocomplete prefixes to time',
+        )
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        csv_path = Path(options['csvfile'])
+        if not csv_path.exists():
+            raise CommandError(f'CSV file not found at: {csv_path}')
+        with open(csv_path, encoding='utf-8') as f:
+            base = [
+                (row[0].strip(), row[1].strip())
+                for row in csv.reader(f) if len(row) >= 2
+            ]
+
+        rnd = random.Random(options['seed'])
+        rows = base
+        if options['rows']:
+            rows = [
+                (f'{name} {i}', unit)
+                for i, (name, unit) in zip(
+                    range(options['rows']), self._cycle(base))
+            ]
+        prefixes = [
+            name[:rnd.randint(1, 4)]
+            for name, _ in rnd.choices(base, k=options['queries'])
+        ]
+
+        try:
+            with transaction.atomic():
+                Ingredient.objects.all().delete()
+                started = time.perf_counter()
+                Ingredient.objects.bulk_create(
+                    (
+                        Ingredient(name=name, measurement_unit=unit)
+                        for name, unit in rows
+                    ),
+                    batch_size=5000
+                )
+                self.stdout.write(
+                    f'Loaded {len(rows)} rows in '
+                    f'{time.perf_counter() - started:.1f}s'
+                )
+
+                invalidate_ingredient_index()
+                started = time.perf_counter()
+                index = get_ingredient_index()
+                self.stdout.write(
+                    f'Index built over {len(index)} rows in '
+                    f'{(time.perf_counter() - started) * 1000:.1f} ms'
+                )
+
+                self._report('orm', prefixes, lambda prefix: list(
+                    Ingredient.objects.filter(
+                        name__istartswith=prefix
+                    ).values('id', 'name', 'measurement_unit')
+                ))
+                # What a request pays: the version check included.
+                self._report('index', prefixes, lambda prefix: (
+                    get_ingredient_index().search(prefix)))
+                # Worst case: the shared version is read on every lookup.
+                with override_settings(INGREDIENT_VERSION_CHECK_INTERVAL=0):
+                    self._report('check', prefixes, lambda prefix: (
+                        get_ingredient_index().search(prefix)))
+                raise _Rollback
+        except _Rollback:
+            pass
+        finally:
+            invalidate_ingredient_index()
+
+    def _cycle(self, base):
+        while True:
+            yield from base
+
+    def _report(self, label, prefixes, search):
+        timings = []
+        for prefix in prefixes:
+            started = time.perf_counter()
+            search(prefix)
+            timings.append((time.perf_counter() - started) * 1_000_000)
+        timings.sort()
+        self.stdout.write(self.style.SUCCESS(
+            f'{label:>6}: mean {statistics.fmean(timings):,.1f} us, '
+            f'p50 {timings[len(timings) // 2]:,.1f} us, '
+            f'p95 {timings[int(len(timings) * 0.95)]:,.1f} us'
+        ))
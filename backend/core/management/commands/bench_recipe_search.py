@@ -0,0 +1,78 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Q
+
+from recipes.models import Recipe
+from recipes.search import search_recipes
+
+DEFAULT_QUERIES = (
+    'пирог',
+    'сливочный суп',
+    'духовке',
+    'зеленью',
+    'пирог or кекс',
+    'грибы',
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmarks recipe search on the current database: name/text '
+        'icontains against the full-text index, counting matches and '
+        'fetching the first page as /api/recipes/?search= does. '
+        'Fill the database first, e.g. seed_data --recipes 1000000.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--query',
+            action='append',
+            dest='queries',
+            help='Search query to time (may be repeated)',
+        )
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--page-size', type=int, default=10)
+        parser.add_argument(
+            '--explain',
+            action='store_true',
+            help='Print the plan of each full-text query',
+        )
+
+    def handle(self, *args, **options):
+        if options['repeat'] < 1:
+            raise CommandError('--repeat must be a positive integer.')
+        total = Recipe.objects.count()
+        if not total:
+            raise CommandError('No recipes to search; run seed_data first.')
+        self.stdout.write(f'{total:,} recipes on {connection.vendor}')
+
+        for query in options['queries'] or DEFAULT_QUERIES:
+            baseline = Recipe.objects.filter(
+                Q(name__icontains=query) | Q(text__icontains=query)
+            ).order_by('-pub_date', 'id')
+            ranked = search_recipes(Recipe.objects.all(), query)
+            variants = (('icontains', baseline), ('full-text', ranked))
+            for label, queryset in variants:
+                hits, timings = self._measure(
+                    queryset, options['page_size'], options['repeat'])
+                self.stdout.write(
+                    f'{query!r:>18} {label:>9}: {hits:>9,} hits, '
+                    f'median {statistics.median(timings):>9,.1f} ms, '
+                    f'min {min(timings):>9,.1f} ms'
+                )
+            if options['explain']:
+                self.stdout.write(ranked[:options['page_size']].explain())
+
+    @staticmethod
+    def _measure(queryset, page_size, repeat):
+        """Время COUNT(*) плюс первой страницы, как у пагинатора, в мс."""
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            hits = queryset.count()
+            list(queryset.values_list('pk', flat=True)[:page_size])
+            timings.append((time.perf_counter() - started) * 1000)
+        return hits, timings
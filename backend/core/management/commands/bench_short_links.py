@@ -0,0 +1,87 @@
+import random
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import Client, RequestFactory
+
+from recipes import short_links
+from recipes.models import Recipe, ShortLink
+from recipes.views import short_link_redirect
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmarks /s/<code> redirects on LRU misses and hits. Recipes and '
+        'codes are created inside a transaction that is rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=20_000)
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=2_000,
+            help='Number of redirects timed per scenario',
+        )
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rnd = random.Random(options['seed'])
+        try:
+            with transaction.atomic():
+                author = get_user_model().objects.create(
+                    email='bench-short-links@example.org',
+                    username='bench-short-links'
+                )
+                Recipe.objects.bulk_create(
+                    (Recipe(author=author, name=f'Рецепт {i}', text='-',
+                            cooking_time=1, image='recipes/images/bench.png')
+                     for i in range(options['recipes'])),
+                    batch_size=5000
+                )
+                call_command('generate_short_links', stdout=self.stdout)
+                codes = list(ShortLink.objects.values_list('code', flat=True))
+                sample = rnd.choices(codes, k=options['requests'])
+                factory = RequestFactory()
+
+                short_links._codes.clear()
+
+                def view(code):
+                    return short_link_redirect(
+                        factory.get(f'/s/{code}'), code)
+
+                self._report('view, miss', sample, view)
+                self._report('view, hit', sample, view)
+                client = Client(
+                    HTTP_HOST=(settings.ALLOWED_HOSTS or ['localhost'])[0])
+                self._report('client, hit', sample,
+                             lambda code: client.get(f'/s/{code}'))
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def _report(self, label, codes, redirect):
+        timings = []
+        for code in codes:
+            started = time.perf_counter()
+            response = redirect(code)
+            timings.append((time.perf_counter() - started) * 1_000_000)
+            if response.status_code != 302:
+                raise CommandError(
+                    f'/s/{code} answered {response.status_code}, '
+                    'expected a 302 redirect.')
+        timings.sort()
+        self.stdout.write(self.style.SUCCESS(
+            f'{label:>12}: mean {statistics.fmean(timings):,.1f} us, '
+            f'p50 {timings[len(timings) // 2]:,.1f} us, '
+            f'p99 {timings[int(len(timings) * 0.99)]:,.1f} us'
+        ))
@@ -0,0 +1,87 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from PIL import UnidentifiedImageError
+
+from core.images import (
+    render_renditions, rendition_field_names, store_renditions,
+)
+from recipes.models import Recipe
+
+SOURCES = {
+    'recipes': (Recipe, 'image'),
+    'users': (get_user_model(), 'avatar'),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Generates the thumbnail and WebP renditions for existing recipe '
+        'images and avatars that do not have them yet'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--model',
+            choices=sorted(SOURCES),
+            action='append',
+            dest='models',
+            help='Limit to recipes or users (may be repeated)',
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Re-render renditions that already exist',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=200,
+            help='Number of rows rendered and updated per batch',
+        )
+
+    def handle(self, *args, **options):
+        for key in options['models'] or sorted(SOURCES):
+            model, source_field = SOURCES[key]
+            rendered, failed = self._backfill(
+                model, source_field, options['batch_size'], options['force'])
+            self.stdout.write(self.style.SUCCESS(
+                f'{key}: rendered {rendered} images, {failed} failed.'))
+
+    def _backfill(self, model, source_field, batch_size, force):
+        fields = rendition_field_names(source_field)
+        queryset = model.objects.exclude(
+            Q(**{source_field: ''}) | Q(**{f'{source_field}__isnull': True})
+        )
+        if not force:
+            queryset = queryset.filter(**{fields[0]: ''})
+        queryset = queryset.only('pk', source_field, *fields).order_by('pk')
+
+        rendered = failed = 0
+        last_pk = None
+        while True:
+            page = queryset
+            if last_pk is not None:
+                page = queryset.filter(pk__gt=last_pk)
+            batch = list(page[:batch_size])
+            if not batch:
+                return rendered, failed
+            last_pk = batch[-1].pk
+            updated = []
+            for obj in batch:
+                source = getattr(obj, source_field)
+                try:
+                    with source.open('rb'):
+                        store_renditions(
+                            obj, source_field, render_renditions(source))
+                except (OSError, UnidentifiedImageError) as e:
+                    failed += 1
+                    self.stdout.write(self.style.WARNING(
+                        f'Skipping {model.__name__} {obj.pk} '
+                        f'({source.name}): {e}'))
+                    continue
+                updated.append(obj)
+            model.objects.bulk_update(updated, fields)
+            rendered += len(updated)
+            self.stdout.write(
+                f'  {model.__name__}: {rendered} rendered so far')
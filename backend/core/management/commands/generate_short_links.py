@@ -0,0 +1,56 @@
+from django.core.management.base import BaseCommand
+
+from recipes.models import Recipe, ShortLink
+from recipes.short_links import generate_code
+
+
+class Command(BaseCommand):
+    help = 'Creates short link codes for all recipes that do not have one yet'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Number of codes inserted per statement',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        created = 0
+        last_pk = 0
+        while True:
+            recipe_ids = list(
+                Recipe.objects.filter(pk__gt=last_pk, short_link__isnull=True)
+                .order_by('pk').values_list('pk', flat=True)[:batch_size]
+            )
+            if not recipe_ids:
+                break
+            created += self._create(recipe_ids)
+            last_pk = recipe_ids[-1]
+            self.stdout.write(f'  {created:,} codes created')
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {created} short links.'))
+
+    def _create(self, recipe_ids):
+        """
+        Inserts codes with ON CONFLICT DO NOTHING and retries the recipes
+        whose random code collided with an existing one.
+        """
+        created = 0
+        pending = recipe_ids
+        while pending:
+            codes = set()
+            while len(codes) < len(pending):
+                codes.add(generate_code())
+            ShortLink.objects.bulk_create(
+                [ShortLink(code=code, recipe_id=recipe_id)
+                 for code, recipe_id in zip(codes, pending)],
+                ignore_conflicts=True
+            )
+            linked = set(ShortLink.objects.filter(
+                recipe_id__in=pending).values_list('recipe_id', flat=True))
+            created += len(linked)
+            pending = [
+                recipe_id for recipe_id in pending if recipe_id not in linked]
+        return created
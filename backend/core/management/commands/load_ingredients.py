@@ -1,10 +1,81 @@
 import json
 import csv
+import io
+import time
 from pathlib import Path
 from django.core.management.base import BaseCommand, CommandError
-from django.db import IntegrityError, transaction
+from django.db import IntegrityError, connection, transaction
+from recipes.ingredient_index import bump_catalog_version
 from recipes.models import Ingredient
 
+
+def iter_json_array(f, chunk_size=1 << 16):
+    """
+    Incrementally yields the items of a top-level JSON array
+    without reading the whole file into memory. Items must be separated
+    by exactly one comma, as in json.load.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ''
+    pos = 0
+    eof = False
+    # '[' before the array, 'first' right after it, 'value' after a comma,
+    # 'separator' after an item.
+    expect = '['
+
+    def fill():
+        nonlocal buffer, pos, eof
+        chunk = f.read(chunk_size)
+        if not chunk:
+            eof = True
+        buffer = buffer[pos:] + chunk
+        pos = 0
+
+    while True:
+        while pos < len(buffer) and buffer[pos] in ' \t\r\n':
+            pos += 1
+        if pos >= len(buffer):
+            if eof:
+                raise json.JSONDecodeError('Unterminated array', buffer, pos)
+            fill()
+            continue
+        char = buffer[pos]
+        if expect == '[':
+            if char != '[':
+                raise CommandError(
+                    'JSON file should contain a list of ingredient objects.')
+            expect = 'first'
+            pos += 1
+            continue
+        if expect == 'separator':
+            if char == ']':
+                return
+            if char != ',':
+                raise json.JSONDecodeError(
+                    "Expecting ',' delimiter", buffer, pos)
+            expect = 'value'
+            pos += 1
+            continue
+        if char == ']' and expect == 'first':
+            return
+        if char in ',]':
+            raise json.JSONDecodeError('Expecting value', buffer, pos)
+        try:
+            item, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            fill()
+            continue
+        if end == len(buffer) and not eof:
+            # A number may continue in the next chunk.
+            fill()
+            continue
+        pos = end
+        expect = 'separator'
+        yield item
+
+
 class Command(BaseCommand):
     help = 'Loads ingredients from a JSON or CSV file into the database'
 
@@ -12,6 +83,7 @@ class Command(BaseCommand):
     DATA_DIR = BASE_DIR / 'data'
     DEFAULT_JSON_FILE = DATA_DIR / 'ingredients.json'
     DEFAULT_CSV_FILE = DATA_DIR / 'ingredients.csv'
+    PROGRESS_EVERY = 100_000
 
     def add_arguments(self, parser):
         parser.add_argument(
@@ -30,95 +102,212 @@ class Command(BaseCommand):
             '--format',
             type=str,
             choices=['json', 'csv'],
-            default=None, 
+            default=None,
             help='Specify file format (json or csv)',
         )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Number of rows inserted per statement',
+        )
+        parser.add_argument(
+            '--no-copy',
+            action='store_true',
+            help='Use bulk_create even when PostgreSQL COPY is available',
+        )
 
     @transaction.atomic
     def handle(self, *args, **options):
         json_file_path = Path(options['jsonfile'])
         csv_file_path = Path(options['csvfile'])
         file_format = options['format']
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError('--batch-size must be a positive integer.')
 
         file_path = None
         actual_format = None
 
-        if file_format == 'json' or (not file_format and json_file_path.exists()):
+        if file_format == 'json' or (
+            not file_format and json_file_path.exists()
+        ):
             file_path = json_file_path
             actual_format = 'json'
-        elif file_format == 'csv' or (not file_format and csv_file_path.exists()):
+        elif file_format == 'csv' or (
+            not file_format and csv_file_path.exists()
+        ):
             file_path = csv_file_path
             actual_format = 'csv'
-        elif not file_format and not json_file_path.exists() and not csv_file_path.exists():
-             raise CommandError(f"Neither JSON ({json_file_path}) nor CSV ({csv_file_path}) file found.")
-        elif file_format and not file_path.exists():
-             raise CommandError(f"Specified {file_format.upper()} file not found at: {file_path}")
-
+        elif not file_format:
+            raise CommandError(
+                f'Neither JSON ({json_file_path}) nor CSV ({csv_file_path}) '
+                'file found.'
+            )
 
         if not file_path or not actual_format:
-             raise CommandError("Could not determine the data file to load.")
+            raise CommandError('Could not determine the data file to load.')
 
+        use_copy = (
+            connection.vendor == 'postgresql' and not options['no_copy']
+        )
+        method = 'COPY' if use_copy else 'bulk_create'
+        self.stdout.write(self.style.SUCCESS(
+            f'Starting to load ingredients from {file_path} '
+            f'(Format: {actual_format}, {method}, batch size {batch_size})...'
+        ))
 
-        self.stdout.write(self.style.SUCCESS(f'Starting to load ingredients from {file_path} (Format: {actual_format})...'))
+        count_before = Ingredient.objects.count()
+        existing = {
+            (name.casefold(), unit.casefold())
+            for name, unit in Ingredient.objects.order_by().values_list(
+                'name', 'measurement_unit').iterator(chunk_size=10000)
+        }
+        insert_batch = (
+            self._copy_batch if use_copy else self._bulk_create_batch
+        )
 
-        ingredients_to_create = []
-        loaded_count = 0
-        skipped_count = 0
+        batch = []
+        processed = sent_count = 0
+        self.invalid_count = 0
+        started = time.perf_counter()
 
         try:
-            with open(file_path, mode='r', encoding='utf-8') as f:
-                if actual_format == 'json':
-                    data = json.load(f)
-                     
-                    if not isinstance(data, list):
-                        raise CommandError("JSON file should contain a list of ingredient objects.")
-
-                    for item in data:
-                        name = item.get('name')
-                        unit = item.get('measurement_unit')
-                        if name and unit:
-                           
-                            if not Ingredient.objects.filter(name__iexact=name, measurement_unit__iexact=unit).exists():
-                                ingredients_to_create.append(Ingredient(name=name, measurement_unit=unit))
-                                loaded_count += 1
-                            else:
-                                skipped_count += 1
-                        else:
-                            self.stdout.write(self.style.WARNING(f"Skipping invalid JSON item: {item}"))
-
-                elif actual_format == 'csv':
-                    reader = csv.reader(f)
-                  
-                    for row in reader:
-                        if len(row) >= 2:
-                            name = row[0].strip()
-                            unit = row[1].strip()
-                            if name and unit:
-                                
-                                if not Ingredient.objects.filter(name__iexact=name, measurement_unit__iexact=unit).exists():
-                                    ingredients_to_create.append(Ingredient(name=name, measurement_unit=unit))
-                                    loaded_count += 1
-                                else:
-                                     skipped_count += 1
-                            else:
-                                 self.stdout.write(self.style.WARNING(f"Skipping invalid CSV row: {row}"))
-                        else:
-                            self.stdout.write(self.style.WARNING(f"Skipping incomplete CSV row: {row}"))
-
-            
-            Ingredient.objects.bulk_create(ingredients_to_create)
-
-            self.stdout.write(self.style.SUCCESS(f'Successfully loaded {loaded_count} new ingredients.'))
+            with open(file_path, mode='r', encoding='utf-8', newline='') as f:
+                rows = (
+                    self._iter_json(f) if actual_format == 'json'
+                    else self._iter_csv(f)
+                )
+                for name, unit in rows:
+                    processed += 1
+                    key = (name.casefold(), unit.casefold())
+                    if key not in existing:
+                        existing.add(key)
+                        batch.append((name, unit))
+                        if len(batch) >= batch_size:
+                            insert_batch(batch)
+                            sent_count += len(batch)
+                            batch = []
+                    if processed % self.PROGRESS_EVERY == 0:
+                        self._report_progress(processed, sent_count, started)
+
+            if batch:
+                insert_batch(batch)
+
+            # Conflicting rows are dropped silently by the insert, so the
+            # number of new rows is measured instead of summing the batches.
+            loaded_count = Ingredient.objects.count() - count_before
+            if loaded_count:
+                # Bulk inserts send no signals; workers rebuild their
+                # ingredient indexes once the load commits.
+                bump_catalog_version()
+            # processed only counts valid rows, so this is the duplicates.
+            skipped_count = processed - loaded_count
+            elapsed = time.perf_counter() - started
+            self.stdout.write(self.style.SUCCESS(
+                f'Successfully loaded {loaded_count} new ingredients '
+                f'({processed} rows in {elapsed:.1f}s, '
+                f'{processed / elapsed if elapsed else 0:,.0f} rows/s).'
+            ))
             if skipped_count > 0:
-                 self.stdout.write(self.style.WARNING(f'Skipped {skipped_count} ingredients that already exist.'))
+                self.stdout.write(self.style.WARNING(
+                    f'Skipped {skipped_count} rows that already exist '
+                    'or repeat in the file.'
+                ))
+            if self.invalid_count:
+                self.stdout.write(self.style.WARNING(
+                    f'Skipped {self.invalid_count} invalid rows.'))
 
         except FileNotFoundError:
             raise CommandError(f'Error: File not found at {file_path}')
         except json.JSONDecodeError:
-            raise CommandError(f'Error: Could not decode JSON from {file_path}')
+            raise CommandError(
+                f'Error: Could not decode JSON from {file_path}')
         except IntegrityError as e:
-            
-            self.stdout.write(self.style.ERROR(f'Database integrity error during loading: {e}'))
-            self.stdout.write(self.style.WARNING('Consider running again or checking data for duplicates (case-sensitive).'))
+            self.stdout.write(self.style.ERROR(
+                f'Database integrity error during loading: {e}'))
+            self.stdout.write(self.style.WARNING(
+                'Consider running again or checking data for duplicates '
+                '(case-sensitive).'
+            ))
+        except CommandError:
+            raise
         except Exception as e:
-            raise CommandError(f'An unexpected error occurred: {e}')
\ No newline at end of file
+            raise CommandError(f'An unexpected error occurred: {e}')
+
+    def _iter_json(self, f):
+        for item in iter_json_array(f):
+            if isinstance(item, dict):
+                name = item.get('name')
+                unit = item.get('measurement_unit')
+            else:
+                name = unit = None
+            if name and unit:
+                yield name.strip(), unit.strip()
+            else:
+                self._skip_invalid(f'Skipping invalid JSON item: {item}')
+
+    def _iter_csv(self, f):
+        for row in csv.reader(f):
+            if len(row) >= 2:
+                name = row[0].strip()
+                unit = row[1].strip()
+                if name and unit:
+                    yield name, unit
+                else:
+                    self._skip_invalid(f'Skipping invalid CSV row: {row}')
+            else:
+                self._skip_invalid(f'Skipping incomplete CSV row: {row}')
+
+    def _skip_invalid(self, message):
+        self.invalid_count += 1
+        self.stdout.write(self.style.WARNING(message))
+
+    def _bulk_create_batch(self, batch):
+        Ingredient.objects.bulk_create(
+            [
+                Ingredient(name=name, measurement_unit=unit)
+                for name, unit in batch
+            ],
+            ignore_conflicts=True
+        )
+
+    def _copy_batch(self, batch):
+        """COPY into a temp table, then INSERT ... ON CONFLICT DO NOTHING."""
+        table = Ingredient._meta.db_table
+        buffer = io.StringIO()
+        for name, unit in batch:
+            buffer.write(
+                f'{self._copy_escape(name)}\t{self._copy_escape(unit)}\n')
+        buffer.seek(0)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'CREATE TEMP TABLE IF NOT EXISTS ingredient_load '
+                '(name varchar(128), measurement_unit varchar(64)) '
+                'ON COMMIT DROP'
+            )
+            cursor.execute('TRUNCATE ingredient_load')
+            cursor.copy_expert(
+                'COPY ingredient_load (name, measurement_unit) FROM STDIN',
+                buffer
+            )
+            cursor.execute(
+                f'INSERT INTO {table} '
+                '(name, measurement_unit, recipes_count, updated_at) '
+                'SELECT name, measurement_unit, 0, now() FROM ingredient_load '
+                'ON CONFLICT DO NOTHING'
+            )
+
+    @staticmethod
+    def _copy_escape(value):
+        return (
+            value.replace('\\', '\\\\').replace('\t', '\\t')
+            .replace('\n', '\\n').replace('\r', '\\r')
+        )
+
+    def _report_progress(self, processed, sent_count, started):
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f'  {processed:,} rows processed, {sent_count:,} sent to insert, '
+            f'{processed / elapsed if elapsed else 0:,.0f} rows/s'
+        )
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from recipes import search
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = (
+        'Rebuilds the SQLite FTS5 recipe search index; on PostgreSQL the '
+        'generated search vector is always current and nothing is done'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=2000,
+            help='Number of recipes stemmed and written per statement',
+        )
+
+    def handle(self, *args, **options):
+        if not search.uses_fts(connection.alias):
+            self.stdout.write(self.style.SUCCESS(
+                f'{connection.vendor} maintains the search vector itself.'))
+            return
+        with transaction.atomic():
+            indexed = search.rebuild_index(
+                Recipe.objects.all(), batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Indexed {indexed} recipes.'))
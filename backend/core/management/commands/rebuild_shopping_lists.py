@@ -0,0 +1,67 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from recipes import shopping_list
+from recipes.models import ShoppingCart, ShoppingListItem
+
+
+class Command(BaseCommand):
+    help = (
+        'Rebuilds the per-user shopping list totals from shopping carts, '
+        'or with --check only compares them against the cart aggregate'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Report users whose stored totals differ, without '
+                 'changing them',
+        )
+        parser.add_argument(
+            '--user',
+            type=int,
+            action='append',
+            dest='user_ids',
+            help='Limit to the given user id (may be repeated)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Number of users processed per transaction',
+        )
+
+    def handle(self, *args, **options):
+        user_ids = options['user_ids'] or sorted(
+            set(ShoppingCart.objects.values_list('user_id', flat=True))
+            | set(ShoppingListItem.objects.values_list('user_id', flat=True))
+        )
+        batch_size = options['batch_size']
+        inconsistent = []
+        for start in range(0, len(user_ids), batch_size):
+            batch = user_ids[start:start + batch_size]
+            with transaction.atomic():
+                if options['check']:
+                    expected = shopping_list.compute_totals(batch)
+                    stored = shopping_list.stored_totals(batch)
+                    keys = expected.keys() | stored.keys()
+                    inconsistent.extend(sorted({
+                        user_id for user_id, ingredient_id in keys
+                        if expected.get((user_id, ingredient_id))
+                        != stored.get((user_id, ingredient_id))
+                    }))
+                else:
+                    shopping_list.rebuild(batch)
+
+        if not options['check']:
+            self.stdout.write(self.style.SUCCESS(
+                f'Rebuilt shopping lists for {len(user_ids)} users.'))
+        elif inconsistent:
+            raise CommandError(
+                f'{len(inconsistent)} of {len(user_ids)} shopping lists '
+                f'differ from the cart aggregate: users {inconsistent[:20]}'
+            )
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f'All {len(user_ids)} shopping lists are consistent.'))
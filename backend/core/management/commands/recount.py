@@ -0,0 +1,58 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+
+from core.counters import COUNTERS
+
+
+class Command(BaseCommand):
+    help = (
+        'Recomputes denormalized counter columns and repairs drift in '
+        'batches'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=2000,
+            help='Number of target rows recounted per transaction',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        for spec in COUNTERS:
+            label = f'{spec.target._meta.label}.{spec.field}'
+            checked, repaired = self._recount(spec, batch_size)
+            style = self.style.WARNING if repaired else self.style.SUCCESS
+            self.stdout.write(style(
+                f'{label}: checked {checked}, repaired {repaired}'
+            ))
+
+    def _recount(self, spec, batch_size):
+        checked = repaired = 0
+        last_pk = None
+        while True:
+            with transaction.atomic():
+                rows = spec.target.objects.order_by('pk').select_for_update()
+                if last_pk is not None:
+                    rows = rows.filter(pk__gt=last_pk)
+                current = dict(rows.values_list('pk', spec.field)[:batch_size])
+                if not current:
+                    return checked, repaired
+                actual = dict(
+                    spec.model.objects
+                    .filter(**{f'{spec.fk_field}__in': list(current)})
+                    .order_by().values_list(spec.fk_field)
+                    .annotate(total=Count('*'))
+                )
+                drifted = [
+                    spec.target(pk=pk, **{spec.field: actual.get(pk, 0)})
+                    for pk, value in current.items()
+                    if value != actual.get(pk, 0)
+                ]
+                if drifted:
+                    spec.target.objects.bulk_update(drifted, [spec.field])
+                checked += len(current)
+                repaired += len(drifted)
+                last_pk = max(current)
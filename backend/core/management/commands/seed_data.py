@@ -0,0 +1,547 @@
+import io
+import multiprocessing
+import os
+import random
+import time
+from datetime import timedelta
+from itertools import accumulate
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, connections, transaction
+from django.db.models import Max
+from django.utils import timezone
+from PIL import Image, ImageDraw
+
+from api.pagination import bump_count_version
+from core.images import render_renditions, store_renditions
+from recipes import search, shopping_list
+from recipes.models import (
+    Favorite, Ingredient, IngredientInRecipe, Recipe, ShoppingCart,
+    ShoppingListItem,
+)
+from users.models import Subscription
+
+User = get_user_model()
+
+FIRST_NAMES = (
+    'Анна', 'Мария', 'Елена', 'Ольга', 'Дарья', 'Ирина', 'Наталья', 'Софья',
+    'Иван', 'Алексей', 'Дмитрий', 'Сергей', 'Михаил', 'Павел', 'Артём',
+    'Никита',
+)
+LAST_NAMES = (
+    'Иванова', 'Смирнова', 'Кузнецова', 'Попова', 'Соколова', 'Лебедева',
+    'Козлов', 'Новиков', 'Морозов', 'Петров', 'Волков', 'Соловьёв',
+)
+DISH_ADJECTIVES = (
+    'Домашний', 'Быстрый', 'Летний', 'Пряный', 'Сливочный', 'Печёный',
+    'Острый', 'Овощной', 'Праздничный', 'Лёгкий', 'Бабушкин', 'Тёплый',
+)
+DISHES = (
+    'суп', 'салат', 'пирог', 'плов', 'омлет', 'рагу', 'гратен', 'борщ',
+    'кекс', 'пудинг', 'бульон', 'карри', 'ризотто', 'шашлык', 'хлеб',
+)
+SENTENCES = (
+    'Подготовьте все ингредиенты заранее.',
+    'Нарежьте овощи небольшими кубиками.',
+    'Разогрейте духовку до 180 градусов.',
+    'Обжарьте лук до золотистого цвета.',
+    'Готовьте на среднем огне, время от времени помешивая.',
+    'Посолите и поперчите по вкусу.',
+    'Дайте блюду настояться десять минут.',
+    'Подавайте горячим со свежей зеленью.',
+)
+
+# Forked workers inherit the plan instead of receiving it with every task.
+_plan = None
+
+
+def zipf_cum_weights(n, skew):
+    """
+    Cumulative weights of ranks 1..n for random.choices,
+    P(rank) ~ rank^-skew.
+    """
+    return list(accumulate((rank + 1) ** -skew for rank in range(n)))
+
+
+def draw_unique(rnd, population, cum_weights, count, exclude=None):
+    """Up to count distinct items drawn by popularity."""
+    chosen = set(rnd.choices(population, cum_weights=cum_weights, k=count))
+    chosen.discard(exclude)
+    return chosen
+
+
+def _next_id(model):
+    return (model.objects.aggregate(last=Max('pk'))['last'] or 0) + 1
+
+
+def _exponential_count(rnd, mean, limit):
+    """Exponentially distributed count with the given mean, capped."""
+    return min(int(rnd.expovariate(1 / mean)), limit) if mean else 0
+
+
+def _copy_value(value):
+    if value is None:
+        return '\\N'
+    if value is True or value is False:
+        return 't' if value else 'f'
+    return (
+        str(value).replace('\\', '\\\\').replace('\t', '\\t')
+        .replace('\n', '\\n').replace('\r', '\\r')
+    )
+
+
+class TableWriter:
+    """
+    Buffers rows of one table and writes them with COPY on PostgreSQL or
+    batched multi-row INSERTs elsewhere. Columns the generator does not
+    produce are filled with the model field defaults.
+    """
+
+    def __init__(self, model, columns, batch_size, use_copy):
+        given = [model._meta.get_field(name).column for name in columns]
+        missing = [
+            field for field in model._meta.concrete_fields
+            if field.column not in given and not field.primary_key
+        ]
+        self.table = model._meta.db_table
+        self.columns = given + [field.column for field in missing]
+        self.defaults = tuple(
+            field.get_db_prep_save(field.get_default(), connection)
+            for field in missing
+        )
+        self.batch_size = batch_size
+        self.use_copy = use_copy
+        self.rows = []
+        self.written = 0
+
+    def add(self, *values):
+        self.rows.append(values + self.defaults)
+        if len(self.rows) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.rows:
+            return
+        quote = connection.ops.quote_name
+        columns = ', '.join(quote(column) for column in self.columns)
+        with connection.cursor() as cursor:
+            if self.use_copy:
+                buffer = io.StringIO()
+                for row in self.rows:
+                    buffer.write('\t'.join(map(_copy_value, row)))
+                    buffer.write('\n')
+                buffer.seek(0)
+                cursor.copy_expert(
+                    f'COPY {quote(self.table)} ({columns}) FROM STDIN', buffer)
+            else:
+                placeholders = ', '.join(['%s'] * len(self.columns))
+                cursor.executemany(
+                    f'INSERT INTO {quote(self.table)} ({columns}) '
+                    f'VALUES ({placeholders})',
+                    self.rows,
+                )
+        self.written += len(self.rows)
+        self.rows = []
+
+
+class Plan:
+    """Everything workers need to generate any chunk independently."""
+
+    def __init__(self, options, ingredient_ids, images):
+        self.options = options
+        self.seed = options['seed']
+        self.users = options['users']
+        self.recipes = options['recipes']
+        self.authors = max(1, round(self.users * options['authors_share']))
+        self.use_copy = (
+            connection.vendor == 'postgresql' and not options['no_copy'])
+        self.images = images
+        self.password = make_password(options['password'])
+
+        self.first_user_id = _next_id(User)
+        self.first_recipe_id = _next_id(Recipe)
+        ends_at = timezone.now().replace(microsecond=0)
+        if not connection.features.supports_timezones:
+            # Stored as naive text; converting once here instead of per row.
+            ends_at = timezone.make_naive(ends_at, connection.timezone)
+        self.ends_at = ends_at
+        self.span = timedelta(days=options['days']).total_seconds()
+
+        rnd = random.Random(f'{self.seed}:ranks')
+        skew = options['skew']
+        self.author_ids = [
+            self.first_user_id + i for i in range(self.authors)]
+        self.author_weights = zipf_cum_weights(self.authors, skew)
+        self.ranked_recipe_ids = [
+            self.first_recipe_id + i for i in range(self.recipes)]
+        rnd.shuffle(self.ranked_recipe_ids)
+        self.recipe_weights = zipf_cum_weights(self.recipes, skew)
+        self.ranked_ingredient_ids = list(ingredient_ids)
+        rnd.shuffle(self.ranked_ingredient_ids)
+        self.ingredient_weights = zipf_cum_weights(len(ingredient_ids), skew)
+
+    def rng(self, phase, chunk):
+        return random.Random(f'{self.seed}:{phase}:{chunk}')
+
+    def timestamp(self, fraction):
+        """A moment of the generated period: 0 is its start, 1 its end."""
+        moment = self.ends_at - timedelta(
+            seconds=round(self.span * (1 - fraction)))
+        return moment if moment.tzinfo else str(moment)
+
+    def recipe_fraction(self, recipe_id):
+        # Recipes are published in id order, like real ones.
+        return (recipe_id - self.first_recipe_id + 0.5) / self.recipes
+
+    def writer(self, model, *columns):
+        return TableWriter(
+            model, columns, self.options['batch_size'], self.use_copy)
+
+
+def _generate_users(plan, chunk, start, stop):
+    rnd = plan.rng('users', chunk)
+    prefix = plan.options['prefix']
+    users = plan.writer(
+        User, 'id', 'username', 'email', 'first_name', 'last_name', 'password',
+        'date_joined', 'is_active')
+    for i in range(start, stop):
+        users.add(
+            plan.first_user_id + i, f'{prefix}-{i}',
+            f'{prefix}-{i}@example.org',
+            rnd.choice(FIRST_NAMES), rnd.choice(LAST_NAMES), plan.password,
+            plan.timestamp(-rnd.random()), True,
+        )
+    users.flush()
+    return {'users': users.written}
+
+
+def _generate_recipes(plan, chunk, start, stop):
+    rnd = plan.rng('recipes', chunk)
+    options = plan.options
+    recipes = plan.writer(
+        Recipe, 'id', 'author', 'name', 'image', 'image_thumbnail',
+        'image_webp', 'text', 'cooking_time', 'pub_date')
+    search_rows = []
+    amounts = plan.writer(
+        IngredientInRecipe, 'recipe', 'ingredient', 'amount')
+    author_ids = rnd.choices(
+        plan.author_ids, cum_weights=plan.author_weights, k=stop - start)
+    for i, author_id in zip(range(start, stop), author_ids):
+        recipe_id = plan.first_recipe_id + i
+        name = f'{rnd.choice(DISH_ADJECTIVES)} {rnd.choice(DISHES)}'
+        text = ' '.join(rnd.sample(SENTENCES, rnd.randint(2, 5)))
+        recipes.add(
+            recipe_id, author_id, name, *rnd.choice(plan.images), text,
+            rnd.randint(5, 180),
+            plan.timestamp(plan.recipe_fraction(recipe_id)),
+        )
+        search_rows.append((recipe_id, name, text))
+        count = rnd.randint(
+            options['min_ingredients'], options['max_ingredients'])
+        chosen = set()
+        while len(chosen) < count:
+            chosen |= draw_unique(
+                rnd, plan.ranked_ingredient_ids, plan.ingredient_weights,
+                count - len(chosen))
+        for ingredient_id in sorted(chosen):
+            amounts.add(recipe_id, ingredient_id, rnd.randint(1, 500))
+    recipes.flush()
+    amounts.flush()
+    # PostgreSQL maintains its search vector itself; SQLite needs FTS rows.
+    search.index_rows(search_rows, replace=False)
+    return {'recipes': recipes.written, 'recipe ingredients': amounts.written}
+
+
+def _generate_relations(plan, chunk, start, stop):
+    rnd = plan.rng('relations', chunk)
+    options = plan.options
+    favorites = plan.writer(Favorite, 'user', 'recipe', 'added_at')
+    cart = plan.writer(ShoppingCart, 'user', 'recipe', 'added_at')
+    subscriptions = plan.writer(Subscription, 'user', 'author', 'created_at')
+    cart_user_ids = []
+
+    def recipe_rows(writer, user_id, mean):
+        count = _exponential_count(rnd, mean, plan.recipes)
+        recipe_ids = draw_unique(
+            rnd, plan.ranked_recipe_ids, plan.recipe_weights, count)
+        for recipe_id in sorted(recipe_ids):
+            published = plan.recipe_fraction(recipe_id)
+            added = published + rnd.random() * (1 - published)
+            writer.add(user_id, recipe_id, plan.timestamp(added))
+        return recipe_ids
+
+    for i in range(start, stop):
+        user_id = plan.first_user_id + i
+        recipe_rows(favorites, user_id, options['favorites_per_user'])
+        if recipe_rows(cart, user_id, options['cart_per_user']):
+            cart_user_ids.append(user_id)
+        count = _exponential_count(
+            rnd, options['subscriptions_per_user'], plan.authors)
+        author_ids = draw_unique(
+            rnd, plan.author_ids, plan.author_weights, count, exclude=user_id)
+        for author_id in sorted(author_ids):
+            subscriptions.add(
+                user_id, author_id, plan.timestamp(0.5 + rnd.random() / 2))
+    for writer in (favorites, cart, subscriptions):
+        writer.flush()
+
+    # Totals are computed from the carts just written, as rebuild() does,
+    # but without deleting rows that cannot exist yet.
+    items = plan.writer(
+        ShoppingListItem, 'user', 'ingredient', 'total_amount')
+    for (user_id, ingredient_id), total in shopping_list.compute_totals(
+            cart_user_ids).items():
+        items.add(user_id, ingredient_id, total)
+    items.flush()
+    return {
+        'favorites': favorites.written,
+        'shopping cart': cart.written,
+        'subscriptions': subscriptions.written,
+        'shopping list items': items.written,
+    }
+
+
+PHASES = (
+    ('users', _generate_users, 'users'),
+    ('recipes', _generate_recipes, 'recipes'),
+    ('relations', _generate_relations, 'users'),
+)
+GENERATORS = {name: generator for name, generator, _ in PHASES}
+
+
+def _run_chunk(phase, chunk, start, stop):
+    try:
+        with transaction.atomic():
+            return GENERATORS[phase](_plan, chunk, start, stop)
+    finally:
+        if multiprocessing.parent_process() is not None:
+            connections.close_all()
+
+
+class Command(BaseCommand):
+    help = (
+        'Generates a large synthetic dataset (users, recipes, favorites, '
+        'shopping carts, subscriptions) with skewed popularity for load '
+        'testing'
+    )
+
+    DEFAULT_CSV_FILE = (
+        Path(__file__).resolve().parents[4] / 'data' / 'ingredients.csv')
+    IMAGE_SIZE = (960, 640)
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10_000)
+        parser.add_argument('--recipes', type=int, default=50_000)
+        parser.add_argument(
+            '--authors-share',
+            type=float,
+            default=0.2,
+            help='Share of users who publish recipes',
+        )
+        parser.add_argument('--min-ingredients', type=int, default=3)
+        parser.add_argument('--max-ingredients', type=int, default=12)
+        parser.add_argument(
+            '--favorites-per-user',
+            type=float,
+            default=20,
+            help='Mean of the exponential distribution of favorites per user',
+        )
+        parser.add_argument('--cart-per-user', type=float, default=3)
+        parser.add_argument('--subscriptions-per-user', type=float, default=8)
+        parser.add_argument(
+            '--skew',
+            type=float,
+            default=1.0,
+            help='Zipf exponent of recipe, author and ingredient popularity',
+        )
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=365,
+            help='Recipes and activity are spread over this many past days',
+        )
+        parser.add_argument(
+            '--images',
+            type=int,
+            default=12,
+            help='Size of the placeholder image pool shared by all recipes',
+        )
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument(
+            '--prefix',
+            default='seed',
+            help='Prefix of generated usernames and e-mails',
+        )
+        parser.add_argument(
+            '--password',
+            default='foodgram-seed',
+            help='Password of every generated user',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count(),
+            help='Worker processes; SQLite always uses one',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=5000,
+            help='Users or recipes generated per task and transaction',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=10_000,
+            help='Rows written per COPY or INSERT',
+        )
+        parser.add_argument(
+            '--no-copy',
+            action='store_true',
+            help='Use batched INSERTs even when PostgreSQL COPY is available',
+        )
+        parser.add_argument(
+            '--csvfile',
+            default=str(self.DEFAULT_CSV_FILE),
+            help='Ingredients CSV loaded before generation',
+        )
+
+    def handle(self, *args, **options):
+        global _plan
+        self._validate(options)
+        prefix = options['prefix']
+        if User.objects.filter(username__startswith=f'{prefix}-').exists():
+            raise CommandError(
+                f'Users with the "{prefix}-" prefix already exist; '
+                'pick another --prefix.')
+
+        started = time.perf_counter()
+        call_command(
+            'load_ingredients', format='csv', csvfile=options['csvfile'],
+            stdout=self.stdout)
+        ingredient_ids = list(Ingredient.objects.values_list('pk', flat=True))
+        if len(ingredient_ids) < options['max_ingredients']:
+            raise CommandError('Not enough ingredients for --max-ingredients.')
+
+        _plan = Plan(options, ingredient_ids, self._image_pool(options))
+        workers = options['workers']
+        if connection.vendor == 'sqlite':
+            workers = 1
+        self.stdout.write(
+            f'Generating {options["users"]:,} users '
+            f'({_plan.authors:,} authors), '
+            f'{options["recipes"]:,} recipes with {workers} worker(s), '
+            f'{"COPY" if _plan.use_copy else "batched INSERT"}...'
+        )
+
+        totals = {}
+        for phase, _, size_option in PHASES:
+            totals.update(self._run_phase(
+                phase, options[size_option], options, workers))
+            if phase == 'recipes':
+                self._reset_sequences()
+
+        self.stdout.write('Recounting denormalized counters...')
+        call_command('recount', stdout=self.stdout)
+        for model in (User, Subscription, Recipe, Favorite, ShoppingCart):
+            bump_count_version(model)
+
+        elapsed = time.perf_counter() - started
+        rows = sum(totals.values())
+        self.stdout.write(self.style.SUCCESS(
+            f'Generated {rows:,} rows in {elapsed:.1f}s '
+            f'({rows / elapsed:,.0f} rows/s): '
+            + ', '.join(f'{name} {count:,}' for name, count in totals.items())
+        ))
+
+    def _validate(self, options):
+        for name in ('users', 'recipes', 'chunk_size', 'batch_size', 'workers',
+                     'images', 'min_ingredients', 'days'):
+            if options[name] < 1:
+                raise CommandError(
+                    f'--{name.replace("_", "-")} must be positive.')
+        if options['min_ingredients'] > options['max_ingredients']:
+            raise CommandError('--min-ingredients exceeds --max-ingredients.')
+        if not 0 < options['authors_share'] <= 1:
+            raise CommandError('--authors-share must be in (0, 1].')
+
+    def _run_phase(self, phase, size, options, workers):
+        chunk_size = options['chunk_size']
+        tasks = [
+            (phase, chunk, start, min(start + chunk_size, size))
+            for chunk, start in enumerate(range(0, size, chunk_size))
+        ]
+        started = time.perf_counter()
+        totals = {}
+        if workers == 1:
+            results = (_run_chunk(*task) for task in tasks)
+            self._collect(results, totals)
+        else:
+            # Children must not share the parent's database connection.
+            connections.close_all()
+            context = multiprocessing.get_context('fork')
+            with context.Pool(min(workers, len(tasks))) as pool:
+                self._collect(
+                    pool.starmap(_run_chunk, tasks, chunksize=1), totals)
+        elapsed = time.perf_counter() - started
+        rows = sum(totals.values())
+        self.stdout.write(
+            f'  {phase}: {rows:,} rows in {elapsed:.1f}s '
+            f'({rows / elapsed if elapsed else 0:,.0f} rows/s)'
+        )
+        return totals
+
+    @staticmethod
+    def _collect(results, totals):
+        for result in results:
+            for name, count in result.items():
+                totals[name] = totals.get(name, 0) + count
+
+    def _reset_sequences(self):
+        statements = connection.ops.sequence_reset_sql(
+            no_style(), [User, Recipe])
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
+
+    def _image_pool(self, options):
+        """
+        Renders the placeholder images with their renditions once;
+        recipes only reference the stored files.
+        """
+        rnd = random.Random(f'{options["seed"]}:images')
+        image_field = Recipe._meta.get_field('image')
+        pool = []
+        for number in range(options['images']):
+            top, bottom = (
+                tuple(rnd.randrange(40, 230) for _ in range(3))
+                for _ in range(2)
+            )
+            image = Image.new('RGB', self.IMAGE_SIZE)
+            draw = ImageDraw.Draw(image)
+            width, height = self.IMAGE_SIZE
+            for y in range(height):
+                mix = y / height
+                draw.line([(0, y), (width, y)], fill=tuple(
+                    round(a + (b - a) * mix) for a, b in zip(top, bottom)))
+            buffer = io.BytesIO()
+            image.save(buffer, 'JPEG', quality=85)
+            content = ContentFile(buffer.getvalue(), name='placeholder.jpg')
+
+            name = image_field.generate_filename(None, (
+                f'{options["prefix"]}-placeholder-{options["seed"]}-'
+                f'{number}.jpg'))
+            if not default_storage.exists(name):
+                name = default_storage.save(name, content)
+            recipe = Recipe()
+            store_renditions(recipe, 'image', render_renditions(content))
+            pool.append(
+                (name, recipe.image_thumbnail.name, recipe.image_webp.name))
+        return pool
@@ -0,0 +1,68 @@
+"""
+Prometheus metrics.
+
+Request metrics are recorded by ``RequestMetricsMiddleware`` and exposed at
+``/metrics``. Under gunicorn every worker writes its samples to files in
+``PROMETHEUS_MULTIPROC_DIR`` (see ``gunicorn.conf.py``) and the endpoint
+merges them, so any worker can answer a scrape with the totals of all of them.
+"""
+import os
+
+from django.http import HttpResponse
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Gauge, Histogram,
+    generate_latest, multiprocess,
+)
+
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10,
+)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89, 144)
+
+REQUEST_LATENCY = Histogram(
+    'foodgram_http_request_duration_seconds',
+    'Request latency by DRF view, action, method and status.',
+    ('view', 'action', 'method', 'status'),
+    buckets=LATENCY_BUCKETS,
+)
+REQUEST_QUERIES = Histogram(
+    'foodgram_http_request_db_queries',
+    'SQL queries per request by DRF view and action.',
+    ('view', 'action'),
+    buckets=QUERY_COUNT_BUCKETS,
+)
+REQUEST_DB_TIME = Histogram(
+    'foodgram_http_request_db_duration_seconds',
+    'Time spent in SQL per request by DRF view and action.',
+    ('view', 'action'),
+    buckets=LATENCY_BUCKETS,
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    'foodgram_http_requests_in_flight',
+    'Requests currently being processed.',
+    multiprocess_mode='livesum',
+)
+
+
+def observe_request(request, response, metrics, duration):
+    view = metrics.view or 'unmatched'
+    action = metrics.action or ''
+    REQUEST_LATENCY.labels(
+        view, action, request.method, str(response.status_code)
+    ).observe(duration)
+    REQUEST_QUERIES.labels(view, action).observe(metrics.queries)
+    REQUEST_DB_TIME.labels(view, action).observe(metrics.db_time)
+
+
+def metrics_view(request):
+    """
+    Метрики в текстовом формате Prometheus. Обычная Django-вьюха, поэтому
+    аутентификация DRF к ней не применяется; наружу nginx её не отдаёт.
+    """
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return HttpResponse(
+        generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,138 @@
+"""
+Per-request instrumentation.
+
+``RequestMetricsMiddleware`` measures wall time, the number and total time of
+SQL queries (through ``connection.execute_wrapper``), the time spent in the
+view, where serializers build their ``.data``, the time the renderer takes to
+serialize a DRF ``Response`` and the response size. The numbers go out as one
+JSON log line on the ``foodgram.requests`` logger, tagged with the DRF view
+and action, into the Prometheus histograms in ``core.metrics`` and, when
+``SERVER_TIMING_HEADER`` is on, in a ``Server-Timing`` header.
+
+Queries run while a streaming response is consumed happen after the
+middleware has returned and are not counted.
+"""
+import json
+import logging
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from .metrics import REQUESTS_IN_FLIGHT, observe_request
+
+logger = logging.getLogger('foodgram.requests')
+
+
+class RequestMetrics:
+    __slots__ = (
+        'view', 'action', 'queries', 'db_time', 'view_time', 'render_time',
+        '_view_started', '_render_started',
+    )
+
+    def __init__(self):
+        self.view = None
+        self.action = None
+        self.queries = 0
+        self.db_time = 0.0
+        self.view_time = 0.0
+        self.render_time = 0.0
+        self._view_started = None
+        self._render_started = None
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - started
+            self.queries += 1
+
+    def view_finished(self):
+        if self._view_started is not None:
+            self.view_time = time.perf_counter() - self._view_started
+            self._view_started = None
+
+    def render_started(self):
+        self.view_finished()
+        self._render_started = time.perf_counter()
+
+    def render_finished(self, response):
+        self.render_time = time.perf_counter() - self._render_started
+
+
+def _view_name(view_func):
+    view_class = getattr(view_func, 'cls', None)
+    if view_class is not None:
+        return view_class.__name__
+    return getattr(view_func, '__name__', type(view_func).__name__)
+
+
+class RequestMetricsMiddleware:
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        metrics = request.request_metrics = RequestMetrics()
+        started = time.perf_counter()
+        with ExitStack() as stack, REQUESTS_IN_FLIGHT.track_inprogress():
+            for alias in connections:
+                stack.enter_context(
+                    connections[alias].execute_wrapper(metrics))
+            response = self.get_response(request)
+        metrics.view_finished()
+        total = time.perf_counter() - started
+        observe_request(request, response, metrics, total)
+
+        if settings.SERVER_TIMING_HEADER:
+            response['Server-Timing'] = (
+                f'total;dur={total * 1000:.1f}, '
+                f'db;dur={metrics.db_time * 1000:.1f};'
+                f'desc="{metrics.queries} SQL", '
+                f'view;dur={metrics.view_time * 1000:.1f}, '
+                f'render;dur={metrics.render_time * 1000:.1f}'
+            )
+        self._log(request, response, metrics, total)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        metrics = request.request_metrics
+        metrics.view = _view_name(view_func)
+        actions = getattr(view_func, 'actions', None) or {}
+        metrics.action = actions.get(request.method.lower())
+        metrics._view_started = time.perf_counter()
+
+    def process_template_response(self, request, response):
+        # DRF Response рендерится после возврата из view: здесь view уже
+        # отработала, а время рендерера меряет post-render callback.
+        metrics = request.request_metrics
+        metrics.render_started()
+        response.add_post_render_callback(metrics.render_finished)
+        return response
+
+    def _log(self, request, response, metrics, total):
+        if not logger.isEnabledFor(logging.INFO):
+            return
+        if response.streaming:
+            size = None
+        elif response.has_header('Content-Length'):
+            size = int(response['Content-Length'])
+        else:
+            size = len(response.content)
+        fields = {
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'view': metrics.view,
+            'action': metrics.action,
+            'duration_ms': round(total * 1000, 2),
+            'queries': metrics.queries,
+            'db_ms': round(metrics.db_time * 1000, 2),
+            'view_ms': round(metrics.view_time * 1000, 2),
+            'render_ms': round(metrics.render_time * 1000, 2),
+            'response_bytes': size,
+        }
+        logger.info(json.dumps(fields, ensure_ascii=False),
+                    extra={'metrics': fields})
@@ -0,0 +1,52 @@
+from .images import (
+    clear_renditions, render_renditions, rendition_field_names,
+    store_renditions,
+)
+
+
+class CounterFieldsMixin:
+    """
+    Full saves of existing rows skip the counter columns listed in
+    counter_fields, which are only changed with F() updates.
+    """
+    counter_fields = ()
+
+    def save(self, *args, **kwargs):
+        if (
+            self.counter_fields
+            and not self._state.adding
+            and kwargs.get('update_fields') is None
+            and not kwargs.get('force_insert')
+        ):
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.counter_fields
+            ]
+        super().save(*args, **kwargs)
+
+
+class ImageRenditionsMixin:
+    """
+    Renders the renditions of each field in rendition_sources whenever a new
+    file is assigned to it, and clears them when the image is removed.
+    The rendition fields are named <source>_thumbnail and <source>_webp.
+    """
+    rendition_sources = ()
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        for source_field in self.rendition_sources:
+            if update_fields is not None and source_field not in update_fields:
+                continue
+            source = getattr(self, source_field)
+            if source and not source._committed:
+                store_renditions(self, source_field, render_renditions(source))
+            elif not source:
+                clear_renditions(self, source_field)
+            else:
+                continue
+            if update_fields is not None:
+                update_fields = kwargs['update_fields'] = [
+                    *update_fields, *rendition_field_names(source_field)]
+        super().save(*args, **kwargs)
@@ -1,5 +1,6 @@
 
 import os
+import sys
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -31,6 +32,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -78,6 +80,26 @@ if DB_ENGINE == 'django.db.backends.postgresql':
         'PORT': os.getenv('DB_PORT', '5432'),
     }
 
+# Page counts and exported PDFs are cached between requests, so all
+# gunicorn workers and management commands have to share one cache.
+REDIS_URL = os.getenv('REDIS_URL')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    # Needs `manage.py createcachetable`.
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': 'django_cache',
+            'OPTIONS': {'MAX_ENTRIES': 100_000},
+        }
+    }
+
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',},
     {'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator',},
@@ -95,6 +117,14 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
+MAX_IMAGE_UPLOAD_SIZE = 10 * 1024 * 1024
+MAX_IMAGE_UPLOAD_PIXELS = 40_000_000
+# JSON bodies carry images as base64 (4/3 of the file size) plus other fields.
+DATA_UPLOAD_MAX_MEMORY_SIZE = MAX_IMAGE_UPLOAD_SIZE * 4 // 3 + 1024 * 1024
+IMAGE_RENDITION_SIZES = {
+    'thumbnail': (320, 320),
+    'webp': (1280, 1280),
+}
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 AUTH_USER_MODEL = 'users.User'
@@ -152,4 +182,36 @@ DJOSER = {
 PAGE_SIZE_QUERY_PARAM = 'limit'
 DEFAULT_RECIPES_LIMIT = 3
 MIN_COOKING_TIME = 1
-MIN_INGREDIENT_AMOUNT = 1
\ No newline at end of file
+MIN_INGREDIENT_AMOUNT = 1
+BULK_RECIPES_LIMIT = 100
+INGREDIENT_INDEX_TTL = int(os.getenv('INGREDIENT_INDEX_TTL', 300))
+INGREDIENT_VERSION_CHECK_INTERVAL = int(
+    os.getenv('INGREDIENT_VERSION_CHECK_INTERVAL', 5))
+PAGINATION_COUNT_CACHE_TIMEOUT = int(os.getenv('PAGINATION_COUNT_CACHE_TIMEOUT', 30))
+PAGINATION_ESTIMATE_THRESHOLD = int(os.getenv('PAGINATION_ESTIMATE_THRESHOLD', 100_000))
+SHOPPING_LIST_PDF_FONT = os.getenv(
+    'SHOPPING_LIST_PDF_FONT', '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf')
+SHOPPING_LIST_PDF_CACHE_TIMEOUT = int(os.getenv('SHOPPING_LIST_PDF_CACHE_TIMEOUT', 3600))
+SHORT_LINK_CODE_LENGTH = 6
+SHORT_LINK_CACHE_SIZE = int(os.getenv('SHORT_LINK_CACHE_SIZE', 100_000))
+SERVER_TIMING_HEADER = os.getenv('SERVER_TIMING_HEADER', 'False') == 'True'
+
+# Keeps manage.py test from printing a log line for every request.
+TESTING = sys.argv[1:2] == ['test']
+REQUEST_LOG_LEVEL = os.getenv(
+    'REQUEST_LOG_LEVEL', 'WARNING' if TESTING else 'INFO')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'foodgram.requests': {
+            'handlers': ['console'],
+            'level': REQUEST_LOG_LEVEL,
+            'propagate': False,
+        },
+    },
+}
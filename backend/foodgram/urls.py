@@ -4,9 +4,14 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 
+from core.metrics import metrics_view
+from recipes.views import short_link_redirect
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('api.urls')), 
+    path('s/<str:code>', short_link_redirect, name='short_link'),
+    path('metrics', metrics_view, name='metrics'),
 ]
 
 if settings.DEBUG:
@@ -14,3 +14,12 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'foodgram.settings')
 
 application = get_wsgi_application()
+
+from django.db import DatabaseError  # noqa: E402
+
+from recipes.ingredient_index import get_ingredient_index  # noqa: E402
+
+try:
+    get_ingredient_index()
+except DatabaseError:
+    pass
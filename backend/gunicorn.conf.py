@@ -0,0 +1,27 @@
+import os
+import shutil
+import tempfile
+
+# Must be set before any worker imports prometheus_client.
+PROMETHEUS_MULTIPROC_DIR = os.environ.setdefault(
+    'PROMETHEUS_MULTIPROC_DIR',
+    os.path.join(tempfile.gettempdir(), 'foodgram-prometheus'),
+)
+
+# The project package lives next to this file; the images start gunicorn
+# from the repository root with -c backend/gunicorn.conf.py.
+chdir = os.path.dirname(os.path.abspath(__file__))
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.getenv('GUNICORN_WORKERS', 3))
+
+
+def on_starting(server):
+    """Drops samples left over from the previous run."""
+    shutil.rmtree(PROMETHEUS_MULTIPROC_DIR, ignore_errors=True)
+    os.makedirs(PROMETHEUS_MULTIPROC_DIR, exist_ok=True)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
@@ -1,5 +1,7 @@
 from django.contrib import admin
-from .models import Recipe, Ingredient, IngredientInRecipe, Favorite, ShoppingCart
+from .models import (
+    Recipe, Ingredient, IngredientInRecipe, Favorite, ShoppingCart, ShortLink
+)
 
 @admin.register(Ingredient)
 class IngredientAdmin(admin.ModelAdmin):
@@ -7,9 +9,10 @@ class IngredientAdmin(admin.ModelAdmin):
     search_fields = ('name',)
     list_filter = ('measurement_unit',)
 
-    @admin.display(description='Используется в рецептах')
+    @admin.display(description='Используется в рецептах',
+                   ordering='recipes_count')
     def recipe_usage_count(self, obj):
-        return obj.recipes.count()
+        return obj.recipes_count
 
 
 class IngredientInRecipeInline(admin.TabularInline):
@@ -27,9 +30,9 @@ class RecipeAdmin(admin.ModelAdmin):
     readonly_fields = ('pub_date', 'favorite_count_display')
     inlines = [IngredientInRecipeInline]
 
-    @admin.display(description='В избранном')
+    @admin.display(description='В избранном', ordering='favorites_count')
     def favorite_count(self, obj):
-        return obj.favorites.count()
+        return obj.favorites_count
 
     @admin.display(description='Добавлений в избранное')
     def favorite_count_display(self, obj):
@@ -49,4 +52,11 @@ class ShoppingCartAdmin(admin.ModelAdmin):
     list_display = ('user', 'recipe', 'added_at')
     search_fields = ('user__username', 'recipe__name')
     list_filter = ('added_at',)
-    autocomplete_fields = ('user', 'recipe')
\ No newline at end of file
+    autocomplete_fields = ('user', 'recipe')
+
+
+@admin.register(ShortLink)
+class ShortLinkAdmin(admin.ModelAdmin):
+    list_display = ('code', 'recipe')
+    search_fields = ('code', 'recipe__name')
+    autocomplete_fields = ('recipe',)
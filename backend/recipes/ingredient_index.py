@@ -0,0 +1,143 @@
+"""
+Process-local prefix index over the ingredient catalog.
+
+Autocomplete requests (``/api/ingredients/?name=...``) are answered from a
+sorted array of case-folded names with ``bisect`` instead of an
+``istartswith`` scan in the database. The catalog version is a timestamp
+under ``CATALOG_VERSION_KEY`` in the shared cache, bumped after commit by the
+``Ingredient`` signals and by ``load_ingredients``. A worker re-reads it at
+most every ``INGREDIENT_VERSION_CHECK_INTERVAL`` seconds and rebuilds the
+index when it changes, or after ``INGREDIENT_INDEX_TTL`` seconds in case a
+write bypassed the signals.
+"""
+import bisect
+import gzip
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.functional import cached_property
+from rest_framework.renderers import JSONRenderer
+
+from .models import Ingredient
+
+MAX_CHAR = '\U0010ffff'
+CATALOG_VERSION_KEY = 'ingredients:catalog_version'
+
+_lock = threading.Lock()
+_index = None
+
+
+def get_catalog_version():
+    """
+    Версия каталога ингредиентов: время последней правки из общего кеша.
+    Если ключа нет, заводит новую версию, и индексы перестраиваются.
+    """
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        version = time.time()
+        if not cache.add(CATALOG_VERSION_KEY, version, None):
+            version = cache.get(CATALOG_VERSION_KEY, version)
+    return version
+
+
+def bump_catalog_version():
+    """Сообщает всем процессам об изменении каталога после коммита."""
+    def bump():
+        cache.set(CATALOG_VERSION_KEY, time.time(), None)
+        invalidate_ingredient_index()
+
+    transaction.on_commit(bump)
+
+
+class RenderedCatalog:
+    """
+    Full catalog rendered once to JSON bytes, plus a gzip variant. The ETag
+    is the catalog version, so a revalidation renders nothing.
+    """
+
+    def __init__(self, rows, version):
+        self._rows = rows
+        self.etag = f'"{version:.6f}"'
+        self.gzip_etag = f'"{version:.6f}-gzip"'
+        self.last_modified = version
+
+    @cached_property
+    def body(self):
+        return JSONRenderer().render(self._rows)
+
+    @cached_property
+    def gzip_body(self):
+        return gzip.compress(self.body, compresslevel=9, mtime=0)
+
+
+class IngredientPrefixIndex:
+    """Sorted case-folded names with their already serialized rows."""
+
+    def __init__(self, rows, version=None):
+        rows = sorted(
+            rows, key=lambda row: (row['name'].casefold(), row['id']))
+        self._keys = [row['name'].casefold() for row in rows]
+        self._rows = rows
+        self.version = version
+        self.built_at = self.checked_at = time.monotonic()
+
+    def __len__(self):
+        return len(self._rows)
+
+    def all(self):
+        return self._rows
+
+    @cached_property
+    def catalog(self):
+        return RenderedCatalog(self._rows, self.version or 0)
+
+    def search(self, prefix):
+        prefix = prefix.casefold()
+        start = bisect.bisect_left(self._keys, prefix)
+        end = bisect.bisect_left(self._keys, prefix + MAX_CHAR, start)
+        return self._rows[start:end]
+
+    @classmethod
+    def from_database(cls, version=None):
+        rows = Ingredient.objects.order_by().values(
+            'id', 'name', 'measurement_unit'
+        ).iterator(chunk_size=10000)
+        return cls(list(rows), version=version)
+
+
+def get_ingredient_index():
+    """
+    Возвращает индекс этого процесса. Версию каталога сверяет не чаще
+    раза в INGREDIENT_VERSION_CHECK_INTERVAL секунд и перестраивает
+    индекс, если она сменилась.
+    """
+    global _index
+    interval = getattr(settings, 'INGREDIENT_VERSION_CHECK_INTERVAL', 5)
+    index = _index
+    if index is not None and time.monotonic() - index.checked_at < interval:
+        return index
+    ttl = getattr(settings, 'INGREDIENT_INDEX_TTL', 300)
+    with _lock:
+        index = _index
+        now = time.monotonic()
+        if index is not None and now - index.checked_at < interval:
+            return index
+        version = get_catalog_version()
+        if (
+            index is None
+            or index.version != version
+            or now - index.built_at > ttl
+        ):
+            index = IngredientPrefixIndex.from_database(version=version)
+            _index = index
+        index.checked_at = time.monotonic()
+    return index
+
+
+def invalidate_ingredient_index():
+    """Сбрасывает индекс этого процесса; другие заметят новую версию сами."""
+    global _index
+    _index = None
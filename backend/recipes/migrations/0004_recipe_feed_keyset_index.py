@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-17 07:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0003_alter_ingredientinrecipe_ingredient_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['-pub_date', 'id'], name='recipe_feed_keyset_idx'),
+        ),
+    ]
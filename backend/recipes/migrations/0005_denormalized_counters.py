@@ -0,0 +1,44 @@
+# Generated by Django 4.2.30 on 2026-10-17 07:25
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def _count_of(model, fk_field):
+    return Coalesce(Subquery(
+        model.objects.filter(**{fk_field: OuterRef('pk')}).order_by().values(
+            fk_field).annotate(total=Count('*')).values('total'),
+        output_field=IntegerField()
+    ), 0)
+
+
+def populate_counters(apps, schema_editor):
+    Ingredient = apps.get_model('recipes', 'Ingredient')
+    IngredientInRecipe = apps.get_model('recipes', 'IngredientInRecipe')
+    Recipe = apps.get_model('recipes', 'Recipe')
+    Favorite = apps.get_model('recipes', 'Favorite')
+    Ingredient.objects.update(
+        recipes_count=_count_of(IngredientInRecipe, 'ingredient'))
+    Recipe.objects.update(favorites_count=_count_of(Favorite, 'recipe'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0004_recipe_feed_keyset_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ingredient',
+            name='recipes_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Используется в рецептах'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='favorites_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='В избранном'),
+        ),
+        migrations.RunPython(populate_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 4.2.30 on 2026-10-17 07:35
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import F, Sum
+
+
+def populate_shopping_lists(apps, schema_editor):
+    ShoppingCart = apps.get_model('recipes', 'ShoppingCart')
+    ShoppingListItem = apps.get_model('recipes', 'ShoppingListItem')
+    rows = ShoppingCart.objects.values(
+        'user_id', ingredient=F('recipe__recipe_ingredients__ingredient_id')
+    ).filter(ingredient__isnull=False).annotate(
+        total=Sum('recipe__recipe_ingredients__amount')
+    ).order_by()
+    ShoppingListItem.objects.bulk_create(
+        (ShoppingListItem(user_id=row['user_id'], ingredient_id=row['ingredient'],
+                          total_amount=row['total'])
+         for row in rows.iterator()),
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('recipes', '0005_denormalized_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShoppingListItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_amount', models.IntegerField(default=0, verbose_name='Общее количество')),
+                ('ingredient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shopping_list_items', to='recipes.ingredient', verbose_name='Ингредиент')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shopping_list_items', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Строка списка покупок',
+                'verbose_name_plural': 'Списки покупок',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='shoppinglistitem',
+            constraint=models.UniqueConstraint(fields=('user', 'ingredient'), name='unique_user_shopping_list_ingredient'),
+        ),
+        migrations.RunPython(populate_shopping_lists, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.30 on 2026-10-17 07:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0006_shoppinglistitem'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='image_thumbnail',
+            field=models.ImageField(blank=True, editable=False, upload_to='recipes/renditions/', verbose_name='Миниатюра'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='image_webp',
+            field=models.ImageField(blank=True, editable=False, upload_to='recipes/renditions/', verbose_name='Картинка в WebP'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 4.2.30 on 2026-10-17 07:47
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0007_image_renditions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShortLink',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('code', models.CharField(max_length=16, unique=True, verbose_name='Код')),
+                ('recipe', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='short_link', to='recipes.recipe', verbose_name='Рецепт')),
+            ],
+            options={
+                'verbose_name': 'Короткая ссылка',
+                'verbose_name_plural': 'Короткие ссылки',
+            },
+        ),
+    ]
@@ -0,0 +1,83 @@
+import re
+
+import snowballstemmer
+from django.db import migrations
+
+# Frozen copies of recipes.search: the migration must keep working however
+# that module changes later.
+FTS_TABLE = 'recipes_recipe_search'
+WORD_RE = re.compile(r'\w+')
+BATCH_SIZE = 2000
+
+POSTGRESQL_FORWARD = (
+    """
+    ALTER TABLE recipes_recipe ADD COLUMN search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('russian', coalesce(name, '')), 'A')
+        || setweight(to_tsvector('russian', coalesce(text, '')), 'B')
+    ) STORED
+    """,
+    'CREATE INDEX recipe_search_vector_idx ON recipes_recipe USING GIN (search_vector)',
+)
+POSTGRESQL_BACKWARD = (
+    'DROP INDEX IF EXISTS recipe_search_vector_idx',
+    'ALTER TABLE recipes_recipe DROP COLUMN IF EXISTS search_vector',
+)
+
+
+def stemmed(stemmer, text):
+    words = WORD_RE.findall(text.lower().replace('ё', 'е'))
+    return ' '.join(stemmer.stemWords(words))
+
+
+def index_recipes(apps, connection):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    stemmer = snowballstemmer.stemmer('russian')
+    rows = Recipe.objects.using(connection.alias).order_by('pk').values_list(
+        'pk', 'name', 'text').iterator(chunk_size=BATCH_SIZE)
+    batch = []
+    with connection.cursor() as cursor:
+        for pk, name, text in rows:
+            batch.append((pk, stemmed(stemmer, name), stemmed(stemmer, text)))
+            if len(batch) >= BATCH_SIZE:
+                cursor.executemany(
+                    f'INSERT INTO "{FTS_TABLE}" (rowid, name, text) '
+                    'VALUES (%s, %s, %s)', batch)
+                batch = []
+        if batch:
+            cursor.executemany(
+                f'INSERT INTO "{FTS_TABLE}" (rowid, name, text) '
+                'VALUES (%s, %s, %s)', batch)
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        for sql in POSTGRESQL_FORWARD:
+            schema_editor.execute(sql)
+    elif vendor == 'sqlite':
+        schema_editor.execute(
+            f'CREATE VIRTUAL TABLE "{FTS_TABLE}" USING fts5('
+            "name, text, tokenize = 'unicode61 remove_diacritics 2')"
+        )
+        index_recipes(apps, schema_editor.connection)
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        for sql in POSTGRESQL_BACKWARD:
+            schema_editor.execute(sql)
+    elif vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE IF EXISTS "{FTS_TABLE}"')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0008_shortlink'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
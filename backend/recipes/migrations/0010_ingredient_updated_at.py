@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-17 08:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0009_recipe_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ingredient',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, verbose_name='Дата изменения'),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 4.2.30 on 2026-10-17 09:03
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+FTS_TABLE = 'recipes_recipe_search'
+# bm25 column weights: a hit in the name counts as much as ten in the text.
+RANK_FUNCTION = 'bm25(10.0, 1.0)'
+
+
+def set_search_rank(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(
+            f'INSERT INTO "{FTS_TABLE}" ("{FTS_TABLE}", rank) VALUES (%s, %s)',
+            ['rank', RANK_FUNCTION])
+
+
+def reset_search_rank(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(
+            f'INSERT INTO "{FTS_TABLE}" ("{FTS_TABLE}", rank) VALUES (%s, %s)',
+            ['rank', 'bm25()'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0010_ingredient_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeSearchEntry',
+            fields=[
+                ('recipe', models.OneToOneField(db_column='rowid', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_entry', serialize=False, to='recipes.recipe', verbose_name='Рецепт')),
+                ('name', models.TextField(verbose_name='Основы слов названия')),
+                ('text', models.TextField(verbose_name='Основы слов описания')),
+                ('match', models.TextField(db_column='recipes_recipe_search')),
+                ('rank', models.FloatField()),
+            ],
+            options={
+                'verbose_name': 'Поисковая запись рецепта',
+                'verbose_name_plural': 'Поисковый индекс рецептов',
+                'db_table': 'recipes_recipe_search',
+                'managed': False,
+            },
+        ),
+        migrations.RunPython(set_search_rank, reset_search_rank),
+    ]
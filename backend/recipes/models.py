@@ -2,9 +2,11 @@ from django.db import models
 from django.conf import settings
 from django.core.validators import MinValueValidator, MaxValueValidator
 
+from core.models import CounterFieldsMixin, ImageRenditionsMixin
+
 User = settings.AUTH_USER_MODEL
 
-class Ingredient(models.Model):
+class Ingredient(CounterFieldsMixin, models.Model):
     name = models.CharField(
         'Название ингредиента',
         max_length=128
@@ -13,6 +15,18 @@ class Ingredient(models.Model):
         'Единица измерения',
         max_length=64
     )
+    recipes_count = models.PositiveIntegerField(
+        'Используется в рецептах',
+        default=0,
+        editable=False
+    )
+    updated_at = models.DateTimeField(
+        'Дата изменения',
+        auto_now=True,
+        db_index=True
+    )
+
+    counter_fields = ('recipes_count',)
 
     class Meta:
         verbose_name = 'Ингредиент'
@@ -27,7 +41,7 @@ class Ingredient(models.Model):
         return f'{self.name}, {self.measurement_unit}'
 
 
-class Recipe(models.Model):
+class Recipe(ImageRenditionsMixin, CounterFieldsMixin, models.Model):
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -46,6 +60,18 @@ class Recipe(models.Model):
         help_text='Загрузите изображение рецепта'
        
     )
+    image_thumbnail = models.ImageField(
+        'Миниатюра',
+        upload_to='recipes/renditions/',
+        blank=True,
+        editable=False
+    )
+    image_webp = models.ImageField(
+        'Картинка в WebP',
+        upload_to='recipes/renditions/',
+        blank=True,
+        editable=False
+    )
    
     text = models.TextField(
         'Описание рецепта'
@@ -71,11 +97,23 @@ class Recipe(models.Model):
         auto_now_add=True,
         db_index=True
     )
+    favorites_count = models.PositiveIntegerField(
+        'В избранном',
+        default=0,
+        editable=False
+    )
+
+    counter_fields = ('favorites_count',)
+    rendition_sources = ('image',)
 
     class Meta:
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
         ordering = ['-pub_date']
+        indexes = [
+            models.Index(fields=['-pub_date', 'id'],
+                         name='recipe_feed_keyset_idx')
+        ]
 
     def __str__(self):
         return self.name
@@ -163,4 +201,84 @@ class ShoppingCart(UserRecipeRelationBase):
         ]
 
     def __str__(self):
-        return f'{self.user} added "{self.recipe}" to shopping cart'
\ No newline at end of file
+        return f'{self.user} added "{self.recipe}" to shopping cart'
+
+
+class ShoppingListItem(models.Model):
+    """Total amount of an ingredient across a user's shopping cart."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='shopping_list_items',
+        verbose_name='Пользователь'
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        related_name='shopping_list_items',
+        verbose_name='Ингредиент'
+    )
+    total_amount = models.IntegerField('Общее количество', default=0)
+
+    class Meta:
+        verbose_name = 'Строка списка покупок'
+        verbose_name_plural = 'Списки покупок'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'ingredient'],
+                                    name='unique_user_shopping_list_ingredient')
+        ]
+
+    def __str__(self):
+        return f'{self.user}: {self.ingredient} — {self.total_amount}'
+
+
+class ShortLink(models.Model):
+    """Persistent short code of a recipe link."""
+    code = models.CharField(
+        'Код',
+        max_length=16,
+        unique=True
+    )
+    recipe = models.OneToOneField(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='short_link',
+        verbose_name='Рецепт'
+    )
+
+    class Meta:
+        verbose_name = 'Короткая ссылка'
+        verbose_name_plural = 'Короткие ссылки'
+
+    def __str__(self):
+        return f'{self.code} → {self.recipe_id}'
+
+
+class RecipeSearchEntry(models.Model):
+    """
+    Row of the SQLite FTS5 recipe index (see recipes.search).
+
+    The table is a virtual table created by migration 0009 and is absent on
+    PostgreSQL. ``match`` is the column named after the table: filtering on
+    it with ``=`` is an FTS5 MATCH. ``rank`` is bm25 with the weights set by
+    migration 0011 and is only defined in a query that matches.
+    """
+    recipe = models.OneToOneField(
+        Recipe,
+        on_delete=models.DO_NOTHING,
+        primary_key=True,
+        db_column='rowid',
+        db_constraint=False,
+        related_name='search_entry',
+        verbose_name='Рецепт'
+    )
+    name = models.TextField('Основы слов названия')
+    text = models.TextField('Основы слов описания')
+    match = models.TextField(db_column='recipes_recipe_search')
+    rank = models.FloatField()
+
+    class Meta:
+        managed = False
+        db_table = 'recipes_recipe_search'
+        verbose_name = 'Поисковая запись рецепта'
+        verbose_name_plural = 'Поисковый индекс рецептов'
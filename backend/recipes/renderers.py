@@ -0,0 +1,35 @@
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+
+class PassthroughRenderer(BaseRenderer):
+    """
+    Selects the shopping list export format via ?format= / Accept; the view
+    returns a ready (streaming) response, so only error payloads get here.
+    """
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, (bytes, str)):
+            return data
+        return JSONRenderer().render(data)
+
+
+class PlainTextRenderer(PassthroughRenderer):
+    media_type = 'text/plain'
+    format = 'txt'
+
+
+class CSVRenderer(PassthroughRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+
+class ShoppingListJSONRenderer(PassthroughRenderer):
+    media_type = 'application/json'
+    format = 'json'
+
+
+class PDFRenderer(PassthroughRenderer):
+    media_type = 'application/pdf'
+    format = 'pdf'
+    charset = None
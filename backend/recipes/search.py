@@ -0,0 +1,164 @@
+"""
+Full-text recipe search.
+
+On PostgreSQL ``recipes_recipe.search_vector`` is a generated ``tsvector``
+column (name weighted A, text weighted B) with a GIN index, matched with
+``websearch_to_tsquery('russian', ...)`` and ranked with ``ts_rank_cd``.
+
+SQLite has no Russian stemmer, so names and texts are stemmed in Python with
+the same Snowball algorithm and stored in the FTS5 table
+``recipes_recipe_search`` (rowid = recipe id), which signals keep in sync.
+Querysets join it through the unmanaged ``RecipeSearchEntry`` model and rank
+matches by its ``rank`` column, bm25 with a name weighted ten times the text.
+Other backends fall back to ``icontains``.
+"""
+import re
+import threading
+from functools import lru_cache
+
+import snowballstemmer
+from django.db import connections
+from django.db.models import F, Q
+from django.db.models.expressions import RawSQL
+
+SEARCH_CONFIG = 'russian'
+FTS_TABLE = 'recipes_recipe_search'
+WORD_RE = re.compile(r'\w+')
+
+_local = threading.local()
+
+
+@lru_cache(maxsize=200_000)
+def stem(word):
+    # Snowball stemmers keep state between calls; one per thread.
+    stemmer = getattr(_local, 'stemmer', None)
+    if stemmer is None:
+        stemmer = _local.stemmer = snowballstemmer.stemmer(SEARCH_CONFIG)
+    return stemmer.stemWord(word)
+
+
+def stem_words(text):
+    words = WORD_RE.findall(text.lower().replace('ё', 'е'))
+    return [stem(word) for word in words]
+
+
+def uses_fts(using='default'):
+    return connections[using].vendor == 'sqlite'
+
+
+def search_recipes(queryset, query):
+    """
+    Оставляет рецепты, подходящие под запрос, и сортирует их по
+    релевантности (аннотация search_rank), при равенстве — от новых к старым.
+    """
+    vendor = connections[queryset.db].vendor
+    if vendor == 'postgresql':
+        return _search_postgresql(queryset, query)
+    if vendor == 'sqlite':
+        return _search_sqlite(queryset, query)
+    return queryset.filter(Q(name__icontains=query) | Q(text__icontains=query))
+
+
+def _search_postgresql(queryset, query):
+    from django.contrib.postgres.search import (
+        SearchQuery, SearchRank, SearchVectorField,
+    )
+
+    table = connections[queryset.db].ops.quote_name(
+        queryset.model._meta.db_table)
+    vector = RawSQL(
+        f'{table}."search_vector"', [], output_field=SearchVectorField())
+    search_query = SearchQuery(
+        query, config=SEARCH_CONFIG, search_type='websearch')
+    return queryset.alias(search_vector=vector).filter(
+        search_vector=search_query
+    ).annotate(
+        search_rank=SearchRank(vector, search_query, cover_density=True)
+    ).order_by('-search_rank', '-pub_date', 'id')
+
+
+def fts_match(query):
+    """
+    Переводит синтаксис websearch, который понимает PostgreSQL (слова через
+    AND, "or" между словами, "-слово" исключает), в выражение FTS5 из основ
+    слов. Основы берутся в кавычки, поэтому FTS5 не читает их как синтаксис.
+    """
+    groups = [[]]
+    excluded = []
+    for token in query.split():
+        if token.lower() == 'or':
+            if groups[-1]:
+                groups.append([])
+            continue
+        terms = excluded if token.startswith('-') else groups[-1]
+        terms.extend(f'"{term}"' for term in stem_words(token))
+    groups = [' '.join(terms) for terms in groups if terms]
+    if not groups:
+        return None
+    match = ' OR '.join(f'({terms})' for terms in groups)
+    if excluded:
+        match = f'({match}) NOT ({" OR ".join(excluded)})'
+    return match
+
+
+def _search_sqlite(queryset, query):
+    match = fts_match(query)
+    if match is None:
+        return queryset.none()
+    # A join on rowid: bm25 is computed in one pass over the matches, not
+    # in a correlated subquery per recipe.
+    return queryset.filter(search_entry__match=match).annotate(
+        search_rank=-F('search_entry__rank')
+    ).order_by('-search_rank', '-pub_date', 'id')
+
+
+def index_rows(rows, using='default', replace=True):
+    """
+    rows: итерируемое из (id, name, text). Записывает их в таблицу FTS5;
+    на других СУБД индекс обновляется сам, и функция ничего не делает.
+    """
+    if not uses_fts(using):
+        return 0
+    rows = [
+        (pk, ' '.join(stem_words(name)), ' '.join(stem_words(text)))
+        for pk, name, text in rows
+    ]
+    if not rows:
+        return 0
+    with connections[using].cursor() as cursor:
+        if replace:
+            cursor.executemany(
+                f'DELETE FROM "{FTS_TABLE}" WHERE rowid = %s',
+                [(row[0],) for row in rows])
+        cursor.executemany(
+            f'INSERT INTO "{FTS_TABLE}" (rowid, name, text) '
+            'VALUES (%s, %s, %s)', rows)
+    return len(rows)
+
+
+def unindex(recipe_ids, using='default'):
+    if not uses_fts(using):
+        return
+    with connections[using].cursor() as cursor:
+        cursor.executemany(
+            f'DELETE FROM "{FTS_TABLE}" WHERE rowid = %s',
+            [(recipe_id,) for recipe_id in recipe_ids])
+
+
+def rebuild_index(queryset, batch_size=2000):
+    """Перестраивает FTS5-индекс по рецептам queryset. Возвращает их число."""
+    using = queryset.db
+    if not uses_fts(using):
+        return 0
+    with connections[using].cursor() as cursor:
+        cursor.execute(f'DELETE FROM "{FTS_TABLE}"')
+    rows = queryset.order_by('pk').values_list('pk', 'name', 'text').iterator(
+        chunk_size=batch_size)
+    indexed = 0
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            indexed += index_rows(batch, using, replace=False)
+            batch = []
+    return indexed + index_rows(batch, using, replace=False)
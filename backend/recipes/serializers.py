@@ -1,5 +1,9 @@
+import json
+
 from django.contrib.auth import get_user_model
 from django.db import transaction
+from django.db.models import Prefetch, prefetch_related_objects
+from django.http import QueryDict
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
 from drf_extra_fields.fields import Base64ImageField
@@ -10,6 +14,9 @@ from .models import (
     Ingredient, Recipe, IngredientInRecipe, 
     Favorite, ShoppingCart
 )
+from . import shopping_list
+from api.fields import ImageUploadField
+from core.counters import track_bulk_create
 from users.serializers import CustomUserSerializer
 
 User = get_user_model()
@@ -41,10 +48,13 @@ class IngredientInRecipeSerializer(serializers.ModelSerializer):
 
 class RecipeMinifiedSerializer(serializers.ModelSerializer): 
     image = Base64ImageField(required=False, allow_null=True, read_only=True) 
+    image_thumbnail = serializers.ImageField(read_only=True)
+    image_webp = serializers.ImageField(read_only=True)
 
     class Meta:
         model = Recipe
-        fields = ('id', 'name', 'image', 'cooking_time')
+        fields = ('id', 'name', 'image', 'image_thumbnail', 'image_webp',
+                  'cooking_time')
 
 
 class RecipeListSerializer(serializers.ModelSerializer): 
@@ -52,6 +62,8 @@ class RecipeListSerializer(serializers.ModelSerializer):
     ingredients = IngredientInRecipeSerializer( 
         many=True, source='recipe_ingredients', read_only=True) 
     image = Base64ImageField(read_only=True) 
+    image_thumbnail = serializers.ImageField(read_only=True)
+    image_webp = serializers.ImageField(read_only=True)
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
 
@@ -60,16 +72,21 @@ class RecipeListSerializer(serializers.ModelSerializer):
         fields = (
             'id', 'author',
             'ingredients', 'is_favorited', 'is_in_shopping_cart',
-            'name', 'image', 'text', 'cooking_time'
+            'name', 'image', 'image_thumbnail', 'image_webp',
+            'text', 'cooking_time'
         )
 
     def get_is_favorited(self, obj):
+        if hasattr(obj, 'is_favorited'):
+            return obj.is_favorited
         request = self.context.get('request')
         if not request or request.user.is_anonymous:
             return False
         return Favorite.objects.filter(user=request.user, recipe=obj).exists()
 
     def get_is_in_shopping_cart(self, obj):
+        if hasattr(obj, 'is_in_shopping_cart'):
+            return obj.is_in_shopping_cart
         request = self.context.get('request')
         if not request or request.user.is_anonymous:
             return False
@@ -167,9 +184,51 @@ class IngredientSerializer(serializers.ModelSerializer):
         model = Ingredient
         fields = ('id', 'name', 'measurement_unit')
 
+class PreloadedIngredientField(serializers.PrimaryKeyRelatedField):
+    """
+    Берёт ингредиент из словаря, заранее загруженного списочным
+    сериализатором, вместо отдельного SELECT на каждый id.
+    """
+    preloaded = None
+
+    def to_internal_value(self, data):
+        if self.preloaded is None:
+            return super().to_internal_value(data)
+        try:
+            if isinstance(data, bool):
+                raise TypeError
+            pk = int(data)
+            if pk != data and str(pk) != str(data).strip():
+                raise ValueError
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        ingredient = self.preloaded.get(pk)
+        if ingredient is None:
+            self.fail('does_not_exist', pk_value=data)
+        return ingredient
+
+
+class RecipeIngredientListSerializer(serializers.ListSerializer):
+    """Загружает все переданные ингредиенты одним запросом IN."""
+
+    def to_internal_value(self, data):
+        if isinstance(data, list):
+            ids = set()
+            for item in data:
+                pk = item.get('id') if isinstance(item, dict) else None
+                if isinstance(pk, bool):
+                    continue
+                try:
+                    ids.add(int(pk))
+                except (TypeError, ValueError):
+                    continue
+            self.child.fields['id'].preloaded = Ingredient.objects.in_bulk(ids)
+        return super().to_internal_value(data)
+
+
 class RecipeIngredientSerializer(serializers.ModelSerializer):
     
-    id = serializers.PrimaryKeyRelatedField(
+    id = PreloadedIngredientField(
         source='ingredient', 
         queryset=Ingredient.objects.all(),
     )
@@ -185,6 +244,7 @@ class RecipeIngredientSerializer(serializers.ModelSerializer):
     class Meta:
         model = RecipeIngredient 
         fields = ('id', 'name', 'measurement_unit', 'amount')
+        list_serializer_class = RecipeIngredientListSerializer
 
 
 class RecipeSerializer(serializers.ModelSerializer):
@@ -194,6 +254,8 @@ class RecipeSerializer(serializers.ModelSerializer):
         many=True, source='recipe_ingredients', read_only=True)
    
     image = serializers.ImageField(read_only=True)
+    image_thumbnail = serializers.ImageField(read_only=True)
+    image_webp = serializers.ImageField(read_only=True)
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
 
@@ -202,7 +264,8 @@ class RecipeSerializer(serializers.ModelSerializer):
         fields = (
             'id', 'author', 
             'ingredients', 'is_favorited', 'is_in_shopping_cart',
-            'name', 'image', 'text', 'cooking_time'
+            'name', 'image', 'image_thumbnail', 'image_webp',
+            'text', 'cooking_time'
         )
 
     def get_image(self, obj):
@@ -218,12 +281,16 @@ class RecipeSerializer(serializers.ModelSerializer):
       
         return ""
     def get_is_favorited(self, obj):
+        if hasattr(obj, 'is_favorited'):
+            return obj.is_favorited
         request = self.context.get('request')
         if not request or request.user.is_anonymous:
             return False
         return Favorite.objects.filter(user=request.user, recipe=obj).exists()
 
     def get_is_in_shopping_cart(self, obj):
+        if hasattr(obj, 'is_in_shopping_cart'):
+            return obj.is_in_shopping_cart
         request = self.context.get('request')
         if not request or request.user.is_anonymous:
             return False
@@ -235,7 +302,7 @@ class RecipeSerializer(serializers.ModelSerializer):
 class RecipeCreateUpdateSerializer(serializers.ModelSerializer):
    
     ingredients = RecipeIngredientSerializer(many=True)
-    image = Base64ImageField(required=True, allow_null=False)
+    image = ImageUploadField(required=True, allow_null=False)
     cooking_time = serializers.IntegerField(
         min_value=1 
     )
@@ -248,6 +315,21 @@ class RecipeCreateUpdateSerializer(serializers.ModelSerializer):
         read_only_fields = ('author',) 
 
 
+    def to_internal_value(self, data):
+        """
+        В multipart/form-data картинка приходит файлом, а ингредиенты
+        JSON-строкой.
+        """
+        if isinstance(data, QueryDict):
+            data = data.dict()
+            if isinstance(data.get('ingredients'), str):
+                try:
+                    data['ingredients'] = json.loads(data['ingredients'])
+                except ValueError:
+                    raise serializers.ValidationError(
+                        {'ingredients': 'Некорректный JSON в поле ingredients.'})
+        return super().to_internal_value(data)
+
     def validate_image(self, value):
         
         if value is None or not getattr(value, 'name', None):
@@ -278,18 +360,50 @@ class RecipeCreateUpdateSerializer(serializers.ModelSerializer):
 
         return data
 
-    def _manage_ingredients(self, recipe, ingredients_data):
-        
-        RecipeIngredient.objects.filter(recipe=recipe).delete()
-        
-        recipe_ingredients_to_create = [
-            RecipeIngredient(
-                recipe=recipe,
-                ingredient=item_data['ingredient'],
-                amount=item_data['amount']
-            ) for item_data in ingredients_data
-        ]
-        RecipeIngredient.objects.bulk_create(recipe_ingredients_to_create)
+    def _manage_ingredients(self, recipe, ingredients_data, created=False):
+        """
+        Приводит ингредиенты рецепта к переданному списку: добавляет новые
+        строки, обновляет изменившиеся количества и удаляет лишние,
+        не трогая совпадающие. Удалённые строки вычитаются из списков
+        покупок сигналами удаления. Возвращает строки в порядке запроса.
+        """
+        existing = {} if created else {
+            row.ingredient_id: row
+            for row in RecipeIngredient.objects.filter(recipe=recipe)
+        }
+        rows, to_create, to_update = [], [], []
+        amount_changes = {}
+        for item_data in ingredients_data:
+            ingredient = item_data['ingredient']
+            row = existing.pop(ingredient.id, None)
+            if row is None:
+                row = RecipeIngredient(
+                    recipe=recipe,
+                    ingredient=ingredient,
+                    amount=item_data['amount']
+                )
+                to_create.append(row)
+                amount_changes[ingredient.id] = row.amount
+            else:
+                row.ingredient = ingredient
+                if row.amount != item_data['amount']:
+                    amount_changes[ingredient.id] = item_data['amount'] - row.amount
+                    row.amount = item_data['amount']
+                    to_update.append(row)
+            rows.append(row)
+
+        if existing:
+            RecipeIngredient.objects.filter(
+                id__in=[row.id for row in existing.values()]
+            ).delete()
+        if to_update:
+            RecipeIngredient.objects.bulk_update(to_update, ['amount'])
+        if to_create:
+            RecipeIngredient.objects.bulk_create(to_create)
+            track_bulk_create(RecipeIngredient, to_create)
+        if not created:
+            shopping_list.recipe_ingredients_changed(recipe.id, amount_changes)
+        return rows
 
     
     @transaction.atomic
@@ -297,29 +411,17 @@ class RecipeCreateUpdateSerializer(serializers.ModelSerializer):
         ingredients_data = validated_data.pop('ingredients')
         author = self.context.get('request').user
 
-        print(">>> serializer.create: author =", author)
-        print(">>> serializer.create: validated_data BEFORE create =", validated_data)
-
-        try:
-            
-            recipe = Recipe.objects.create(
-                author=author,
-                name=validated_data.get('name'),
-                text=validated_data.get('text'),
-                cooking_time=validated_data.get('cooking_time'),
-                image=validated_data.get('image') 
-            )
-        except TypeError as e:
-            print("!!! TypeError during Recipe.objects.create:", e)
-           
-            import inspect
-            print("!!! Arguments passed to create:", inspect.getcallargs(Recipe.objects.create, author=author, **validated_data))
-            raise e
-        except Exception as e: 
-            print("!!! Other error during Recipe.objects.create:", e)
-            raise e
-        
-        self._manage_ingredients(recipe, ingredients_data) 
+        recipe = Recipe.objects.create(
+            author=author,
+            name=validated_data.get('name'),
+            text=validated_data.get('text'),
+            cooking_time=validated_data.get('cooking_time'),
+            image=validated_data.get('image')
+        )
+        self._ingredient_rows = self._manage_ingredients(
+            recipe, ingredients_data, created=True)
+        recipe.is_favorited = False
+        recipe.is_in_shopping_cart = False
         return recipe
 
     @transaction.atomic
@@ -330,17 +432,40 @@ class RecipeCreateUpdateSerializer(serializers.ModelSerializer):
         instance = super().update(instance, validated_data)
 
         if ingredients_data is not None:
-            self._manage_ingredients(instance, ingredients_data)
+            self._ingredient_rows = self._manage_ingredients(
+                instance, ingredients_data)
 
-        instance.save()
         return instance
 
     def to_representation(self, instance):
-        
-        instance.refresh_from_db()
-        
+        rows = getattr(self, '_ingredient_rows', None)
+        if rows is None:
+            # PATCH без ингредиентов: строки читаются одним запросом
+            # вместе с названиями.
+            prefetch_related_objects([instance], Prefetch(
+                'recipe_ingredients',
+                queryset=RecipeIngredient.objects.select_related('ingredient')
+            ))
+        else:
+            self._set_prefetched_ingredients(instance, rows)
         return RecipeSerializer(instance, context=self.context).data
 
+    @staticmethod
+    def _set_prefetched_ingredients(recipe, rows):
+        """
+        Кладёт строки, записанные _manage_ingredients, в кеш prefetch
+        рецепта так же, как это делает prefetch_related: ингредиенты в них
+        уже загружены PreloadedIngredientField, и ответ собирается без
+        повторного чтения. UpdateModelMixin сбрасывает этот кеш после
+        сохранения, поэтому он заполняется здесь, а не в update().
+        """
+        queryset = recipe.recipe_ingredients.all()
+        queryset._result_cache = sorted(rows, key=lambda row: row.pk or 0)
+        queryset._prefetch_done = True
+        if not hasattr(recipe, '_prefetched_objects_cache'):
+            recipe._prefetched_objects_cache = {}
+        recipe._prefetched_objects_cache['recipe_ingredients'] = queryset
+
 
 class RecipeShortSerializer(serializers.ModelSerializer):
     
@@ -380,4 +505,15 @@ class ShoppingCartSerializer(serializers.ModelSerializer):
 
 class RecipeGetShortLinkSerializer(serializers.Serializer):
     short_link = serializers.URLField(source='short-link', read_only=True)
-   
\ No newline at end of file
+   
+
+
+class RecipeIdsSerializer(serializers.Serializer):
+    recipes = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=settings.BULK_RECIPES_LIMIT
+    )
+
+    def validate_recipes(self, value):
+        return list(dict.fromkeys(value))
@@ -0,0 +1,130 @@
+"""
+Per-user shopping list totals maintained by deltas.
+
+``ShoppingListItem`` holds, for each user and ingredient, the sum of
+``IngredientInRecipe.amount`` over the recipes in the user's cart. Adding or
+removing cart items and changing a cart recipe's ingredients apply the
+difference with one ``INSERT ... ON CONFLICT DO UPDATE`` per batch, so the
+download reads the totals instead of aggregating the cart. Deleted cart
+items and recipe ingredients are applied once per ``delete()`` call, cascades
+included (see ``recipes.signals``).
+"""
+from collections import Counter, defaultdict
+
+from django.db import connection
+from django.db.models import F, Sum
+
+from .models import IngredientInRecipe, ShoppingCart, ShoppingListItem
+
+UPSERT_BATCH_SIZE = 500
+
+
+def apply_deltas(deltas):
+    """deltas: {(user_id, ingredient_id): изменение количества}."""
+    items = [(key, amount) for key, amount in deltas.items() if amount]
+    if not items:
+        return
+    table = connection.ops.quote_name(ShoppingListItem._meta.db_table)
+    with connection.cursor() as cursor:
+        for start in range(0, len(items), UPSERT_BATCH_SIZE):
+            batch = items[start:start + UPSERT_BATCH_SIZE]
+            values = ', '.join(['(%s, %s, %s)'] * len(batch))
+            params = [
+                value
+                for (user_id, ingredient_id), amount in batch
+                for value in (user_id, ingredient_id, amount)
+            ]
+            cursor.execute(
+                f'INSERT INTO {table} (user_id, ingredient_id, total_amount) '
+                f'VALUES {values} '
+                f'ON CONFLICT (user_id, ingredient_id) DO UPDATE '
+                f'SET total_amount = '
+                f'{table}.total_amount + excluded.total_amount',
+                params
+            )
+    user_ids = {user_id for (user_id, _), _ in items}
+    if any(amount < 0 for _, amount in items):
+        ShoppingListItem.objects.filter(
+            user_id__in=user_ids, total_amount__lte=0
+        ).delete()
+
+
+def carts_changed(items, sign=1):
+    """
+    items: пары (user_id, recipe_id) позиций корзин, добавленных (sign=1)
+    или убранных (-1).
+    """
+    users_by_recipe = defaultdict(Counter)
+    for user_id, recipe_id in items:
+        users_by_recipe[recipe_id][user_id] += 1
+    if not users_by_recipe:
+        return
+    deltas = defaultdict(int)
+    rows = IngredientInRecipe.objects.filter(
+        recipe_id__in=list(users_by_recipe)
+    ).values_list('recipe_id', 'ingredient_id', 'amount')
+    for recipe_id, ingredient_id, amount in rows:
+        for user_id, count in users_by_recipe[recipe_id].items():
+            deltas[user_id, ingredient_id] += sign * amount * count
+    apply_deltas(deltas)
+
+
+def cart_changed(user_id, recipe_ids, sign=1):
+    """Рецепты добавлены (sign=1) в корзину пользователя или убраны (-1)."""
+    carts_changed([(user_id, recipe_id) for recipe_id in recipe_ids], sign)
+
+
+def recipes_ingredients_changed(changes):
+    """changes: {(recipe_id, ingredient_id): изменение количества}."""
+    changes = {key: amount for key, amount in changes.items() if amount}
+    if not changes:
+        return
+    users_by_recipe = defaultdict(list)
+    carts = ShoppingCart.objects.filter(
+        recipe_id__in={recipe_id for recipe_id, _ in changes}
+    ).values_list('recipe_id', 'user_id')
+    for recipe_id, user_id in carts:
+        users_by_recipe[recipe_id].append(user_id)
+    deltas = defaultdict(int)
+    for (recipe_id, ingredient_id), amount in changes.items():
+        for user_id in users_by_recipe[recipe_id]:
+            deltas[user_id, ingredient_id] += amount
+    apply_deltas(deltas)
+
+
+def recipe_ingredients_changed(recipe_id, changes):
+    """changes: {ingredient_id: изменение количества} для одного рецепта."""
+    recipes_ingredients_changed({
+        (recipe_id, ingredient_id): amount
+        for ingredient_id, amount in changes.items()
+    })
+
+
+def compute_totals(user_ids):
+    """Суммы, посчитанные по корзинам напрямую (эталон для проверки)."""
+    rows = ShoppingCart.objects.filter(user_id__in=user_ids).values(
+        'user_id', ingredient=F('recipe__recipe_ingredients__ingredient_id')
+    ).filter(ingredient__isnull=False).annotate(
+        total=Sum('recipe__recipe_ingredients__amount')
+    ).order_by()
+    return {(row['user_id'], row['ingredient']): row['total'] for row in rows}
+
+
+def stored_totals(user_ids):
+    rows = ShoppingListItem.objects.filter(
+        user_id__in=user_ids, total_amount__gt=0
+    ).values_list('user_id', 'ingredient_id', 'total_amount')
+    return {
+        (user_id, ingredient_id): total
+        for user_id, ingredient_id, total in rows
+    }
+
+
+def rebuild(user_ids):
+    """Пересобирает списки покупок пользователей с нуля."""
+    ShoppingListItem.objects.filter(user_id__in=user_ids).delete()
+    ShoppingListItem.objects.bulk_create(
+        ShoppingListItem(user_id=user_id, ingredient_id=ingredient_id,
+                         total_amount=total)
+        for (user_id, ingredient_id), total in compute_totals(user_ids).items()
+    )
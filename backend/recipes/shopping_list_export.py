@@ -0,0 +1,136 @@
+"""
+Shopping list exporters.
+
+Text, CSV and JSON are generated row by row from a server-side cursor over
+``ShoppingListItem`` and streamed; the PDF is rendered with ``reportlab`` and
+cached under a hash of the rows it shows, so any change to the list or to
+ingredient names gives a new key without explicit invalidation.
+"""
+import csv
+import hashlib
+import io
+import json
+import logging
+from itertools import chain
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import ShoppingListItem
+
+try:
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
+    from reportlab.pdfgen import canvas
+except ImportError:
+    canvas = None
+
+CHUNK_SIZE = 2000
+EMPTY_LIST_TEXT = 'Ваш список покупок пуст.'
+TITLE = 'Список покупок:'
+PDF_CACHE_KEY = 'shopping_list:pdf:{}'
+PDF_FONT_NAME = 'ShoppingListFont'
+
+logger = logging.getLogger('foodgram.shopping_list')
+
+pdf_available = canvas is not None
+
+
+def iter_items(user):
+    """(название, единица, количество) в алфавитном порядке, курсором."""
+    return ShoppingListItem.objects.filter(
+        user=user, total_amount__gt=0
+    ).values_list(
+        'ingredient__name', 'ingredient__measurement_unit', 'total_amount'
+    ).order_by('ingredient__name').iterator(chunk_size=CHUNK_SIZE)
+
+
+def iter_text(user):
+    items = iter_items(user)
+    first = next(items, None)
+    if first is None:
+        yield EMPTY_LIST_TEXT
+        return
+    yield TITLE + '\n'
+    for name, unit, amount in chain([first], items):
+        yield f'\n- {name} ({unit}) — {amount}'
+
+
+class _Echo:
+    def write(self, value):
+        return value
+
+
+def iter_csv(user):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(('name', 'measurement_unit', 'amount'))
+    for row in iter_items(user):
+        yield writer.writerow(row)
+
+
+def iter_json(user):
+    yield '['
+    for position, (name, unit, amount) in enumerate(iter_items(user)):
+        item = json.dumps(
+            {'name': name, 'measurement_unit': unit, 'amount': amount},
+            ensure_ascii=False
+        )
+        yield item if position == 0 else ',' + item
+    yield ']'
+
+
+def _register_pdf_font():
+    if PDF_FONT_NAME in pdfmetrics.getRegisteredFontNames():
+        return PDF_FONT_NAME
+    font_path = Path(settings.SHOPPING_LIST_PDF_FONT)
+    if not font_path.exists():
+        # Helvetica has no Cyrillic: ingredient names come out as boxes.
+        logger.warning(
+            'SHOPPING_LIST_PDF_FONT %s not found; the shopping list PDF '
+            'falls back to Helvetica and cannot show Cyrillic text.',
+            font_path)
+        return 'Helvetica'
+    pdfmetrics.registerFont(TTFont(PDF_FONT_NAME, str(font_path)))
+    return PDF_FONT_NAME
+
+
+def render_pdf(user):
+    """Рендерит PDF или берёт его из кеша по хешу строк списка."""
+    items = list(iter_items(user))
+    digest = hashlib.sha256(
+        json.dumps(items, ensure_ascii=False).encode()).hexdigest()
+    key = PDF_CACHE_KEY.format(digest)
+    content = cache.get(key)
+    if content is not None:
+        return content
+
+    buffer = io.BytesIO()
+    font = _register_pdf_font()
+    pdf = canvas.Canvas(buffer, pagesize=A4)
+    width, height = A4
+    margin, line_height = 50, 18
+    y = height - margin
+
+    def write_line(text, size=12):
+        nonlocal y
+        if y < margin:
+            pdf.showPage()
+            y = height - margin
+        pdf.setFont(font, size)
+        pdf.drawString(margin, y, text)
+        y -= line_height
+
+    if not items:
+        write_line(EMPTY_LIST_TEXT)
+    else:
+        write_line(TITLE, size=16)
+        y -= line_height / 2
+        for name, unit, amount in items:
+            write_line(f'- {name} ({unit}) — {amount}')
+    pdf.save()
+
+    content = buffer.getvalue()
+    cache.set(key, content, settings.SHOPPING_LIST_PDF_CACHE_TIMEOUT)
+    return content
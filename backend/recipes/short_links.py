@@ -0,0 +1,110 @@
+"""
+Short recipe links.
+
+Every recipe gets a random base62 code stored in ``ShortLink`` the first time
+its link is requested (or in bulk with ``generate_short_links``). Codes never
+change, so ``/s/<code>`` resolves them through a process-local LRU and only
+falls back to a single-column lookup on a miss; the recipe itself is never
+loaded.
+"""
+import secrets
+import string
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+
+from .models import ShortLink
+
+ALPHABET = string.digits + string.ascii_letters
+MAX_ATTEMPTS = 5
+
+
+def generate_code(length=None):
+    length = length or settings.SHORT_LINK_CODE_LENGTH
+    return ''.join(secrets.choice(ALPHABET) for _ in range(length))
+
+
+def is_valid_code(code):
+    max_length = ShortLink._meta.get_field('code').max_length
+    return 0 < len(code) <= max_length and all(
+        char in ALPHABET for char in code)
+
+
+class LRUCache:
+    """Thread-safe LRU of code → recipe id."""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            if len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def discard(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+_codes = LRUCache(settings.SHORT_LINK_CACHE_SIZE)
+
+
+def resolve(code):
+    """Id рецепта по короткому коду или None."""
+    recipe_id = _codes.get(code)
+    if recipe_id is None:
+        recipe_id = ShortLink.objects.filter(code=code).values_list(
+            'recipe_id', flat=True).first()
+        if recipe_id is not None:
+            _codes.set(code, recipe_id)
+    return recipe_id
+
+
+def forget(code):
+    _codes.discard(code)
+
+
+def get_code(recipe_id):
+    return ShortLink.objects.filter(recipe_id=recipe_id).values_list(
+        'code', flat=True).first()
+
+
+def create_code(recipe_id):
+    """
+    Создаёт код для существующего рецепта. Совпадение случайного кода
+    с уже занятым разрешается повторной попыткой, а одновременное создание
+    кода для того же рецепта возвращает код, созданный первым.
+    """
+    for _ in range(MAX_ATTEMPTS):
+        code = generate_code()
+        try:
+            with transaction.atomic():
+                ShortLink.objects.create(code=code, recipe_id=recipe_id)
+        except IntegrityError:
+            existing = get_code(recipe_id)
+            if existing is not None:
+                return existing
+            continue
+        _codes.set(code, recipe_id)
+        return code
+    raise IntegrityError('Could not generate a unique short link code.')
@@ -0,0 +1,113 @@
+from collections import defaultdict
+
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from core.deletion import connect_batch_delete
+
+from . import search, shopping_list, short_links
+from .ingredient_index import (
+    bump_catalog_version, invalidate_ingredient_index,
+)
+from .models import (
+    Ingredient, IngredientInRecipe, Recipe, ShoppingCart, ShortLink,
+)
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def ingredient_changed(sender, **kwargs):
+    invalidate_ingredient_index()
+    bump_catalog_version()
+
+
+SEARCH_FIELDS = {'name', 'text'}
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_saved(sender, instance, created, raw=False, using='default',
+                 update_fields=None, **kwargs):
+    if raw:
+        return
+    # save(update_fields=...) без названия и текста индекс не меняет.
+    if update_fields is not None and not SEARCH_FIELDS & set(update_fields):
+        return
+    search.index_rows(
+        [(instance.pk, instance.name, instance.text)], using,
+        replace=not created)
+
+
+def recipes_deleted(sender, instances, using):
+    search.unindex([recipe.pk for recipe in instances], using)
+
+
+@receiver(post_delete, sender=ShortLink)
+def short_link_deleted(sender, instance, **kwargs):
+    short_links.forget(instance.code)
+
+
+@receiver(pre_save, sender=ShoppingCart)
+@receiver(pre_save, sender=IngredientInRecipe)
+def remember_previous_row(sender, instance, raw=False, **kwargs):
+    if raw or instance._state.adding or instance.pk is None:
+        return
+    instance._shopping_list_previous = sender.objects.filter(
+        pk=instance.pk).first()
+
+
+def _previous_row(instance, created):
+    if created:
+        return None
+    return getattr(instance, '_shopping_list_previous', None)
+
+
+@receiver(post_save, sender=ShoppingCart)
+def cart_item_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previous = _previous_row(instance, created)
+    if previous is not None:
+        if (previous.user_id, previous.recipe_id) == (
+                instance.user_id, instance.recipe_id):
+            return
+        shopping_list.cart_changed(previous.user_id, [previous.recipe_id], -1)
+    if created or previous is not None:
+        shopping_list.cart_changed(instance.user_id, [instance.recipe_id])
+
+
+def cart_items_deleted(sender, instances, using):
+    shopping_list.carts_changed(
+        [(item.user_id, item.recipe_id) for item in instances], -1)
+
+
+@receiver(post_save, sender=IngredientInRecipe)
+def recipe_ingredient_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previous = _previous_row(instance, created)
+    if previous is not None:
+        if previous.recipe_id != instance.recipe_id:
+            shopping_list.recipe_ingredients_changed(
+                previous.recipe_id, {previous.ingredient_id: -previous.amount})
+            shopping_list.recipe_ingredients_changed(
+                instance.recipe_id, {instance.ingredient_id: instance.amount})
+            return
+        changes = {previous.ingredient_id: -previous.amount}
+        changes[instance.ingredient_id] = (
+            changes.get(instance.ingredient_id, 0) + instance.amount)
+        shopping_list.recipe_ingredients_changed(instance.recipe_id, changes)
+    elif created:
+        shopping_list.recipe_ingredients_changed(
+            instance.recipe_id, {instance.ingredient_id: instance.amount})
+
+
+def recipe_ingredients_deleted(sender, instances, using):
+    changes = defaultdict(int)
+    for row in instances:
+        changes[row.recipe_id, row.ingredient_id] -= row.amount
+    shopping_list.recipes_ingredients_changed(changes)
+
+
+connect_batch_delete(recipes_deleted, Recipe)
+connect_batch_delete(cart_items_deleted, ShoppingCart)
+connect_batch_delete(recipe_ingredients_deleted, IngredientInRecipe)
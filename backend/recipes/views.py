@@ -1,7 +1,12 @@
 
 from django.shortcuts import get_object_or_404
-from django.http import HttpResponse
-from django.db.models import Sum, F
+from django.http import HttpResponse, HttpResponseRedirect, StreamingHttpResponse
+from django.urls import reverse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+from django.db import IntegrityError, transaction
+from django.db.models import Exists, F, OuterRef, Value
+from django.http import Http404
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import viewsets, status, permissions
 from rest_framework.decorators import action
@@ -9,40 +14,85 @@ from rest_framework.response import Response
 
 from .models import (
     Recipe, Ingredient, Favorite, ShoppingCart,
-    IngredientInRecipe 
+    ShoppingListItem
 )
 from .serializers import (
     RecipeListSerializer, 
     RecipeCreateUpdateSerializer,
     IngredientSerializer,
     RecipeMinifiedSerializer,
-    RecipeGetShortLinkSerializer
+    RecipeGetShortLinkSerializer,
+    RecipeIdsSerializer,
 )
-from api.pagination import CustomPageNumberPagination
+from . import shopping_list, shopping_list_export, short_links
+from .ingredient_index import get_ingredient_index
+from .renderers import (
+    CSVRenderer, PDFRenderer, PlainTextRenderer, ShoppingListJSONRenderer
+)
+from api.pagination import RecipeFeedPagination, bump_count_version
+from core.counters import track_bulk_create
 from api.permissions import IsOwnerOrReadOnly
 from api.filters import RecipeFilter
 
 
+SHOPPING_LIST_STREAMS = {
+    'txt': ('text/plain; charset=utf-8', shopping_list_export.iter_text),
+    'csv': ('text/csv; charset=utf-8', shopping_list_export.iter_csv),
+    'json': ('application/json', shopping_list_export.iter_json),
+}
+SHOPPING_LIST_RENDERERS = [
+    PlainTextRenderer, CSVRenderer, ShoppingListJSONRenderer
+] + ([PDFRenderer] if shopping_list_export.pdf_available else [])
+
+
 def generate_shopping_list_text(user):
-   
-    ingredients = IngredientInRecipe.objects.filter(
-        recipe__shopping_cart_items__user=user
-    ).values(
-        name=F('ingredient__name'),
-        unit=F('ingredient__measurement_unit')
-    ).annotate(
-        total_amount=Sum('amount')
-    ).order_by('name')
-
-    if not ingredients:
-        return "Ваш список покупок пуст."
-
-    shopping_list = ["Список покупок:\n"]
-    for item in ingredients:
-        shopping_list.append(
-            f"- {item['name']} ({item['unit']}) — {item['total_amount']}"
+    return ''.join(shopping_list_export.iter_text(user))
+
+
+def accepts_gzip(header):
+    """
+    Разбирает Accept-Encoding с учётом q-значений: gzip;q=0 запрещает
+    сжатие, а * разрешает его, если gzip не назван явно.
+    """
+    qualities = {}
+    for item in header.split(','):
+        coding, *params = item.split(';')
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[coding.strip().lower()] = quality
+    for coding in ('gzip', 'x-gzip', '*'):
+        if coding in qualities:
+            return qualities[coding] > 0
+    return False
+
+
+def rendered_catalog_response(request, catalog):
+    """
+    Отдаёт заранее отрендеренный каталог с ETag/Last-Modified,
+    отвечая 304 на совпадающий If-None-Match.
+    """
+    use_gzip = accepts_gzip(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+    etag = catalog.gzip_etag if use_gzip else catalog.etag
+    response = get_conditional_response(
+        request, etag=etag, last_modified=int(catalog.last_modified)
+    )
+    if response is None:
+        response = HttpResponse(
+            catalog.gzip_body if use_gzip else catalog.body,
+            content_type='application/json'
         )
-    return "\n".join(shopping_list)
+        if use_gzip:
+            response['Content-Encoding'] = 'gzip'
+        response['Last-Modified'] = http_date(catalog.last_modified)
+    response['ETag'] = etag
+    patch_vary_headers(response, ('Accept-Encoding',))
+    return response
 
 
 class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
@@ -58,20 +108,47 @@ class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
             queryset = queryset.filter(name__istartswith=name_query)
         return queryset
 
+    def list(self, request, *args, **kwargs):
+        """
+        Поиск по началу названия и полный каталог обслуживаются
+        индексом в памяти без обращения к базе.
+        """
+        index = get_ingredient_index()
+        name_query = request.query_params.get('name')
+        if name_query:
+            return Response(index.search(name_query))
+        if request.accepted_renderer.format != 'json':
+            return super().list(request, *args, **kwargs)
+        return rendered_catalog_response(request, index.catalog)
+
 
 class RecipeViewSet(viewsets.ModelViewSet):
     queryset = Recipe.objects.select_related('author').prefetch_related(
-       
-        'recipe_ingredients__ingredient', 
-        'favorites',
-        'shopping_cart_items'
+        'recipe_ingredients__ingredient',
     ).all().order_by('-pub_date')
 
-    pagination_class = CustomPageNumberPagination
+    pagination_class = RecipeFeedPagination
+    count_cache_models = (Recipe, Favorite, ShoppingCart)
     permission_classes = [permissions.IsAuthenticatedOrReadOnly, IsOwnerOrReadOnly]
     filter_backends = [DjangoFilterBackend]
     filterset_class = RecipeFilter
 
+    def get_queryset(self):
+        """Аннотирует флаги избранного и корзины для текущего пользователя."""
+        queryset = super().get_queryset()
+        user = self.request.user
+        if user.is_anonymous:
+            return queryset.annotate(
+                is_favorited=Value(False),
+                is_in_shopping_cart=Value(False)
+            )
+        return queryset.annotate(
+            is_favorited=Exists(Favorite.objects.filter(
+                user=user, recipe=OuterRef('pk'))),
+            is_in_shopping_cart=Exists(ShoppingCart.objects.filter(
+                user=user, recipe=OuterRef('pk')))
+        )
+
     def get_serializer_class(self):
         if self.action in ('create', 'update', 'partial_update'):
             return RecipeCreateUpdateSerializer
@@ -79,6 +156,8 @@ class RecipeViewSet(viewsets.ModelViewSet):
             return RecipeMinifiedSerializer 
         elif self.action == 'get_link':
             return RecipeGetShortLinkSerializer
+        elif self.action in ('favorite_bulk', 'shopping_cart_bulk'):
+            return RecipeIdsSerializer
         return RecipeListSerializer 
 
     def perform_create(self, serializer):
@@ -86,25 +165,36 @@ class RecipeViewSet(viewsets.ModelViewSet):
         serializer.save(author=self.request.user)
 
     def _manage_user_recipe_relation(self, request, pk, related_model, error_messages):
+        """
+        Добавление опирается на уникальное ограничение (INSERT в savepoint),
+        удаление — на число удалённых строк, поэтому повторные и
+        одновременные клики не приводят к IntegrityError.
+        """
         user = request.user
-        recipe = get_object_or_404(Recipe, pk=pk)
-        relation_exists = related_model.objects.filter(user=user, recipe=recipe).exists()
 
         if request.method == 'POST':
-            if relation_exists:
+            recipe = get_object_or_404(
+                Recipe.objects.only(
+                    'id', 'name', 'image', 'image_thumbnail', 'image_webp',
+                    'cooking_time'
+                ), pk=pk)
+            try:
+                with transaction.atomic():
+                    related_model.objects.create(user=user, recipe=recipe)
+            except IntegrityError:
                 return Response({'errors': error_messages['already_exists']},
                                 status=status.HTTP_400_BAD_REQUEST)
-            related_model.objects.create(user=user, recipe=recipe)
             serializer = RecipeMinifiedSerializer(recipe, context={'request': request}) 
             return Response(serializer.data, status=status.HTTP_201_CREATED)
 
         elif request.method == 'DELETE':
-            if not relation_exists:
-                return Response({'errors': error_messages['not_exists']},
-                                status=status.HTTP_400_BAD_REQUEST)
-            relation = get_object_or_404(related_model, user=user, recipe=recipe)
-            relation.delete()
-            return Response(status=status.HTTP_204_NO_CONTENT)
+            deleted, _ = related_model.objects.filter(user=user, recipe_id=pk).delete()
+            if deleted:
+                return Response(status=status.HTTP_204_NO_CONTENT)
+            if not Recipe.objects.filter(pk=pk).exists():
+                raise Http404
+            return Response({'errors': error_messages['not_exists']},
+                            status=status.HTTP_400_BAD_REQUEST)
 
         return Response(status=status.HTTP_405_METHOD_NOT_ALLOWED)
 
@@ -124,30 +214,132 @@ class RecipeViewSet(viewsets.ModelViewSet):
         }
         return self._manage_user_recipe_relation(request, pk, ShoppingCart, error_messages)
 
-    @action(detail=False, methods=['get'], permission_classes=[permissions.IsAuthenticated], url_path='download_shopping_cart', url_name='download_shopping_cart')
+    def _bulk_add(self, user, recipe_ids, related_model):
+        """Добавляет связи одним bulk INSERT; повторяет при гонке вставок."""
+        for attempt in range(2):
+            try:
+                with transaction.atomic():
+                    found = set(Recipe.objects.filter(
+                        id__in=recipe_ids).values_list('id', flat=True))
+                    already = set(related_model.objects.filter(
+                        user=user, recipe_id__in=recipe_ids
+                    ).values_list('recipe_id', flat=True))
+                    created = [
+                        related_model(user=user, recipe_id=recipe_id)
+                        for recipe_id in recipe_ids
+                        if recipe_id in found and recipe_id not in already
+                    ]
+                    related_model.objects.bulk_create(created)
+                    track_bulk_create(related_model, created)
+                    if related_model is ShoppingCart:
+                        shopping_list.cart_changed(
+                            user.id, [item.recipe_id for item in created])
+                break
+            except IntegrityError:
+                if attempt:
+                    raise
+        if created:
+            bump_count_version(related_model)
+
+        def outcome(recipe_id):
+            if recipe_id not in found:
+                return 'not_found'
+            return 'already_exists' if recipe_id in already else 'added'
+        return [{'id': recipe_id, 'status': outcome(recipe_id)}
+                for recipe_id in recipe_ids]
+
+    def _bulk_remove(self, user, recipe_ids, related_model):
+        """
+        Удаляет связи одним DELETE; счётчики и списки покупок обновляют
+        сигналы удаления.
+        """
+        relations = related_model.objects.filter(
+            user=user, recipe_id__in=recipe_ids)
+        with transaction.atomic():
+            removed = set(
+                relations.select_for_update().values_list('recipe_id', flat=True))
+            if removed:
+                relations.filter(recipe_id__in=removed).delete()
+        missing = [recipe_id for recipe_id in recipe_ids if recipe_id not in removed]
+        found = set(Recipe.objects.filter(
+            id__in=missing).values_list('id', flat=True)) if missing else set()
+
+        def outcome(recipe_id):
+            if recipe_id in removed:
+                return 'removed'
+            return 'not_exists' if recipe_id in found else 'not_found'
+        return [{'id': recipe_id, 'status': outcome(recipe_id)}
+                for recipe_id in recipe_ids]
+
+    def _manage_bulk_relation(self, request, related_model):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        recipe_ids = serializer.validated_data['recipes']
+        if request.method == 'POST':
+            results = self._bulk_add(request.user, recipe_ids, related_model)
+        else:
+            results = self._bulk_remove(request.user, recipe_ids, related_model)
+        return Response({'results': results}, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['post', 'delete'], permission_classes=[permissions.IsAuthenticated], url_path='favorite/bulk', url_name='favorite_bulk')
+    def favorite_bulk(self, request):
+        """Добавляет (POST) или убирает (DELETE) из избранного список рецептов."""
+        return self._manage_bulk_relation(request, Favorite)
+
+    @action(detail=False, methods=['post', 'delete'], permission_classes=[permissions.IsAuthenticated], url_path='shopping_cart/bulk', url_name='shopping_cart_bulk')
+    def shopping_cart_bulk(self, request):
+        """Добавляет (POST) или убирает (DELETE) из списка покупок список рецептов."""
+        return self._manage_bulk_relation(request, ShoppingCart)
+
+    @action(detail=False, methods=['delete'], permission_classes=[permissions.IsAuthenticated], url_path='shopping_cart', url_name='shopping_cart_clear')
+    def shopping_cart_clear(self, request):
+        """Очищает список покупок одним DELETE."""
+        ShoppingCart.objects.filter(user=request.user).delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    @action(detail=False, methods=['get'], permission_classes=[permissions.IsAuthenticated], url_path='download_shopping_cart', url_name='download_shopping_cart', renderer_classes=SHOPPING_LIST_RENDERERS)
     def download_shopping_cart(self, request):
+        """
+        Список покупок в формате txt (по умолчанию), csv, json или pdf
+        (?format= или Accept). Текстовые форматы отдаются потоком.
+        """
         user = request.user
-        shopping_list_content = generate_shopping_list_text(user)
-        response = HttpResponse(shopping_list_content, content_type='text/plain; charset=utf-8')
-        response['Content-Disposition'] = 'attachment; filename="shopping_list.txt"'
+        export_format = request.accepted_renderer.format
+        filename = f'shopping_list.{export_format}'
+        if export_format == 'pdf':
+            response = HttpResponse(
+                shopping_list_export.render_pdf(user),
+                content_type='application/pdf'
+            )
+        else:
+            content_type, iter_content = SHOPPING_LIST_STREAMS[export_format]
+            response = StreamingHttpResponse(
+                iter_content(user), content_type=content_type
+            )
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
         return response
 
     @action(detail=True, methods=['get'], permission_classes=[permissions.AllowAny], url_path='get-link', url_name='get_link')
     def get_link(self, request, pk=None):
-        print(f">>> Request received for get_link with pk={pk}") 
-        try:
-            recipe = get_object_or_404(Recipe, pk=pk)
-            print(f">>> Recipe found: {recipe.name}")
-        except Exception as e:
-            print(f"!!! Error getting recipe: {e}") 
-            raise 
-
-        short_code_placeholder = f"s{recipe.id}"
-        base_short_url = "https://foodgram.example.org/s/"
-        short_link_url = f"{base_short_url}{short_code_placeholder}"
+        """Короткая ссылка на рецепт; код создаётся при первом запросе."""
+        if not str(pk).isdigit():
+            raise Http404
+        code = short_links.get_code(pk)
+        if code is None:
+            if not Recipe.objects.filter(pk=pk).exists():
+                raise Http404
+            code = short_links.create_code(pk)
+        return Response(
+            {'short-link': request.build_absolute_uri(
+                reverse('short_link', args=[code]))},
+            status=status.HTTP_200_OK
+        )
 
-        
-        response_data = {"short-link": short_link_url}
-        print(f">>> Returning hardcoded response data: {response_data}") 
-        return Response(response_data, status=status.HTTP_200_OK)
+
+def short_link_redirect(request, code):
+    """Перенаправляет /s/<code> на страницу рецепта."""
+    recipe_id = short_links.resolve(code) if short_links.is_valid_code(code) else None
+    if recipe_id is None:
+        raise Http404
+    return HttpResponseRedirect(f'/recipes/{recipe_id}')
        
\ No newline at end of file
@@ -19,13 +19,13 @@ class CustomUserAdmin(BaseUserAdmin):
         (None, {'fields': ('first_name', 'last_name', 'email', 'avatar')}),
     )
 
-    @admin.display(description='Кол-во рецептов')
+    @admin.display(description='Кол-во рецептов', ordering='recipes_count')
     def recipe_count(self, obj):
-        return obj.recipes.count()
+        return obj.recipes_count
 
-    @admin.display(description='Кол-во подписчиков')
+    @admin.display(description='Кол-во подписчиков', ordering='followers_count')
     def follower_count(self, obj):
-         return obj.following.count()
+         return obj.followers_count
 
 
 @admin.register(Subscription)
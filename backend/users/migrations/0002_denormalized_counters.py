@@ -0,0 +1,45 @@
+# Generated by Django 4.2.30 on 2026-10-17 07:25
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def _count_of(model, fk_field):
+    return Coalesce(Subquery(
+        model.objects.filter(**{fk_field: OuterRef('pk')}).order_by().values(
+            fk_field).annotate(total=Count('*')).values('total'),
+        output_field=IntegerField()
+    ), 0)
+
+
+def populate_counters(apps, schema_editor):
+    User = apps.get_model('users', 'User')
+    Recipe = apps.get_model('recipes', 'Recipe')
+    Subscription = apps.get_model('users', 'Subscription')
+    User.objects.update(
+        recipes_count=_count_of(Recipe, 'author'),
+        followers_count=_count_of(Subscription, 'author'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+        ('recipes', '0005_denormalized_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='followers_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Кол-во подписчиков'),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='recipes_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Кол-во рецептов'),
+        ),
+        migrations.RunPython(populate_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.30 on 2026-10-17 07:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_denormalized_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='avatar_thumbnail',
+            field=models.ImageField(blank=True, editable=False, upload_to='users/renditions/', verbose_name='Миниатюра аватара'),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='avatar_webp',
+            field=models.ImageField(blank=True, editable=False, upload_to='users/renditions/', verbose_name='Аватар в WebP'),
+        ),
+    ]
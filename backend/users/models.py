@@ -2,7 +2,9 @@ from django.contrib.auth.models import AbstractUser
 from django.db import models
 from django.core.exceptions import ValidationError
 
-class User(AbstractUser):
+from core.models import CounterFieldsMixin, ImageRenditionsMixin
+
+class User(ImageRenditionsMixin, CounterFieldsMixin, AbstractUser):
     """Custom User Model."""
     email = models.EmailField(
         'Адрес электронной почты',
@@ -38,6 +40,31 @@ class User(AbstractUser):
         null=True,
         help_text='Загрузите ваш аватар'
     )
+    avatar_thumbnail = models.ImageField(
+        'Миниатюра аватара',
+        upload_to='users/renditions/',
+        blank=True,
+        editable=False
+    )
+    avatar_webp = models.ImageField(
+        'Аватар в WebP',
+        upload_to='users/renditions/',
+        blank=True,
+        editable=False
+    )
+    recipes_count = models.PositiveIntegerField(
+        'Кол-во рецептов',
+        default=0,
+        editable=False
+    )
+    followers_count = models.PositiveIntegerField(
+        'Кол-во подписчиков',
+        default=0,
+        editable=False
+    )
+
+    counter_fields = ('recipes_count', 'followers_count')
+    rendition_sources = ('avatar',)
 
     USERNAME_FIELD = 'email'
     
@@ -4,28 +4,58 @@ from django.contrib.auth import get_user_model
 from rest_framework import serializers
 from djoser.serializers import UserCreateSerializer as DjoserUserCreateSerializer
 from djoser.serializers import UserSerializer as DjoserUserSerializer
-from drf_extra_fields.fields import Base64ImageField
+from api.fields import ImageUploadField
 
 from .models import Subscription
 
 User = get_user_model()
 
 
+def get_subscribed_author_ids(request):
+    """
+    Возвращает множество id авторов, на которых подписан текущий пользователь.
+    Загружается одним запросом и кешируется на объекте запроса, поэтому все
+    вложенные сериализаторы одного ответа используют один и тот же набор.
+    """
+    author_ids = getattr(request, '_subscribed_author_ids', None)
+    if author_ids is None:
+        author_ids = set(
+            Subscription.objects.filter(
+                user=request.user
+            ).values_list('author_id', flat=True)
+        )
+        request._subscribed_author_ids = author_ids
+    return author_ids
+
+
+def get_recipes_limit(request):
+    """Читает параметр recipes_limit, по умолчанию DEFAULT_RECIPES_LIMIT."""
+    limit_param = request.query_params.get('recipes_limit') if request else None
+    try:
+        return int(limit_param) if limit_param else settings.DEFAULT_RECIPES_LIMIT
+    except (ValueError, TypeError):
+        return settings.DEFAULT_RECIPES_LIMIT
+
+
 class CustomUserSerializer(DjoserUserSerializer):
     is_subscribed = serializers.SerializerMethodField(read_only=True)
     avatar = serializers.ImageField(read_only=True, required=False, allow_null=True)
+    avatar_thumbnail = serializers.ImageField(read_only=True)
+    avatar_webp = serializers.ImageField(read_only=True)
 
     class Meta(DjoserUserSerializer.Meta):
         model = User
         fields = ('email', 'id', 'username', 'first_name',
-                  'last_name', 'is_subscribed', 'avatar')
+                  'last_name', 'is_subscribed', 'avatar',
+                  'avatar_thumbnail', 'avatar_webp')
 
     def get_is_subscribed(self, obj):
         request = self.context.get('request')
         if not request or request.user.is_anonymous or not isinstance(obj, User):
             return False
-        user = request.user
-        return Subscription.objects.filter(user=user, author=obj).exists()
+        if obj.pk == request.user.pk:
+            return False
+        return obj.id in get_subscribed_author_ids(request)
 
 
 class CustomUserCreateSerializer(DjoserUserCreateSerializer):
@@ -44,7 +74,7 @@ class CustomUserCreateSerializer(DjoserUserCreateSerializer):
 
 class UserWithRecipesSerializer(CustomUserSerializer):
     recipes = serializers.SerializerMethodField()
-    recipes_count = serializers.ReadOnlyField(source='recipes.count')
+    recipes_count = serializers.IntegerField(read_only=True)
 
     class Meta(CustomUserSerializer.Meta):
         fields = CustomUserSerializer.Meta.fields + ('recipes', 'recipes_count')
@@ -53,23 +83,23 @@ class UserWithRecipesSerializer(CustomUserSerializer):
     def get_recipes(self, obj):
         from recipes.serializers import RecipeMinifiedSerializer
 
-        request = self.context.get('request')
-        limit_param = request.query_params.get('recipes_limit') if request else None
-        try:
-            limit = int(limit_param) if limit_param else settings.DEFAULT_RECIPES_LIMIT
-        except (ValueError, TypeError):
-            limit = settings.DEFAULT_RECIPES_LIMIT
-
-        recipes = obj.recipes.all()[:limit]
+        if hasattr(obj, 'limited_recipes'):
+            recipes = obj.limited_recipes
+        else:
+            limit = get_recipes_limit(self.context.get('request'))
+            recipes = obj.recipes.all()[:max(limit, 0)]
         serializer = RecipeMinifiedSerializer(recipes, many=True, read_only=True, context=self.context)
         return serializer.data
 
 
 class SetAvatarSerializer(serializers.Serializer):
-    avatar = Base64ImageField(required=True)
+    avatar = ImageUploadField(required=True)
 
 
 class SetAvatarResponseSerializer(serializers.ModelSerializer):
+    avatar_thumbnail = serializers.ImageField(read_only=True)
+    avatar_webp = serializers.ImageField(read_only=True)
+
     class Meta:
         model = User
-        fields = ('avatar',)
\ No newline at end of file
+        fields = ('avatar', 'avatar_thumbnail', 'avatar_webp')
\ No newline at end of file
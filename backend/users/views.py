@@ -1,4 +1,8 @@
 from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
+from django.db.models import F, Prefetch, Window
+from django.db.models.functions import RowNumber
+from django.http import Http404
 from django.shortcuts import get_object_or_404
 from rest_framework import filters, permissions, status, viewsets
 from rest_framework.decorators import action
@@ -13,9 +17,11 @@ from .serializers import (
     UserWithRecipesSerializer, 
     SetAvatarSerializer,
     SetAvatarResponseSerializer,
+    get_recipes_limit,
 )
 
-from api.pagination import CustomPageNumberPagination
+from api.pagination import CachedCountPagination
+from recipes.models import Recipe
 
 User = get_user_model()
 
@@ -27,11 +33,30 @@ class CustomUserViewSet(DjoserUserViewSet):
     """
     queryset = User.objects.all().order_by('id')
     serializer_class = CustomUserSerializer
-    pagination_class = CustomPageNumberPagination
+    pagination_class = CachedCountPagination
+    count_cache_models = (User, Subscription)
+    count_cache_user_actions = ('subscriptions',)
     
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
     
 
+    def _with_limited_recipes(self, queryset):
+        """
+        Добавляет к авторам не более recipes_limit последних рецептов
+        каждого, отобранных оконной функцией одним запросом.
+        """
+        limit = get_recipes_limit(self.request)
+        recipes = Recipe.objects.annotate(
+            row_number=Window(
+                expression=RowNumber(),
+                partition_by=F('author'),
+                order_by=F('pub_date').desc()
+            )
+        ).filter(row_number__lte=limit).order_by('-pub_date')
+        return queryset.prefetch_related(
+            Prefetch('recipes', queryset=recipes, to_attr='limited_recipes')
+        )
+
     def get_serializer_class(self):
         """Выбирает сериализатор в зависимости от действия."""
         if self.action == 'subscriptions':
@@ -96,9 +121,9 @@ class CustomUserViewSet(DjoserUserViewSet):
         """
         user = request.user
         
-        queryset = User.objects.filter(
-            following__user=user 
-        ).prefetch_related('recipes').order_by('id') 
+        queryset = self._with_limited_recipes(
+            User.objects.filter(following__user=user)
+        ).order_by('id')
 
         page = self.paginate_queryset(queryset)
         if page is not None:
@@ -118,38 +143,43 @@ class CustomUserViewSet(DjoserUserViewSet):
         url_name='subscribe'
     )
     def subscribe(self, request, id=None):
-        """Подписывает (POST) или отписывает (DELETE) от пользователя с id."""
+        """
+        Подписывает (POST) или отписывает (DELETE) от пользователя с id.
+        Повторная подписка отсекается уникальным ограничением, отписка —
+        по числу удалённых строк.
+        """
         user = request.user
-        author = get_object_or_404(User, id=id)
 
-        if user == author:
+        if str(user.id) == str(id):
             return Response(
                 {'errors': 'Нельзя подписаться на самого себя.'},
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        subscription_exists = Subscription.objects.filter(user=user, author=author).exists()
-
         if request.method == 'POST':
-            if subscription_exists:
+            author = get_object_or_404(User, id=id)
+            try:
+                with transaction.atomic():
+                    Subscription.objects.create(user=user, author=author)
+            except IntegrityError:
                 return Response(
                     {'errors': 'Вы уже подписаны на этого пользователя.'},
                     status=status.HTTP_400_BAD_REQUEST
                 )
-            Subscription.objects.create(user=user, author=author)
             
             serializer = UserWithRecipesSerializer(author, context={'request': request})
             return Response(serializer.data, status=status.HTTP_201_CREATED)
 
         elif request.method == 'DELETE':
-            if not subscription_exists:
-                return Response(
-                    {'errors': 'Вы не были подписаны на этого пользователя.'},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-            subscription = get_object_or_404(Subscription, user=user, author=author)
-            subscription.delete()
-            return Response(status=status.HTTP_204_NO_CONTENT)
+            deleted, _ = Subscription.objects.filter(user=user, author_id=id).delete()
+            if deleted:
+                return Response(status=status.HTTP_204_NO_CONTENT)
+            if not User.objects.filter(id=id).exists():
+                raise Http404
+            return Response(
+                {'errors': 'Вы не были подписаны на этого пользователя.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
 
         return Response(status=status.HTTP_405_METHOD_NOT_ALLOWED)
 
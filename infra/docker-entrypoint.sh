@@ -7,10 +7,13 @@ echo "PostgreSQL started"
 
 echo "Applying database migrations..."
 python backend/manage.py migrate --noinput
+python backend/manage.py createcachetable
 
 echo "Collecting static files..."
 python backend/manage.py collectstatic --noinput --clear
 
 
 echo "Starting Gunicorn..."
-exec gunicorn foodgram.wsgi:application --bind 0.0.0.0:8000 --workers 3
\ No newline at end of file
+# gunicorn.conf.py binds 0.0.0.0:8000, runs GUNICORN_WORKERS (3) workers and
+# sets up PROMETHEUS_MULTIPROC_DIR so /metrics covers all of them.
+exec gunicorn -c backend/gunicorn.conf.py foodgram.wsgi:application
\ No newline at end of file